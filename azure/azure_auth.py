@@ -0,0 +1,185 @@
+"""
+Service principal authentication shared by the DigiUsher Azure scripts.
+
+Tokens are cached in memory and in a permission-restricted file so that repeated
+invocations reuse still-valid ARM and storage tokens instead of doing a fresh
+exchange with login.microsoftonline.com. Tokens close to expiry are refreshed
+in the background while the cached one is still handed out.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+import azure_http
+
+ARM_RESOURCE = "https://management.azure.com/"
+STORAGE_RESOURCE = "https://storage.azure.com/"
+
+# Service endpoints, overridable for sovereign clouds or a local stand-in server
+AUTHORITY_HOST = os.environ.get("AZURE_AUTHORITY_HOST", "https://login.microsoftonline.com").rstrip("/")
+ARM_ENDPOINT = os.environ.get("DIGIUSHER_ARM_ENDPOINT", "https://management.azure.com").rstrip("/")
+BLOB_ENDPOINT = os.environ.get("DIGIUSHER_BLOB_ENDPOINT", "https://{account}.blob.core.windows.net").rstrip("/")
+
+# Treat tokens as expired this many seconds before Azure does
+EXPIRY_MARGIN = 300
+# Refresh in the background once a token is usable for less than this many seconds
+REFRESH_WINDOW = 600
+
+
+def default_cache_path() -> str:
+    """Token cache location, overridable with DIGIUSHER_TOKEN_CACHE."""
+    override = os.environ.get("DIGIUSHER_TOKEN_CACHE")
+    if override:
+        return override
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "digiusher", "azure_tokens.json")
+
+
+def blob_account_url(storage_account: str) -> str:
+    """Base URL of a storage account's Blob service."""
+    return BLOB_ENDPOINT.format(account=storage_account)
+
+
+def scope_for_resource(resource: str) -> str:
+    """Map a resource URL to the OAuth scope requested from Azure AD."""
+    if "blob.core.windows.net" in resource or "storage.azure.com" in resource:
+        return "https://storage.azure.com/.default"
+    return f"{resource}.default"
+
+
+class TokenCache:
+    """File-backed token store readable and writable only by the current user."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._read().get(key)
+        if entry and entry.get("expires_on", 0) > time.time():
+            return entry
+        return None
+
+    def put(self, key: str, token: str, expires_on: float):
+        with self._lock:
+            directory = os.path.dirname(self.path) or "."
+            try:
+                os.makedirs(directory, mode=0o700, exist_ok=True)
+                # Re-read so tokens written by other processes are kept, and drop expired ones
+                now = time.time()
+                entries = {k: v for k, v in self._read().items() if v.get("expires_on", 0) > now}
+                entries[key] = {"access_token": token, "expires_on": expires_on}
+
+                fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tokens-")
+                try:
+                    os.chmod(tmp_path, 0o600)
+                    with os.fdopen(fd, "w") as f:
+                        json.dump(entries, f)
+                    os.replace(tmp_path, self.path)
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
+            except OSError:
+                # The cache is an optimization; an unwritable location must not break auth
+                pass
+
+
+class AzureAuthenticator:
+    """Authenticate with Azure using service principal."""
+
+    def __init__(self, tenant_id: str, client_id: str, client_secret: str, cache_path: str = None, use_cache: bool = True):
+        self.tenant_id = tenant_id
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self._tokens = {}
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._fetch_locks = {}
+        self.cache = TokenCache(cache_path or default_cache_path()) if use_cache else None
+
+    def _cache_key(self, scope: str) -> str:
+        # The secret is hashed into the key so a rotated or wrong secret never reuses tokens
+        secret_hash = hashlib.sha256(self.client_secret.encode()).hexdigest()[:16]
+        raw = f"{self.tenant_id}|{self.client_id}|{scope}|{secret_hash}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _fetch_token(self, scope: str) -> dict:
+        url = f"{AUTHORITY_HOST}/{self.tenant_id}/oauth2/v2.0/token"
+        data = {
+            "grant_type": "client_credentials",
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "scope": scope,
+        }
+
+        response = azure_http.post(url, data=data)
+        response.raise_for_status()
+
+        token_data = response.json()
+        entry = {
+            "access_token": token_data["access_token"],
+            "expires_on": time.time() + int(token_data["expires_in"]) - EXPIRY_MARGIN,
+        }
+
+        with self._lock:
+            self._tokens[scope] = entry
+        if self.cache:
+            self.cache.put(self._cache_key(scope), entry["access_token"], entry["expires_on"])
+        return entry
+
+    def _refresh_in_background(self, scope: str):
+        with self._lock:
+            if scope in self._refreshing:
+                return
+            self._refreshing.add(scope)
+
+        def refresh():
+            try:
+                self._fetch_token(scope)
+            except Exception:
+                # The current token is still valid; the next call retries synchronously if needed
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing.discard(scope)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def get_token(self, resource: str = ARM_RESOURCE) -> str:
+        """Get access token for a specific resource."""
+        scope = scope_for_resource(resource)
+        now = time.time()
+
+        with self._lock:
+            entry = self._tokens.get(scope)
+        if not entry or entry["expires_on"] <= now:
+            entry = self.cache.get(self._cache_key(scope)) if self.cache else None
+            if entry:
+                with self._lock:
+                    self._tokens[scope] = entry
+
+        if not entry or entry["expires_on"] <= now:
+            # Concurrent callers (fleet workers sharing this tenant) wait for one exchange
+            with self._lock:
+                fetch_lock = self._fetch_locks.setdefault(scope, threading.Lock())
+            with fetch_lock:
+                with self._lock:
+                    entry = self._tokens.get(scope)
+                if not entry or entry["expires_on"] <= time.time():
+                    entry = self._fetch_token(scope)
+        elif entry["expires_on"] - now < REFRESH_WINDOW:
+            self._refresh_in_background(scope)
+
+        return entry["access_token"]
@@ -493,8 +493,8 @@ output "billing_scope_type" {
 }
 
 output "backfill_command" {
-  description = "Command to run historical data backfill (run once per month)"
-  value       = var.enable_cost_exports ? "python3 backfill_historical_data.py --from-terraform --month YYYY-MM" : null
+  description = "Command to backfill a range of historical months"
+  value       = var.enable_cost_exports ? "python3 backfill_historical_data.py --from-terraform --from YYYY-MM --to YYYY-MM" : null
 }
 
 output "digiusher_onboarding" {
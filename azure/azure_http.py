@@ -0,0 +1,198 @@
+"""
+Shared HTTP transport for the DigiUsher Azure scripts.
+
+All Azure AD, ARM and Blob storage calls go through one requests.Session so that
+connections are kept alive and pooled per host. Requests are paced by a shared
+adaptive rate limiter (see rate_limit.py), and throttled (429) and unavailable
+(503) responses are retried, honoring the Retry-After header when Azure sends one.
+"""
+
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from rate_limit import RateLimiter, throttle_delay
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (10, 60)
+DEFAULT_MAX_RETRIES = 5
+
+# Statuses retried for every method. Other 5xx are only retried for idempotent
+# methods, since a POST that reached the server may already have been applied.
+THROTTLE_STATUSES = {429, 503}
+TRANSIENT_STATUSES = {500, 502, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+_settings = {
+    "timeout": DEFAULT_TIMEOUT,
+    "max_retries": DEFAULT_MAX_RETRIES,
+    "pool_maxsize": 32,
+    "pool_connections": 16,
+    "rate_limit": True,
+}
+_session = None
+_limiter = RateLimiter()
+_session_lock = threading.Lock()
+
+
+def configure(timeout: float = None, max_retries: int = None, pool_maxsize: int = None, pool_connections: int = None, rate_limit: bool = None):
+    """Override transport defaults. Call before the first request.
+
+    `rate_limit=False` turns off the shared adaptive rate limiter.
+
+    `pool_connections` is the number of hosts whose connection pools are kept;
+    raise it when talking to many storage accounts at once.
+    """
+    global _session
+    if timeout is not None:
+        _settings["timeout"] = timeout
+    if max_retries is not None:
+        _settings["max_retries"] = max_retries
+    if pool_maxsize is not None:
+        _settings["pool_maxsize"] = pool_maxsize
+    if pool_connections is not None:
+        _settings["pool_connections"] = pool_connections
+    if rate_limit is not None:
+        _settings["rate_limit"] = rate_limit
+    if pool_maxsize is not None or pool_connections is not None:
+        with _session_lock:
+            _session = None
+
+
+def get_session() -> requests.Session:
+    """Return the shared session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            # Retries are handled in request() so Retry-After can be honored per call
+            adapter = HTTPAdapter(
+                pool_connections=_settings["pool_connections"],
+                pool_maxsize=_settings["pool_maxsize"],
+                max_retries=0,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def retry_after_seconds(response: requests.Response):
+    """Parse the Retry-After header (seconds or HTTP date), or None if absent."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        # Cost Management sends its own x-ms-ratelimit-microsoft.costmanagement-*-retry-after
+        return throttle_delay(response.headers, include_retry_after=False)
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_seconds(attempt: int) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def request(method: str, url: str, timeout=None, max_retries: int = None, **kwargs) -> requests.Response:
+    """Send a request over the shared session, retrying throttled responses.
+
+    Returns the final response, which may still be a 429/5xx once retries are
+    exhausted. Network errors are raised as requests.RequestException.
+    """
+    method = method.upper()
+    if timeout is None:
+        timeout = _settings["timeout"]
+    if max_retries is None:
+        max_retries = _settings["max_retries"]
+    idempotent = method in IDEMPOTENT_METHODS
+    session = get_session()
+    recorder = metrics.active()
+    endpoint = metrics.endpoint_name(method, url, kwargs.get("params")) if recorder else None
+
+    limiter = _limiter if _settings["rate_limit"] else None
+
+    attempt = 0
+    while True:
+        if limiter:
+            waited = limiter.acquire(url, kwargs.get("headers"))
+            if waited:
+                metrics.add_phase_time("rate_limit_wait", waited)
+        started = time.perf_counter()
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            # A failed connect never reached the server, so it is safe to retry any method
+            retryable = idempotent or isinstance(e, requests.ConnectTimeout)
+            if recorder:
+                recorder.record_request(endpoint, "error", time.perf_counter() - started)
+            if not retryable or attempt >= max_retries:
+                raise
+            if recorder:
+                recorder.record_retry(endpoint, "network")
+            time.sleep(backoff_seconds(attempt))
+            attempt += 1
+            continue
+
+        status = response.status_code
+        if limiter:
+            limiter.observe(url, response, kwargs.get("headers"))
+        if recorder:
+            _record_response(recorder, endpoint, response, time.perf_counter() - started, kwargs.get("stream"))
+
+        retryable = status in THROTTLE_STATUSES or (idempotent and status in TRANSIENT_STATUSES)
+        if not retryable or attempt >= max_retries:
+            return response
+
+        if recorder:
+            recorder.record_retry(endpoint, "throttled" if status in THROTTLE_STATUSES else "server_error")
+        delay = retry_after_seconds(response)
+        if delay is None:
+            delay = backoff_seconds(attempt)
+        response.close()
+        time.sleep(min(delay, BACKOFF_MAX))
+        attempt += 1
+
+
+def _record_response(recorder, endpoint: str, response: requests.Response, seconds: float, stream: bool):
+    """Record one attempt; streamed bodies without Content-Length are counted as they are read."""
+    body = response.request.body
+    sent = len(body) if body else 0
+    length = response.headers.get("Content-Length")
+    if length and length.isdigit():
+        received = int(length)
+    elif not stream:
+        received = len(response.content)
+    else:
+        received = 0
+        iter_content = response.iter_content
+
+        def counting_iter_content(*args, **kwargs):
+            for chunk in iter_content(*args, **kwargs):
+                recorder.add_bytes_received(endpoint, len(chunk))
+                yield chunk
+
+        response.iter_content = counting_iter_content
+    recorder.record_request(endpoint, response.status_code, seconds, sent, received)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
@@ -3,131 +3,321 @@
 DigiUsher Azure FOCUS Export Historical Backfill Script
 
 Triggers FOCUS cost export runs for specific months. Use --month YYYY-MM to export
-a single month, or --status to check current export status.
+a single month, --from YYYY-MM --to YYYY-MM to export a range of months one after
+another, or --status to check current export status.
+
+Months whose previous export failed or ran longer than the target run time are
+split into shorter windows sized from past run durations (or use --chunk-days).
+
+Range backfills keep a journal of triggered windows and their run status, so an
+interrupted backfill resumes where it stopped when run again (--restart ignores it).
+
+--heal scans the export container and triggers exports only for the days that
+are missing or whose run is incomplete against its manifest, oldest first.
 """
 
 import argparse
+import atexit
+import random
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 import requests
 import time
 import json
 
+import azure_http
+import metrics
+from azure_auth import ARM_ENDPOINT, AzureAuthenticator
+from backfill_journal import BackfillJournal, open_journal
+from day_coverage import PERIOD_PATTERN
+from onboarding_config import ConfigError, load_fleet_file, resolve_settings
+from run_history import (
+    ACTIVE_STATUSES,
+    SUCCESS_STATUSES,
+    RunHistory,
+    history_cache_path,
+    run_duration,
+    seconds_per_day,
+)
+
+
+# Fields every --fleet entry needs besides the client secret
+FLEET_KEYS = ["billing_scope", "export_name", "tenant_id", "client_id"]
+
+
+def month_period(year: int, month: int) -> tuple:
+    """First and last day of a month. The end is capped at yesterday (Azure rejects future dates)."""
+    first_day = datetime(year, month, 1)
+    last_day = first_day + relativedelta(months=1) - timedelta(days=1)
+
+    today = datetime.now()
+    if last_day >= today:
+        last_day = today - timedelta(days=1)
+    return first_day, last_day
+
+
+def split_period(first_day: datetime, last_day: datetime, chunk_days: int) -> list:
+    """Split a period into consecutive (first, last) windows of at most `chunk_days` days."""
+    if not chunk_days or first_day > last_day:
+        return [(first_day, last_day)]
+    windows = []
+    start = first_day
+    while start <= last_day:
+        end = min(start + timedelta(days=chunk_days - 1), last_day)
+        windows.append((start, end))
+        start = end + timedelta(days=1)
+    return windows
+
+
+def split_by_month(first_day: datetime, last_day: datetime) -> list:
+    """Split a period at month boundaries into consecutive (first, last) windows."""
+    windows = []
+    start = first_day
+    while start <= last_day:
+        month_end = datetime(start.year, start.month, 1) + relativedelta(months=1) - timedelta(days=1)
+        end = min(month_end, last_day)
+        windows.append((start, end))
+        start = end + timedelta(days=1)
+    return windows
+
+
+def truncated_periods(runs: list) -> list:
+    """(export path, first day, last day) of period folders with an incomplete run and no complete one."""
+    by_period = {}
+    for run in runs:
+        if run["period"]:
+            by_period.setdefault(run["period"], []).append(run)
+
+    truncated = []
+    for period, period_runs in sorted(by_period.items()):
+        if any(r["complete"] for r in period_runs):
+            continue
+        # Runs without a manifest cannot be judged; only a manifest mismatch counts
+        if not any(r["status"] == "Incomplete" for r in period_runs):
+            continue
+        match = PERIOD_PATTERN.match(period)
+        if match:
+            truncated.append((
+                match.group(1),
+                datetime.strptime(match.group(2), "%Y%m%d"),
+                datetime.strptime(match.group(3), "%Y%m%d"),
+            ))
+    return truncated
+
+
+def plan_heal(months: dict, runs: list, export_name: str, since: datetime = None, through: datetime = None) -> list:
+    """Work out the (first, last, reason) windows to export again, oldest first.
+
+    Missing days come from the day coverage of the period folders in storage, for
+    the export folder named like the export (or the only one). Truncated days come
+    from runs that do not match their manifest. Windows never cross a month boundary.
+    """
+    from verify_exports import day_coverage
+
+    coverage = day_coverage(months)
+    exports = coverage.exports()
+    named = [e for e in exports if e.rstrip("/").rsplit("/", 1)[-1] == export_name]
+    if named:
+        export = named[0]
+    elif len(exports) == 1:
+        export = exports[0]
+    elif exports:
+        raise ValueError(f"cannot tell which export folder belongs to {export_name}: {', '.join(exports)}")
+    else:
+        # Nothing in storage yet: with `since` the whole range is missing
+        export = None
+
+    yesterday = datetime.now() - timedelta(days=1)
+    through = min(through, yesterday) if through else yesterday
+    through = datetime(through.year, through.month, through.day)
+    days = {}
+    missing = coverage.missing_ranges(export, through=through.date(), since=since.date() if since else None)
+    for start, end in missing:
+        first = datetime(start.year, start.month, start.day)
+        last = datetime(end.year, end.month, end.day)
+        for window in split_by_month(first, last):
+            days[window[0]] = window + ("missing",)
+
+    for path, first, last in truncated_periods(runs):
+        if export is not None and path != export:
+            continue
+        first = max(first, since) if since else first
+        last = min(last, through)
+        for window in split_by_month(first, last):
+            days.setdefault(window[0], window + ("truncated",))
+
+    return [days[first] for first in sorted(days)]
 
-class AzureAuthenticator:
-    def __init__(self, tenant_id: str, client_id: str, client_secret: str):
-        self.tenant_id = tenant_id
-        self.client_id = client_id
-        self.client_secret = client_secret
-        self.token = None
-        self.token_expires = None
-
-    def get_token(self) -> str:
-        """Get or refresh Azure access token."""
-        if self.token and self.token_expires and datetime.now() < self.token_expires:
-            return self.token
-
-        url = f"https://login.microsoftonline.com/{self.tenant_id}/oauth2/v2.0/token"
-        data = {
-            "grant_type": "client_credentials",
-            "client_id": self.client_id,
-            "client_secret": self.client_secret,
-            "scope": "https://management.azure.com/.default",
-        }
-
-        response = requests.post(url, data=data, timeout=30)
-        response.raise_for_status()
 
-        token_data = response.json()
-        self.token = token_data["access_token"]
-        self.token_expires = datetime.now() + timedelta(
-            seconds=token_data["expires_in"] - 300
-        )
-
-        return self.token
+class FocusExportBackfill:
+    # Polling schedule used while waiting for a run to finish (seconds)
+    POLL_INITIAL_INTERVAL = 15
+    POLL_MAX_INTERVAL = 120
+    POLL_BACKOFF_FACTOR = 1.5
+    POLL_JITTER = 0.2
 
+    # Window size when a month has to be split but no run durations are known
+    DEFAULT_CHUNK_DAYS = 7
 
-class FocusExportBackfill:
     def __init__(
-        self, authenticator: AzureAuthenticator, billing_scope: str, export_name: str
+        self,
+        authenticator: AzureAuthenticator,
+        billing_scope: str,
+        export_name: str,
+        log_prefix: str = "",
+        use_cache: bool = True,
+        chunk_days: int = None,
+        auto_chunk: bool = True,
+        target_run_seconds: float = 3600,
+        journal: BackfillJournal = None,
     ):
         self.auth = authenticator
         self.billing_scope = billing_scope
         self.export_name = export_name
-        self.base_url = "https://management.azure.com"
+        self.base_url = ARM_ENDPOINT
         self.api_version = "2025-03-01"
+        self.month_queue = []
+        self.month_windows = {}     # (year, month) -> explicit windows, when only part of a month is queued
+        self.log_prefix = log_prefix
+        self.history = RunHistory(history_cache_path(billing_scope, export_name) if use_cache else None)
+        self.chunk_days = chunk_days
+        self.auto_chunk = auto_chunk
+        self.target_run_seconds = target_run_seconds
+        self.journal = journal
+        self._history_loaded = False
+
+    def log(self, message: str = ""):
+        """Print a message, tagging each line with the log prefix in fleet mode."""
+        if self.log_prefix:
+            message = "\n".join(
+                f"[{self.log_prefix}] {line}" if line else line
+                for line in message.split("\n")
+            )
+        print(message, flush=True)
 
-    def get_latest_run_status(self) -> dict:
-        """Get the most recent export run status."""
-        url = f"{self.base_url}{self.billing_scope}/providers/Microsoft.CostManagement/exports/{self.export_name}/runHistory"
-
+    def _get_json(self, url: str, params: dict):
+        """GET an ARM resource. Returns (data, None) or (None, error run_info)."""
         headers = {
             "Authorization": f"Bearer {self.auth.get_token()}",
             "Content-Type": "application/json",
         }
 
         try:
-            response = requests.get(
-                url, headers=headers, params={"api-version": self.api_version}, timeout=30
-            )
+            response = azure_http.get(url, headers=headers, params=params)
         except requests.RequestException as e:
-            print(f"   ⚠️  Network error checking status: {e}")
-            return {"status": "Error", "error": str(e)}
+            self.log(f"   ⚠️  Network error checking status: {e}")
+            return None, {"status": "Error", "error": str(e)}
 
         if not response.ok:
             error_msg = response.text[:200] if response.text else "No details"
-            print(f"   ⚠️  Failed to get export status (HTTP {response.status_code}): {error_msg}")
-            return {"status": "Error", "error": f"HTTP {response.status_code}"}
+            self.log(f"   ⚠️  Failed to get export status (HTTP {response.status_code}): {error_msg}")
+            return None, {"status": "Error", "error": f"HTTP {response.status_code}"}
 
         try:
-            data = response.json()
+            return response.json(), None
         except json.JSONDecodeError:
-            print("   ⚠️  Invalid JSON response from Azure API")
-            return {"status": "Error", "error": "Invalid JSON"}
+            self.log("   ⚠️  Invalid JSON response from Azure API")
+            return None, {"status": "Error", "error": "Invalid JSON"}
 
-        runs = data.get("value", [])
-        if not runs:
+    def get_latest_run_status(self) -> dict:
+        """Get the most recent export run status.
+
+        Only the last few runs are fetched (via $expand=runHistory on the export)
+        and merged into the run history store, which keeps runs indexed.
+        """
+        url = f"{self.base_url}{self.billing_scope}/providers/Microsoft.CostManagement/exports/{self.export_name}"
+        data, error = self._get_json(url, {"api-version": self.api_version, "$expand": "runHistory"})
+        if error:
+            return error
+
+        # Recent runs are nested under 'properties.runHistory'
+        runs = data.get("properties", {}).get("runHistory", {}).get("value", [])
+        self.history.merge(runs)
+
+        latest = self.history.latest()
+        if not latest:
             return {"status": "NoHistory"}
+        return latest
 
-        # Get most recent run - data is nested under 'properties'
-        latest = sorted(
-            runs,
-            key=lambda x: x.get("properties", {}).get("submittedTime", ""),
-            reverse=True
-        )[0]
-        props = latest.get("properties", {})
-        return {
-            "status": props.get("status", "Unknown"),
-            "submitted": props.get("submittedTime", ""),
-            "processing_start": props.get("processingStartTime", ""),
-            "processing_end": props.get("processingEndTime", ""),
-            "file_name": props.get("fileName", ""),
-            "start_date": props.get("startDate", ""),
-            "end_date": props.get("endDate", ""),
-            "execution_type": props.get("executionType", ""),
-        }
+    def refresh_run_history(self) -> dict:
+        """Fetch the full run history into the store. Returns an error run_info on failure."""
+        url = f"{self.base_url}{self.billing_scope}/providers/Microsoft.CostManagement/exports/{self.export_name}/runHistory"
+        data, error = self._get_json(url, {"api-version": self.api_version})
+        if error:
+            return error
+        self.history.merge(data.get("value", []))
+        return {}
 
     def is_export_in_progress(self) -> tuple[bool, dict]:
         """Check if an export is currently running."""
         run_info = self.get_latest_run_status()
-        in_progress = run_info.get("status") in ["Queued", "InProgress"]
+        in_progress = run_info.get("status") in ACTIVE_STATUSES
         return in_progress, run_info
 
+    def plan_chunk_days(self, year: int, month: int) -> int:
+        """Days per export window for a month, or 0 to export the month in one run.
+
+        An explicit chunk size always applies. Otherwise a month is split only if
+        its latest finished run failed or one of its runs took longer than the
+        target run time. The window size then comes from the median processing
+        time per day of earlier runs, for this month if known, else for the export.
+        """
+        if self.chunk_days:
+            return self.chunk_days
+        if not self.auto_chunk:
+            return 0
+
+        finished = [
+            run for run in self.history.runs_for_month(f"{year}-{month:02d}")
+            if run["status"] not in ACTIVE_STATUSES
+        ]
+        if not finished:
+            return 0
+        failed = finished[0]["status"] not in SUCCESS_STATUSES
+        durations = [run_duration(run) for run in finished]
+        too_long = any(d and d.total_seconds() > self.target_run_seconds for d in durations)
+        if not failed and not too_long:
+            return 0
+
+        rate = seconds_per_day(finished) or seconds_per_day(self.history.runs.values())
+        days = int(self.target_run_seconds / rate) if rate else self.DEFAULT_CHUNK_DAYS
+        if failed:
+            days = min(days, self.DEFAULT_CHUNK_DAYS)
+        return max(1, days)
+
+    def plan_windows(self, year: int, month: int) -> list:
+        """(first_day, last_day) export windows for a month, in order."""
+        first_day, last_day = month_period(year, month)
+        periods = self.month_windows.get((year, month), [(first_day, last_day)])
+        chunk_days = self.plan_chunk_days(year, month)
+
+        windows = []
+        for start, end in periods:
+            end = min(end, last_day)
+            days = chunk_days if chunk_days and (end - start).days + 1 > chunk_days else 0
+            windows.extend(split_period(start, end, days))
+        return windows
+
+    def load_run_history(self):
+        """Fetch the full run history once, for chunk sizing and reconciling the journal."""
+        if self._history_loaded or not (self.journal or (self.auto_chunk and not self.chunk_days)):
+            return
+        self._history_loaded = True
+        error = self.refresh_run_history()
+        if error:
+            self.log(f"   ⚠️  Run history unavailable ({error.get('error')}), months are exported whole")
+        elif self.journal:
+            self.journal.reconcile(self.history)
+
     def execute_export_for_month(self, year: int, month: int) -> dict:
         """Execute export for a specific month."""
-        # Calculate first and last day of month
-        first_day = datetime(year, month, 1)
-        if month == 12:
-            last_day = datetime(year + 1, 1, 1) - timedelta(days=1)
-        else:
-            last_day = datetime(year, month + 1, 1) - timedelta(days=1)
+        return self.execute_export_for_period(*month_period(year, month))
 
-        # For current/future months, use yesterday as end date (Azure rejects future dates)
-        today = datetime.now()
-        yesterday = today - timedelta(days=1)
-        if last_day >= today:
-            last_day = yesterday
+    def execute_export_for_period(self, first_day: datetime, last_day: datetime) -> dict:
+        """Execute export for the days from first_day to last_day inclusive."""
+        year, month = first_day.year, first_day.month
 
         # Check if the date range is valid (first_day must be before or equal to last_day)
         if first_day > last_day:
@@ -156,8 +346,8 @@ class FocusExportBackfill:
         date_range = f"{first_day.strftime('%Y-%m-%d')} to {last_day.strftime('%Y-%m-%d')}"
 
         try:
-            response = requests.post(
-                url, headers=headers, json=payload, params={"api-version": self.api_version}, timeout=60
+            response = azure_http.post(
+                url, headers=headers, json=payload, params={"api-version": self.api_version}
             )
         except requests.RequestException as e:
             return {
@@ -178,7 +368,150 @@ class FocusExportBackfill:
             "response": response.text if not response.ok else "Success",
         }
 
-    def run_single_month(self, month_str: str) -> dict:
+    def wait_for_export_idle(self, since: str = None, max_wait: float = 6 * 3600) -> dict:
+        """Poll until no export is running, with backoff and jitter.
+
+        If `since` is given, also wait until a run submitted after that timestamp
+        shows up in the history, so a just-triggered run is not mistaken for idle.
+        """
+        interval = self.POLL_INITIAL_INTERVAL
+        deadline = time.monotonic() + max_wait
+
+        while True:
+            in_progress, run_info = self.is_export_in_progress()
+            status = run_info.get("status")
+            submitted = run_info.get("submitted", "")
+            registered = since is None or submitted > since
+
+            if status != "Error" and registered and not in_progress:
+                if self.journal:
+                    self.journal.record_run(run_info)
+                return {"idle": True, "run_info": run_info}
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return {"idle": False, "reason": "timeout", "run_info": run_info}
+
+            jitter = interval * random.uniform(-self.POLL_JITTER, self.POLL_JITTER)
+            delay = min(interval + jitter, remaining)
+            self.log(f"   ⏳ Status: {status}, next check in {delay:.0f}s")
+            time.sleep(delay)
+            interval = min(interval * self.POLL_BACKOFF_FACTOR, self.POLL_MAX_INTERVAL)
+
+    def queue_month_range(self, from_str: str, to_str: str) -> list:
+        """Queue every month from `from_str` to `to_str` inclusive (format: YYYY-MM)."""
+        start = datetime.strptime(from_str, "%Y-%m")
+        end = datetime.strptime(to_str, "%Y-%m")
+        if start > end:
+            raise ValueError(f"--from {from_str} is after --to {to_str}")
+
+        current = start
+        while current <= end:
+            self.month_queue.append((current.year, current.month))
+            current += relativedelta(months=1)
+
+        return self.month_queue
+
+    def queue_windows(self, windows: list) -> list:
+        """Queue explicit (first_day, last_day, ...) windows within months, oldest month first."""
+        for window in sorted(windows):
+            first_day, last_day = window[0], window[1]
+            key = (first_day.year, first_day.month)
+            if key not in self.month_windows:
+                self.month_queue.append(key)
+            self.month_windows.setdefault(key, []).append((first_day, last_day))
+        self.month_queue.sort()
+        return self.month_queue
+
+    def run_month_queue(self, max_wait: float = 6 * 3600) -> dict:
+        """Trigger queued months in order, each as soon as the previous run finishes.
+
+        A month split into several windows is exported one window at a time, with
+        the same wait for the previous run before each one.
+        """
+        started = time.monotonic()
+        results = []
+        total = len(self.month_queue)
+
+        self.log(f"\n🚀 Backfilling {total} month(s)")
+        self.log(f"   Billing Scope: {self.billing_scope}")
+        self.log(f"   Export Name: {self.export_name}")
+        self.load_run_history()
+
+        last_submitted = None
+        succeeded = 0
+        skipped = 0
+        failed = False
+        while self.month_queue and not failed:
+            year, month = self.month_queue[0]
+            self.log(f"\n[{succeeded + 1}/{total}] {year}-{month:02d}")
+
+            windows = self.plan_windows(year, month)
+            if len(windows) > 1:
+                self.log(f"   ✂️  Split into {len(windows)} exports of up to {(windows[0][1] - windows[0][0]).days + 1} day(s)")
+
+            for i, (first_day, last_day) in enumerate(windows):
+                chunk = f"[{i + 1}/{len(windows)}] " if len(windows) > 1 else ""
+
+                if self.journal and self.journal.is_pending(first_day, last_day):
+                    self.log(f"   ⏳ {chunk}Triggered by an earlier session, waiting for its run")
+                    wait = self.wait_for_export_idle(max_wait=max_wait)
+                    if not wait["idle"]:
+                        self.log(f"   ❌ {chunk}Timed out waiting for the earlier run to finish")
+                        failed = True
+                        break
+                    if not self.refresh_run_history():
+                        self.journal.reconcile(self.history)
+                if self.journal and self.journal.is_done(first_day, last_day):
+                    self.log(f"   ⏭️  {chunk}Already exported by an earlier session")
+                    skipped += 1
+                    continue
+
+                wait = self.wait_for_export_idle(since=last_submitted, max_wait=max_wait)
+                if not wait["idle"]:
+                    self.log(f"   ❌ {chunk}Timed out waiting for the previous export to finish")
+                    failed = True
+                    break
+                last_submitted = wait["run_info"].get("submitted", "")
+
+                result = self.execute_export_for_period(first_day, last_day)
+                results.append(result)
+                if self.journal:
+                    self.journal.record_trigger(first_day, last_day, result)
+
+                if result["success"]:
+                    self.log(f"   ✅ {chunk}Export triggered (HTTP {result['status_code']}), {result.get('date_range', 'N/A')}")
+                else:
+                    self.log(f"   ❌ {chunk}Failed (HTTP {result['status_code']}): {result['response']}")
+                    failed = True
+                    break
+
+            if not failed:
+                self.month_queue.pop(0)
+                succeeded += 1
+
+        # Wait for the last triggered run so the elapsed time covers the whole backfill
+        if results and results[-1]["success"] and not self.month_queue:
+            self.log(f"\n   Waiting for the final export to complete...")
+            self.wait_for_export_idle(since=last_submitted, max_wait=max_wait)
+
+        elapsed = time.monotonic() - started
+
+        self.log(f"\n📊 Triggered {succeeded}/{total} month(s) in {timedelta(seconds=int(elapsed))}")
+        if skipped:
+            self.log(f"   Skipped {skipped} export(s) already completed by an earlier session")
+        if self.month_queue:
+            remaining = ", ".join(f"{y}-{m:02d}" for y, m in self.month_queue)
+            self.log(f"   Not triggered: {remaining}")
+
+        return {
+            "success": succeeded == total,
+            "results": results,
+            "skipped": skipped,
+            "elapsed_seconds": elapsed,
+        }
+
+    def run_single_month(self, month_str: str, max_wait: float = 6 * 3600) -> dict:
         """Run export for a single month (format: YYYY-MM)."""
         # Check if export is in progress
         in_progress, run_info = self.is_export_in_progress()
@@ -199,6 +532,14 @@ class FocusExportBackfill:
             return {"success": False, "reason": "invalid_format"}
 
         year, month = date.year, date.month
+
+        # Plan from the indexed run history (the cached runs plus the recent ones
+        # fetched above) instead of fetching the full history for every month.
+        # A split month needs each window to finish before the next, like a range.
+        if len(self.plan_windows(year, month)) > 1:
+            self.month_queue = [(year, month)]
+            return self.run_month_queue(max_wait=max_wait)
+
         print(f"\n🚀 Triggering export for {year}-{month:02d}")
         print(f"   Billing Scope: {self.billing_scope}")
         print(f"   Export Name: {self.export_name}\n")
@@ -217,40 +558,175 @@ class FocusExportBackfill:
         return result
 
 
-def get_terraform_outputs() -> dict:
-    """Get values from terraform outputs."""
-    import subprocess
-
-    outputs = {}
+def run_fleet(
+    entries: list,
+    from_str: str,
+    to_str: str,
+    max_wait: float = 6 * 3600,
+    max_workers: int = 8,
+    use_token_cache: bool = True,
+    chunk_options: dict = None,
+    journal_file: str = None,
+    restart: bool = False,
+) -> dict:
+    """Backfill a month range for many exports concurrently.
+
+    Each export gets its own worker that triggers months one at a time, so the
+    one-run-in-flight rule is kept per export while different exports proceed in
+    parallel. Entries pointing at the same export are only run once.
+    """
+    started = time.monotonic()
+    authenticators = {}
+    workers = {}
+
+    for entry in entries:
+        key = (entry["billing_scope"], entry["export_name"])
+        if key in workers:
+            print(f"⚠️  Skipping duplicate entry for export {entry['export_name']} at {entry['billing_scope']}")
+            continue
+
+        # Share one authenticator per service principal so tokens are reused
+        auth_key = (entry["tenant_id"], entry["client_id"])
+        if auth_key not in authenticators:
+            authenticators[auth_key] = AzureAuthenticator(
+                entry["tenant_id"], entry["client_id"], entry["client_secret"],
+                use_cache=use_token_cache,
+            )
 
-    # Get onboarding values
-    try:
-        result = subprocess.run(
-            ["terraform", "output", "-json", "digiusher_onboarding"],
-            capture_output=True,
-            text=True,
-            check=True
+        backfill = FocusExportBackfill(
+            authenticators[auth_key],
+            entry["billing_scope"],
+            entry["export_name"],
+            log_prefix=entry.get("name") or entry["export_name"],
+            journal=open_journal(entry["billing_scope"], entry["export_name"], journal_file, restart),
+            **(chunk_options or {}),
         )
-        outputs.update(json.loads(result.stdout))
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Failed to get terraform output: {e.stderr}")
-        sys.exit(1)
+        backfill.queue_month_range(from_str, to_str)
+        workers[key] = backfill
 
-    # Get billing_scope and export_name separately
-    for key in ["billing_scope", "export_name"]:
-        try:
-            result = subprocess.run(
-                ["terraform", "output", "-raw", key],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            outputs[key] = result.stdout.strip()
-        except subprocess.CalledProcessError:
-            print(f"❌ Failed to get terraform output: {key}")
-            sys.exit(1)
+    print(f"\n🚀 Backfilling {from_str} to {to_str} for {len(workers)} export(s)")
 
-    return outputs
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(backfill.run_month_queue, max_wait): key
+            for key, backfill in workers.items()
+        }
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                workers[key].log(f"   ❌ Backfill failed: {e}")
+                results[key] = {"success": False, "error": str(e)}
+
+    elapsed = time.monotonic() - started
+
+    print(f"\n📊 Fleet summary ({timedelta(seconds=int(elapsed))} total):\n")
+    print(f"   {'Export':<40} {'Months':<8} {'Elapsed'}")
+    print(f"   {'-'*40} {'-'*8} {'-'*10}")
+    for key in sorted(results):
+        result = results[key]
+        label = workers[key].log_prefix
+        runs = result.get("results", [])
+        succeeded = sum(1 for r in runs if r["success"])
+        status = "✅" if result.get("success") else "❌"
+        took = timedelta(seconds=int(result.get("elapsed_seconds", 0)))
+        print(f"   {label:<40} {succeeded:<8} {took} {status}")
+
+    return {
+        "success": all(r.get("success") for r in results.values()),
+        "results": results,
+        "elapsed_seconds": elapsed,
+    }
+
+
+def heal_export(
+    backfill: FocusExportBackfill,
+    auth: AzureAuthenticator,
+    storage_account: str,
+    container: str,
+    export_root_path: str = None,
+    since: datetime = None,
+    through: datetime = None,
+    dry_run: bool = False,
+    max_wait: float = 6 * 3600,
+) -> dict:
+    """Scan the export container and trigger exports only for missing or truncated days."""
+    from verify_exports import check_export_manifests
+
+    in_progress, run_info = backfill.is_export_in_progress()
+    if in_progress:
+        # Its files would look missing or truncated until it finishes
+        print(f"\n⏳ An export is in progress (submitted {run_info.get('submitted', 'Unknown')}).")
+        print(f"   Wait for it to complete and try again.")
+        return {"success": False, "reason": "export_in_progress"}
+
+    months, runs = check_export_manifests(auth, storage_account, container, export_root_path)
+    if months is None:
+        # Planning from a failed listing would treat every day as missing
+        print(f"\n❌ Cannot heal without a complete listing of the export container; nothing triggered")
+        return {"success": False, "reason": "listing_failed"}
+    try:
+        windows = plan_heal(months, runs, backfill.export_name, since=since, through=through)
+    except ValueError as e:
+        print(f"\n❌ {e}")
+        return {"success": False, "reason": "ambiguous_export"}
+
+    if not windows:
+        if not months and not since:
+            print(f"\n   No export data found in storage; use --from to choose where healing starts")
+            return {"success": False, "reason": "no_data"}
+        print(f"\n✅ Nothing to heal: no missing or truncated days")
+        return {"success": True, "results": []}
+
+    total_days = sum((last - first).days + 1 for first, last, _ in windows)
+    print(f"\n🩹 Heal plan: {len(windows)} window(s), {total_days} day(s)\n")
+    print(f"   {'From':<12} {'To':<12} {'Days':<6} {'Reason'}")
+    print(f"   {'-'*12} {'-'*12} {'-'*6} {'-'*10}")
+    for first, last, reason in windows:
+        print(f"   {first:%Y-%m-%d}   {last:%Y-%m-%d}   {(last - first).days + 1:<6} {reason}")
+
+    if dry_run:
+        print(f"\n   Dry run: nothing triggered")
+        return {"success": True, "results": []}
+
+    backfill.queue_windows(windows)
+    return backfill.run_month_queue(max_wait=max_wait)
+
+
+def print_run_history(history: RunHistory, storage_months: dict = None) -> bool:
+    """Print the latest successful run per month, flagging months missing from storage.
+
+    Returns False if a month has a successful run but no files in storage.
+    """
+    successful = history.latest_successful_by_month()
+    months = sorted(set(successful) | set(history.by_month), reverse=True)
+    if not months:
+        print("\n   No export runs found")
+        return True
+
+    print(f"\n📜 Run history ({len(history.runs)} runs, {len(months)} months):\n")
+    print(f"   {'Month':<10} {'Status':<12} {'Submitted':<20} {'Duration':<10} {'Output'}")
+    print(f"   {'-'*10} {'-'*12} {'-'*20} {'-'*10} {'-'*30}")
+
+    missing = []
+    for month in months:
+        run = successful.get(month)
+        if not run:
+            # No successful run; show the newest attempt instead
+            run = history.runs_for_month(month)[0]
+        duration = run_duration(run)
+        submitted = run["submitted"][:19].replace("T", " ") if run["submitted"] else "Unknown"
+        flag = ""
+        if storage_months is not None and run["status"] in SUCCESS_STATUSES and month not in storage_months:
+            missing.append(month)
+            flag = " ⚠️  no files in storage"
+        print(f"   {month:<10} {run['status']:<12} {submitted:<20} {str(duration or '-'):<10} {run['file_name'] or '-'}{flag}")
+
+    if missing:
+        print(f"\n   ⚠️  {len(missing)} month(s) have a successful run but no files in storage: {', '.join(sorted(missing))}")
+    return not missing
 
 
 def main():
@@ -263,16 +739,22 @@ Examples:
   python3 backfill_historical_data.py --from-terraform --month 2024-06
   python3 backfill_historical_data.py --from-terraform --status
 
+  # Using a named profile (or DIGIUSHER_* environment variables)
+  python3 backfill_historical_data.py --profile contoso --status
+
   # Using explicit credentials
   python3 backfill_historical_data.py --month 2024-06 \\
     --tenant-id <tenant> --client-id <client> --client-secret <secret> \\
     --billing-scope <scope> --export-name <name>
 
-  # For multiple months, run once per month:
-  for m in 2024-{01..06}; do
-    python3 backfill_historical_data.py --from-terraform --month $m
-    sleep 300  # Wait 5 minutes between exports
-  done
+  # For multiple months, each triggered as soon as the previous one finishes:
+  python3 backfill_historical_data.py --from-terraform --from 2024-01 --to 2024-06
+
+  # Split each month into weekly exports (large enrollments):
+  python3 backfill_historical_data.py --from-terraform --from 2024-01 --to 2024-06 --chunk-days 7
+
+  # For many billing scopes at once (exports run in parallel):
+  python3 backfill_historical_data.py --fleet fleet.json --from 2024-01 --to 2024-06
         """,
     )
 
@@ -280,6 +762,14 @@ Examples:
         "--from-terraform", action="store_true",
         help="Read credentials from terraform output"
     )
+    parser.add_argument(
+        "--terraform-dir", default=".",
+        help="Terraform working directory for --from-terraform (default: current directory)",
+    )
+    parser.add_argument(
+        "--profile",
+        help="Named profile from ~/.config/digiusher/profiles.json (override with DIGIUSHER_PROFILES)",
+    )
     parser.add_argument("--tenant-id", help="Azure Tenant ID")
     parser.add_argument("--client-id", help="Service Principal Client ID")
     parser.add_argument("--client-secret", help="Service Principal Client Secret")
@@ -292,51 +782,161 @@ Examples:
         "--month",
         help="Month to export in YYYY-MM format (e.g., 2024-06)",
     )
+    parser.add_argument(
+        "--from", dest="from_month",
+        help="First month of a range to export in YYYY-MM format (use with --to)",
+    )
+    parser.add_argument(
+        "--to", dest="to_month",
+        help="Last month of a range to export in YYYY-MM format (use with --from)",
+    )
+    parser.add_argument(
+        "--max-wait", type=float, default=6,
+        help="Hours to wait for a single export run to finish in range mode (default: 6)",
+    )
+    parser.add_argument(
+        "--chunk-days", type=int,
+        help="Split every month into exports of at most this many days, run one after another",
+    )
+    parser.add_argument(
+        "--target-run-minutes", type=float, default=60,
+        help="Split months whose exports failed or ran longer than this, sizing windows "
+             "from past run durations (default: 60)",
+    )
+    parser.add_argument(
+        "--no-auto-chunk", action="store_true",
+        help="Always export whole months unless --chunk-days is given",
+    )
+    parser.add_argument(
+        "--journal",
+        help="Journal file recording range backfill progress (default: one per export under ~/.cache/digiusher/backfill_journal/)",
+    )
+    parser.add_argument(
+        "--restart", action="store_true",
+        help="Ignore progress recorded by an earlier range backfill and trigger every month again",
+    )
+    parser.add_argument(
+        "--fleet",
+        help="JSON file listing exports to backfill concurrently (use with --from/--to)",
+    )
+    parser.add_argument(
+        "--max-workers", type=int, default=8,
+        help="Maximum number of exports driven in parallel in fleet mode (default: 8)",
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=60,
+        help="HTTP read timeout in seconds for Azure API calls (default: 60)",
+    )
+    parser.add_argument(
+        "--metrics",
+        help="Write request metrics to this file at exit (Prometheus textfile format for .prom, JSON otherwise)",
+    )
+    parser.add_argument(
+        "--no-token-cache", action="store_true",
+        help="Do not read or write the on-disk access token cache",
+    )
     parser.add_argument(
         "--status",
         action="store_true",
         help="Check current export status only (no export triggered)",
     )
+    parser.add_argument(
+        "--history",
+        action="store_true",
+        help="Show the latest successful run per month and check it against storage",
+    )
+    parser.add_argument(
+        "--heal",
+        action="store_true",
+        help="Scan storage and export again only the days that are missing or incomplete "
+             "(limit with --from and/or --to)",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="With --heal, print the windows that would be exported without triggering them",
+    )
+    parser.add_argument("--storage-account", help="Storage account name (for --history and --heal)")
+    parser.add_argument("--container", help="Container name (for --history and --heal)")
+    parser.add_argument("--export-root-path", help="Root folder path for exports (for --history and --heal)")
 
     args = parser.parse_args()
+    azure_http.configure(timeout=(10, args.timeout))
+    if args.metrics:
+        metrics.enable()
+        atexit.register(metrics.write_at_exit, args.metrics, "backfill_historical_data")
+
+    if bool(args.from_month) != bool(args.to_month) and not args.heal:
+        parser.error("--from and --to must be used together")
+    if not args.month and not args.status and not args.history and not args.from_month and not args.heal:
+        parser.error("Either --month, --from/--to, --status, --history or --heal is required")
+    if args.heal and args.fleet:
+        parser.error("--heal cannot be combined with --fleet")
+    if args.chunk_days is not None and args.chunk_days < 1:
+        parser.error("--chunk-days must be at least 1")
+    chunk_options = {
+        "chunk_days": args.chunk_days,
+        "auto_chunk": not args.no_auto_chunk,
+        "target_run_seconds": args.target_run_minutes * 60,
+    }
+
+    # Fleet mode reads credentials per entry
+    if args.fleet:
+        if not args.from_month:
+            parser.error("--fleet requires --from and --to")
+        try:
+            entries = load_fleet_file(args.fleet, FLEET_KEYS)
+            if datetime.strptime(args.from_month, "%Y-%m") > datetime.strptime(args.to_month, "%Y-%m"):
+                raise ValueError(f"--from {args.from_month} is after --to {args.to_month}")
+        except (OSError, ValueError) as e:
+            print(f"❌ Invalid fleet configuration: {e}")
+            sys.exit(1)
 
-    if not args.month and not args.status:
-        parser.error("Either --month or --status is required")
+        result = run_fleet(
+            entries, args.from_month, args.to_month,
+            max_wait=args.max_wait * 3600, max_workers=args.max_workers,
+            use_token_cache=not args.no_token_cache, chunk_options=chunk_options,
+            journal_file=args.journal, restart=args.restart,
+        )
+        sys.exit(0 if result.get("success") else 1)
 
     # Get credentials
     if args.from_terraform:
         print("📥 Reading credentials from terraform output...")
-        outputs = get_terraform_outputs()
+    try:
+        settings = resolve_settings(
+            args, from_terraform=args.from_terraform, profile=args.profile, terraform_dir=args.terraform_dir
+        )
+    except ConfigError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
 
-        required_keys = ["tenant_id", "application_id", "client_secret", "billing_scope", "export_name"]
-        missing = [k for k in required_keys if k not in outputs or not outputs[k]]
+    if args.from_terraform:
+        missing = [k for k in ("tenant_id", "client_id", "client_secret", "billing_scope", "export_name") if not settings.get(k)]
         if missing:
             print(f"❌ Missing required terraform outputs: {', '.join(missing)}")
             print("   Run 'terraform apply' first to create the export configuration.")
             sys.exit(1)
-
-        tenant_id = outputs["tenant_id"]
-        client_id = outputs["application_id"]
-        client_secret = outputs["client_secret"]
-        billing_scope = outputs["billing_scope"]
-        export_name = outputs["export_name"]
-    else:
-        if not all([args.tenant_id, args.client_id, args.billing_scope, args.export_name]):
-            parser.error("Either --from-terraform or all credential arguments are required")
-        tenant_id = args.tenant_id
-        client_id = args.client_id
-        billing_scope = args.billing_scope
-        export_name = args.export_name
-
-        # Get client secret
-        client_secret = args.client_secret
-        if not client_secret:
-            import getpass
-            client_secret = getpass.getpass("Enter Client Secret: ")
+    elif not all(settings.get(k) for k in ("tenant_id", "client_id", "billing_scope", "export_name")):
+        parser.error("Either --from-terraform, --profile or all credential arguments are required")
+
+    tenant_id = settings["tenant_id"]
+    client_id = settings["client_id"]
+    billing_scope = settings["billing_scope"]
+    export_name = settings["export_name"]
+    storage_account = settings.get("storage_account")
+    container = settings.get("container")
+    export_root_path = settings.get("export_root_path")
+
+    # Get client secret
+    client_secret = settings.get("client_secret")
+    if not client_secret:
+        import getpass
+        client_secret = getpass.getpass("Enter Client Secret: ")
 
     # Authenticate
     print("🔐 Authenticating with Azure...")
-    auth = AzureAuthenticator(tenant_id, client_id, client_secret)
+    auth = AzureAuthenticator(tenant_id, client_id, client_secret, use_cache=not args.no_token_cache)
 
     try:
         auth.get_token()
@@ -345,7 +945,7 @@ Examples:
         print(f"❌ Authentication failed: {str(e)}")
         sys.exit(1)
 
-    backfill = FocusExportBackfill(auth, billing_scope, export_name)
+    backfill = FocusExportBackfill(auth, billing_scope, export_name, **chunk_options)
 
     # Status check only
     if args.status:
@@ -388,8 +988,55 @@ Examples:
             print(f"\n   ✅ No export in progress. Ready for new export.")
         sys.exit(0)
 
+    # Run history per month, cross-checked against storage when it is known
+    if args.history:
+        error = backfill.refresh_run_history()
+        if error:
+            print(f"\n❌ Failed to get run history: {error.get('error')}")
+            sys.exit(1)
+
+        storage_months = None
+        if storage_account and container:
+            from verify_exports import list_export_months
+            storage_months = list_export_months(auth, storage_account, container, export_root_path)
+
+        ok = print_run_history(backfill.history, storage_months)
+        sys.exit(0 if ok else 1)
+
+    # Export again only what storage is missing
+    if args.heal:
+        if not storage_account or not container:
+            parser.error("--heal needs --storage-account and --container (or --from-terraform)")
+        try:
+            since = datetime.strptime(args.from_month, "%Y-%m") if args.from_month else None
+            through = None
+            if args.to_month:
+                through = datetime.strptime(args.to_month, "%Y-%m") + relativedelta(months=1) - timedelta(days=1)
+        except ValueError:
+            print(f"\n❌ Invalid month format")
+            print("   Expected format: YYYY-MM (e.g., 2024-06)")
+            sys.exit(1)
+        result = heal_export(
+            backfill, auth, storage_account, container, export_root_path,
+            since=since, through=through, dry_run=args.dry_run, max_wait=args.max_wait * 3600,
+        )
+        sys.exit(0 if result.get("success") else 1)
+
+    # Run export for a range of months
+    if args.from_month:
+        try:
+            backfill.queue_month_range(args.from_month, args.to_month)
+        except ValueError as e:
+            print(f"\n❌ Invalid month range: {e}")
+            print("   Expected format: YYYY-MM (e.g., 2024-06)")
+            sys.exit(1)
+
+        backfill.journal = open_journal(billing_scope, export_name, args.journal, args.restart)
+        result = backfill.run_month_queue(max_wait=args.max_wait * 3600)
+        sys.exit(0 if result.get("success") else 1)
+
     # Run export for single month
-    result = backfill.run_single_month(args.month)
+    result = backfill.run_single_month(args.month, max_wait=args.max_wait * 3600)
     sys.exit(0 if result.get("success") else 1)
 
 
@@ -0,0 +1,205 @@
+"""
+Append-only journal of backfill progress, so an interrupted backfill can resume.
+
+Every export window the backfill triggers is recorded with its trigger time and
+HTTP result, and later with the final status of the run it started. Records are
+JSON lines appended and synced as they happen, so a crash loses at most the
+record being written. A restarted backfill reconciles the journal with
+runHistory and skips every window whose run completed.
+
+One file can hold several exports; each record carries its billing scope and
+export name.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+from azure_auth import default_cache_path
+from run_history import ACTIVE_STATUSES, SUCCESS_STATUSES
+
+# Runs submitted this long before a recorded trigger still count as its run (clock skew)
+CLOCK_SKEW = timedelta(minutes=5)
+
+_write_lock = threading.Lock()
+
+
+def journal_path(billing_scope: str, export_name: str) -> str:
+    """Per-export journal file next to the token cache."""
+    key = hashlib.sha256(f"{billing_scope}|{export_name}".encode()).hexdigest()[:24]
+    return os.path.join(os.path.dirname(default_cache_path()), "backfill_journal", f"{key}.jsonl")
+
+
+def open_journal(billing_scope: str, export_name: str, path: str = None, restart: bool = False) -> "BackfillJournal":
+    """Load the journal for an export. `restart` forgets the progress of earlier sessions."""
+    journal = BackfillJournal(path or journal_path(billing_scope, export_name), billing_scope, export_name)
+    if restart and journal.windows:
+        journal.reset()
+    return journal
+
+
+def _parse_time(value: str):
+    try:
+        return datetime.fromisoformat(value[:19]).replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return None
+
+
+def _window_key(first_day: datetime, last_day: datetime) -> tuple:
+    return first_day.strftime("%Y-%m-%d"), last_day.strftime("%Y-%m-%d")
+
+
+class BackfillJournal:
+    """Trigger and completion state of every export window, per export."""
+
+    def __init__(self, path: str, billing_scope: str, export_name: str):
+        self.path = path
+        self.billing_scope = billing_scope
+        self.export_name = export_name
+        self.windows = {}   # (from, to) -> trigger time and HTTP result, plus its run's id, submitted time and status
+        self._torn = False  # the file ends in a line cut short by a crash
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                lines = f.readlines()
+        except OSError:
+            return
+        self._torn = bool(lines) and not lines[-1].endswith("\n")
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by a crash
+                continue
+            if record.get("scope") == self.billing_scope and record.get("export") == self.export_name:
+                self._apply(record)
+
+    def _apply(self, record: dict):
+        kind = record.get("type")
+        if kind == "reset":
+            self.windows.clear()
+            return
+        key = (record.get("from"), record.get("to"))
+        if kind == "trigger":
+            self.windows[key] = {
+                "triggered_at": record.get("at"),
+                "status_code": record.get("status_code"),
+                "success": record.get("success"),
+                "run_id": None,
+                "run_submitted": "",
+                "run_status": None,
+            }
+        elif kind == "status" and key in self.windows:
+            self.windows[key]["run_id"] = record.get("run_id")
+            self.windows[key]["run_submitted"] = record.get("submitted", "")
+            self.windows[key]["run_status"] = record.get("status")
+
+    def _append(self, record: dict):
+        record = dict(record, scope=self.billing_scope, export=self.export_name)
+        self._apply(record)
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        line = json.dumps(record) + "\n"
+        if self._torn:
+            # Start on a new line, or this record would be read back as part of the torn one
+            line = "\n" + line
+            self._torn = False
+        try:
+            with _write_lock:
+                if directory:
+                    os.makedirs(directory, mode=0o700, exist_ok=True)
+                with open(self.path, "a") as f:
+                    f.write(line)
+                    f.flush()
+                    os.fsync(f.fileno())
+        except OSError as e:
+            print(f"⚠️  Cannot write backfill journal {self.path}: {e}; this backfill will not be resumable")
+            self.path = None
+
+    def reset(self):
+        """Forget everything recorded so far for this export."""
+        self._append({"type": "reset", "at": datetime.now(timezone.utc).isoformat()})
+
+    def record_trigger(self, first_day: datetime, last_day: datetime, result: dict):
+        """Record a trigger attempt and its HTTP result."""
+        start, end = _window_key(first_day, last_day)
+        self._append({
+            "type": "trigger",
+            "from": start,
+            "to": end,
+            "at": datetime.now(timezone.utc).isoformat(),
+            "status_code": result.get("status_code"),
+            "success": bool(result.get("success")),
+        })
+
+    def record_run(self, run: dict) -> bool:
+        """Record a run's status against the journaled window it was started for.
+
+        Returns True if the run belongs to a window and its status changed.
+        """
+        key = ((run.get("start_date") or "")[:10], (run.get("end_date") or "")[:10])
+        window = self.windows.get(key)
+        if not window or not window["success"]:
+            return False
+        triggered = _parse_time(window["triggered_at"])
+        submitted = _parse_time(run.get("submitted"))
+        if not triggered or not submitted or submitted < triggered - CLOCK_SKEW:
+            return False
+        if window["run_id"] == run.get("id") and window["run_status"] == run.get("status"):
+            return False
+        # The newest run started for the window decides its state
+        if window["run_submitted"] > run.get("submitted", ""):
+            return False
+        self._append({
+            "type": "status",
+            "from": key[0],
+            "to": key[1],
+            "at": datetime.now(timezone.utc).isoformat(),
+            "run_id": run.get("id"),
+            "submitted": run.get("submitted", ""),
+            "status": run.get("status"),
+        })
+        return True
+
+    def reconcile(self, history) -> int:
+        """Update windows without a final status from a RunHistory. Returns how many changed."""
+        changed = 0
+        for (start, end), window in list(self.windows.items()):
+            if not window["success"] or window["run_status"] in SUCCESS_STATUSES:
+                continue
+            runs = [
+                run for run in history.runs_for_month(start[:7])
+                if run["start_date"][:10] == start and run["end_date"][:10] == end
+            ]
+            # Oldest first, so the newest matching run is recorded last
+            for run in reversed(runs):
+                changed += self.record_run(run)
+        return changed
+
+    def is_done(self, first_day: datetime, last_day: datetime) -> bool:
+        """True if every day of the window was covered by a completed journaled run."""
+        if first_day > last_day:
+            return False
+        remaining = set()
+        day = first_day.date() if isinstance(first_day, datetime) else first_day
+        end = last_day.date() if isinstance(last_day, datetime) else last_day
+        while day <= end:
+            remaining.add(day.isoformat())
+            day += timedelta(days=1)
+        for (start, stop), window in self.windows.items():
+            if window["run_status"] not in SUCCESS_STATUSES:
+                continue
+            remaining = {d for d in remaining if not (start <= d <= stop)}
+            if not remaining:
+                return True
+        return not remaining
+
+    def is_pending(self, first_day: datetime, last_day: datetime) -> bool:
+        """True if the window was triggered but its run has not finished (or was never seen)."""
+        window = self.windows.get(_window_key(first_day, last_day))
+        return bool(window and window["success"] and (window["run_status"] is None or window["run_status"] in ACTIVE_STATUSES))
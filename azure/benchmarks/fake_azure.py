@@ -0,0 +1,419 @@
+"""
+Local stand-in for the Azure endpoints used by the DigiUsher scripts.
+
+Emulates just enough of Azure AD, ARM and Blob storage to drive the scripts
+end to end without a tenant:
+
+  POST {login}/{tenant}/oauth2/v2.0/token                  client credentials
+  GET  {arm}{scope}/providers/Microsoft.CostManagement/exports/{name}   ETag / If-None-Match
+  GET  {arm}{scope}/providers/Microsoft.CostManagement/exports/{name}/runHistory
+  POST {arm}{scope}/providers/Microsoft.CostManagement/exports/{name}/run
+  GET  {blob}/{container}?restype=container&comp=list      paged List Blobs
+  GET  {blob}/{container}/{name}                           Range / If-Match
+
+Blobs are never materialized: the container holds `blob_count` names laid out as
+{root}/{export}/YYYYMMDD-YYYYMMDD/{run}/part_NNNNNNN.parquet, derived from their
+index, so listings of several million blobs cost no memory here. Blob content is
+generated from the index when downloaded; with content_md5=True listings also
+carry each blob's Content-MD5, which costs generating the content once per blob. Latency and
+throttling (429 with Retry-After) are injected per request.
+
+Point the scripts at it with the variables returned by FakeAzure.environment().
+"""
+
+import base64
+import bisect
+import calendar
+import functools
+import hashlib
+import json
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+from xml.sax.saxutils import escape
+
+EXPORTS_SEGMENT = "/providers/Microsoft.CostManagement/exports/"
+
+
+def _month_start(first: datetime, offset: int) -> datetime:
+    year, month = divmod(first.month - 1 + offset, 12)
+    return datetime(first.year + year, month + 1, 1, tzinfo=timezone.utc)
+
+
+def _iso(value: datetime) -> str:
+    return value.strftime("%Y-%m-%dT%H:%M:%S.%f") + "0Z"
+
+
+class FakeAzure:
+    """Configurable fake of the token, Cost Management export and Blob List APIs."""
+
+    def __init__(
+        self,
+        blob_count: int = 10000,
+        months: int = 36,
+        first_month: str = "2023-01",
+        page_size: int = 5000,
+        latency: float = 0.0,
+        throttle_every: int = 0,
+        retry_after: float = 0,
+        run_seconds: float = 2.0,
+        arm_quota: int = 0,
+        arm_refill: float = 25.0,
+        export_root_path: str = "focus",
+        export_name: str = "focus-export",
+        content_md5: bool = False,
+    ):
+        self.page_size = page_size
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.run_seconds = run_seconds
+        # ARM-style token bucket per server; 0 disables it
+        self.arm_quota = arm_quota
+        self.arm_refill = arm_refill
+        self.arm_remaining = float(arm_quota)
+        self.arm_updated = time.monotonic()
+        self.export_name = export_name
+        self.content_md5 = content_md5
+
+        # Month m holds blobs [offsets[m], offsets[m + 1])
+        first = datetime.strptime(first_month, "%Y-%m")
+        base = f"{export_root_path.strip('/')}/{export_name}/" if export_root_path else f"{export_name}/"
+        self.month_paths = []
+        self.month_modified = []
+        self.offsets = [0]
+        per_month, extra = divmod(blob_count, months)
+        for m in range(months):
+            start = _month_start(first, m)
+            last_day = calendar.monthrange(start.year, start.month)[1]
+            period = f"{start:%Y%m%d}-{start:%Y%m}{last_day:02d}"
+            self.month_paths.append(f"{base}{period}/run-{m:04d}/")
+            modified = start.replace(day=last_day) + timedelta(days=2)
+            self.month_modified.append(modified.strftime("%a, %d %b %Y %H:%M:%S GMT"))
+            self.offsets.append(self.offsets[-1] + per_month + (1 if m < extra else 0))
+
+        self.runs = []
+        self.stats = {"requests": 0, "throttled": 0, "token": 0, "arm": 0, "blob_list": 0, "blob_get": 0, "run_history": 0}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    # Blob namespace
+
+    @property
+    def blob_count(self) -> int:
+        return self.offsets[-1]
+
+    def blob_name(self, index: int) -> str:
+        m = bisect.bisect_right(self.offsets, index) - 1
+        return f"{self.month_paths[m]}part_{index - self.offsets[m]:07d}.parquet"
+
+    def blob_index(self, name: str):
+        """Index of the blob called `name`, or None if there is no such blob."""
+        for m, path in enumerate(self.month_paths):
+            if name.startswith(path):
+                try:
+                    index = self.offsets[m] + int(name[len(path):].split("_", 1)[1].split(".", 1)[0])
+                except (IndexError, ValueError):
+                    return None
+                return index if index < self.offsets[m + 1] and self.blob_name(index) == name else None
+        return None
+
+    def blob_size(self, index: int) -> int:
+        return 1048576 + (index * 7919) % 1000000
+
+    def blob_etag(self, index: int) -> str:
+        return f"0x8DC{index:013X}"
+
+    def blob_content(self, index: int) -> bytes:
+        seed = hashlib.sha256(str(index).encode()).digest()
+        size = self.blob_size(index)
+        return (seed * (size // len(seed) + 1))[:size]
+
+    @functools.lru_cache(maxsize=65536)
+    def blob_md5(self, index: int) -> str:
+        return base64.b64encode(hashlib.md5(self.blob_content(index)).digest()).decode()
+
+    def _blob_xml(self, index: int) -> str:
+        m = bisect.bisect_right(self.offsets, index) - 1
+        name = f"{self.month_paths[m]}part_{index - self.offsets[m]:07d}.parquet"
+        md5 = f"<Content-MD5>{self.blob_md5(index)}</Content-MD5>" if self.content_md5 else ""
+        return (
+            f"<Blob><Name>{escape(name)}</Name><Properties>"
+            f"<Last-Modified>{self.month_modified[m]}</Last-Modified>"
+            f"<Etag>{self.blob_etag(index)}</Etag>"
+            f"<Content-Length>{self.blob_size(index)}</Content-Length>"
+            f"{md5}"
+            f"<BlobType>BlockBlob</BlobType>"
+            f"</Properties></Blob>"
+        )
+
+    def _matching_range(self, prefix: str):
+        """Index range [lo, hi) of blobs whose names start with `prefix`."""
+        lo = hi = None
+        for m, path in enumerate(self.month_paths):
+            if path.startswith(prefix):
+                start, end = self.offsets[m], self.offsets[m + 1]
+            elif prefix.startswith(path):
+                # Prefix inside a run folder: narrow down by file name
+                matches = [
+                    i for i in range(self.offsets[m], self.offsets[m + 1])
+                    if self.blob_name(i).startswith(prefix)
+                ]
+                if not matches:
+                    continue
+                start, end = matches[0], matches[-1] + 1
+            else:
+                continue
+            lo = start if lo is None else lo
+            hi = end
+        return (lo, hi) if lo is not None else (0, 0)
+
+    def list_page(self, prefix: str, delimiter: str, marker: str, max_results: int) -> str:
+        page_size = min(max_results or self.page_size, self.page_size)
+        items = []
+        next_marker = ""
+
+        if delimiter:
+            # Folder listings are small here (one entry per month at most), so no paging
+            seen = set()
+            for m, path in enumerate(self.month_paths):
+                if path.startswith(prefix) and path != prefix:
+                    folder = path[:path.find(delimiter, len(prefix)) + 1]
+                    if folder not in seen:
+                        seen.add(folder)
+                        items.append(f"<BlobPrefix><Name>{escape(folder)}</Name></BlobPrefix>")
+                elif prefix.startswith(path):
+                    # Blobs sit directly in the run folders
+                    items.extend(
+                        self._blob_xml(i) for i in range(self.offsets[m], self.offsets[m + 1])
+                        if self.blob_name(i).startswith(prefix)
+                    )
+        else:
+            lo, hi = self._matching_range(prefix)
+            start = max(lo, int(marker)) if marker else lo
+            end = min(hi, start + page_size)
+            items = [self._blob_xml(i) for i in range(start, end)]
+            if end < hi:
+                next_marker = str(end)
+
+        return (
+            '<?xml version="1.0" encoding="utf-8"?>'
+            f'<EnumerationResults ServiceEndpoint="http://127.0.0.1/" ContainerName="exports">'
+            f"<Prefix>{escape(prefix)}</Prefix><Blobs>{''.join(items)}</Blobs>"
+            f"<NextMarker>{next_marker}</NextMarker></EnumerationResults>"
+        )
+
+    # Export runs
+
+    def _run_json(self, run: dict, now: float) -> dict:
+        elapsed = now - run["created"]
+        submitted = datetime.fromtimestamp(run["created"], timezone.utc)
+        props = {
+            "executionType": "OnDemand",
+            "submittedTime": _iso(submitted),
+            "processingStartTime": "0001-01-01T00:00:00",
+            "processingEndTime": "0001-01-01T00:00:00",
+            "startDate": run["from"],
+            "endDate": run["to"],
+            "fileName": "",
+        }
+        if elapsed < self.run_seconds * 0.2:
+            props["status"] = "Queued"
+        else:
+            props["processingStartTime"] = _iso(submitted + timedelta(seconds=self.run_seconds * 0.2))
+            if elapsed < self.run_seconds:
+                props["status"] = "InProgress"
+            else:
+                props["status"] = "Completed"
+                props["processingEndTime"] = _iso(submitted + timedelta(seconds=self.run_seconds))
+                props["fileName"] = f"{self.export_name}/{run['id']}"
+        return {"id": run["id"], "name": run["id"], "properties": props}
+
+    def run_history(self, limit: int = None) -> list:
+        now = time.time()
+        with self._lock:
+            runs = list(self.runs)
+        runs = [self._run_json(run, now) for run in reversed(runs)]
+        return runs[:limit] if limit else runs
+
+    def trigger_run(self, payload: dict):
+        period = payload.get("timePeriod", {})
+        run = {
+            "id": str(uuid.uuid4()),
+            "created": time.time(),
+            "from": period.get("from", ""),
+            "to": period.get("to", ""),
+        }
+        with self._lock:
+            self.runs.append(run)
+
+    # Server lifecycle
+
+    def start(self, host: str = "127.0.0.1", port: int = 0):
+        self._server = _Server((host, port), _Handler)
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def environment(self) -> dict:
+        """Environment variables that point the scripts at this server."""
+        return {
+            "AZURE_AUTHORITY_HOST": f"{self.url}/login",
+            "DIGIUSHER_ARM_ENDPOINT": f"{self.url}/arm",
+            "DIGIUSHER_BLOB_ENDPOINT": f"{self.url}/blob/{{account}}",
+        }
+
+    def take_arm_quota(self):
+        """Remaining ARM reads after this request, or None when the quota is exhausted."""
+        with self._lock:
+            now = time.monotonic()
+            self.arm_remaining = min(self.arm_quota, self.arm_remaining + (now - self.arm_updated) * self.arm_refill)
+            self.arm_updated = now
+            if self.arm_remaining < 1:
+                self.stats["throttled"] += 1
+                return None
+            self.arm_remaining -= 1
+            return int(self.arm_remaining)
+
+    def count(self, key: str):
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats[key] += 1
+            throttle = self.throttle_every and self.stats["requests"] % self.throttle_every == 0
+            if throttle:
+                self.stats["throttled"] += 1
+        return throttle
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients closing keep-alive connections at exit are expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body, content_type: str = "application/json", headers: dict = None):
+        data = body if isinstance(body, bytes) else body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _route(self, method: str):
+        fake = self.server.fake
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        body = self._read_body()
+
+        if url.path.startswith("/login/"):
+            kind = "token"
+        elif url.path.startswith("/arm/"):
+            kind = "arm"
+        elif url.path.startswith("/blob/"):
+            kind = "blob_list" if query.get("comp") == "list" else "blob_get"
+        else:
+            return self._send(404, '{"error": "not found"}')
+
+        if fake.latency:
+            time.sleep(fake.latency)
+        if fake.count(kind):
+            return self._send(429, '{"error": {"code": "TooManyRequests"}}', headers={"Retry-After": str(fake.retry_after)})
+
+        if kind == "token":
+            return self._send(200, json.dumps({"token_type": "Bearer", "expires_in": 3600, "access_token": "fake-token"}))
+
+        arm_headers = {}
+        if kind == "arm" and fake.arm_quota:
+            remaining = fake.take_arm_quota()
+            if remaining is None:
+                return self._send(429, '{"error": {"code": "TooManyRequests"}}', headers={"Retry-After": "1"})
+            arm_headers["x-ms-ratelimit-remaining-tenant-reads"] = str(remaining)
+
+        if kind == "arm":
+            path = url.path[len("/arm"):]
+            if EXPORTS_SEGMENT not in path:
+                return self._send(404, '{"error": {"code": "NotFound"}}')
+            rest = path.split(EXPORTS_SEGMENT, 1)[1].split("/")
+            if method == "POST" and rest[1:] == ["run"]:
+                fake.trigger_run(json.loads(body or b"{}"))
+                return self._send(200, "", headers=arm_headers)
+            if method == "GET" and rest[1:] == ["runHistory"]:
+                with fake._lock:
+                    fake.stats["run_history"] += 1
+                return self._send(200, json.dumps({"value": fake.run_history()}), headers=arm_headers)
+            if method == "GET" and len(rest) == 1:
+                export = {"name": rest[0], "properties": {}}
+                if query.get("$expand") == "runHistory":
+                    export["properties"]["runHistory"] = {"value": fake.run_history(limit=10)}
+                body = json.dumps(export)
+                arm_headers["ETag"] = '"' + hashlib.sha256(body.encode()).hexdigest()[:16] + '"'
+                if self.headers.get("If-None-Match") == arm_headers["ETag"]:
+                    return self._send(304, "", headers=arm_headers)
+                return self._send(200, body, headers=arm_headers)
+            return self._send(404, '{"error": {"code": "NotFound"}}')
+
+        if method == "GET" and query.get("comp") == "list":
+            page = fake.list_page(
+                query.get("prefix", ""), query.get("delimiter", ""),
+                query.get("marker", ""), int(query.get("maxresults", 0)),
+            )
+            return self._send(200, page, content_type="application/xml")
+        if method == "GET" and kind == "blob_get":
+            return self._send_blob(fake, unquote(url.path).split("/", 4)[-1])
+        return self._send(404, "<Error><Code>BlobNotFound</Code></Error>", content_type="application/xml")
+
+    def _send_blob(self, fake: FakeAzure, name: str):
+        index = fake.blob_index(name)
+        if index is None:
+            return self._send(404, "<Error><Code>BlobNotFound</Code></Error>", content_type="application/xml")
+        headers = {"ETag": fake.blob_etag(index)}
+        if self.headers.get("If-Match") not in (None, "*", headers["ETag"]):
+            return self._send(412, "<Error><Code>ConditionNotMet</Code></Error>", content_type="application/xml")
+        content = fake.blob_content(index)
+        requested = self.headers.get("Range") or self.headers.get("x-ms-range")
+        if not requested:
+            return self._send(200, content, content_type="application/octet-stream", headers=headers)
+        start, _, end = requested.split("=", 1)[1].partition("-")
+        start, end = int(start), min(int(end) if end else len(content) - 1, len(content) - 1)
+        if start >= len(content):
+            return self._send(416, "<Error><Code>InvalidRange</Code></Error>", content_type="application/xml")
+        headers["Content-Range"] = f"bytes {start}-{end}/{len(content)}"
+        return self._send(206, content[start:end + 1], content_type="application/octet-stream", headers=headers)
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
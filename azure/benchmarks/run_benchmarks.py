@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Benchmark verify_exports.py and backfill_historical_data.py against a local fake Azure.
+
+Each scenario runs the real script in a child process, pointed at the fake
+server from fake_azure.py, and reports wall-clock time, throughput and the
+child's peak RSS. Nothing here talks to Azure.
+
+Usage:
+  python3 benchmarks/run_benchmarks.py
+  python3 benchmarks/run_benchmarks.py --blob-counts 1000,100000,2000000 --latency-ms 20
+  python3 benchmarks/run_benchmarks.py --throttle-every 50 --json results.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from fake_azure import FakeAzure
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CREDENTIALS = ["--tenant-id", "bench-tenant", "--client-id", "bench-client", "--client-secret", "bench-secret"]
+
+# Runs the backfill with its polling schedule shrunk to match the fake run duration
+BACKFILL_RUNNER = """
+import sys
+import backfill_historical_data as backfill
+scale = float(sys.argv.pop(1))
+cls = backfill.FocusExportBackfill
+cls.POLL_INITIAL_INTERVAL *= scale
+cls.POLL_MAX_INTERVAL *= scale
+backfill.main()
+"""
+
+
+def run_child(command: list, env: dict) -> dict:
+    """Run a script to completion and return its wall time, peak RSS and exit code."""
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=SCRIPTS_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output = process.stdout.read()
+    _pid, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - started
+    process.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak_rss = usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    return {
+        "exit_code": process.returncode,
+        "wall_seconds": elapsed,
+        "cpu_seconds": usage.ru_utime + usage.ru_stime,
+        "peak_rss_mb": peak_rss / (1024 * 1024),
+        "output": output.decode(errors="replace"),
+    }
+
+
+def child_env(fake: FakeAzure, workdir: str) -> dict:
+    env = dict(os.environ)
+    env.update(fake.environment())
+    env["DIGIUSHER_TOKEN_CACHE"] = os.path.join(workdir, "tokens.json")
+    env["PYTHONUNBUFFERED"] = "1"
+    return env
+
+
+def bench_verify(args, blob_count: int, mode: str, workdir: str) -> dict:
+    fake = FakeAzure(
+        blob_count=blob_count, months=args.months, page_size=args.page_size,
+        latency=args.latency_ms / 1000, throttle_every=args.throttle_every,
+    ).start()
+    try:
+        command = [
+            sys.executable, "verify_exports.py", *CREDENTIALS, "--no-token-cache",
+            "--storage-account", "bench", "--container", "exports", "--export-root-path", "focus",
+        ]
+        if mode == "parallel":
+            command += ["--parallel", "--max-workers", str(args.max_workers)]
+        result = run_child(command, child_env(fake, workdir))
+    finally:
+        fake.stop()
+
+    result.update({
+        "scenario": f"verify:{mode}",
+        "size": blob_count,
+        "throughput": blob_count / result["wall_seconds"],
+        "unit": "blobs/s",
+        "requests": fake.stats["requests"],
+        "throttled": fake.stats["throttled"],
+    })
+    if f"Found {blob_count} blobs" not in result["output"] and mode == "flat":
+        result["exit_code"] = result["exit_code"] or 1
+    return result
+
+
+def bench_backfill(args, workdir: str) -> dict:
+    fake = FakeAzure(
+        blob_count=0, months=1, latency=args.latency_ms / 1000,
+        throttle_every=args.throttle_every, run_seconds=args.run_seconds,
+        arm_quota=args.arm_quota,
+    ).start()
+    months = args.backfill_months
+    first, last = "2024-01", f"{2024 + (months - 1) // 12}-{(months - 1) % 12 + 1:02d}"
+    # Scale polling so a fake run of run_seconds takes a handful of polls, as a real one would
+    scale = args.run_seconds / 60
+    try:
+        command = [
+            sys.executable, "-c", BACKFILL_RUNNER, str(scale), *CREDENTIALS, "--no-token-cache",
+            "--billing-scope", "/providers/Microsoft.Billing/billingAccounts/bench",
+            "--export-name", fake.export_name, "--from", first, "--to", last,
+        ]
+        result = run_child(command, child_env(fake, workdir))
+    finally:
+        fake.stop()
+
+    result.update({
+        "scenario": "backfill:range",
+        "size": months,
+        "throughput": months / result["wall_seconds"],
+        "unit": "months/s",
+        "requests": fake.stats["requests"],
+        "throttled": fake.stats["throttled"],
+    })
+    return result
+
+
+def print_results(results: list):
+    print(f"\n{'Scenario':<18} {'Size':>10} {'Wall (s)':>10} {'CPU (s)':>9} {'Throughput':>18} {'Peak RSS':>10} {'Requests':>9} {'429s':>6}  Exit")
+    print(f"{'-'*18} {'-'*10} {'-'*10} {'-'*9} {'-'*18} {'-'*10} {'-'*9} {'-'*6}  {'-'*4}")
+    for r in results:
+        throughput = f"{r['throughput']:,.1f} {r['unit']}"
+        print(
+            f"{r['scenario']:<18} {r['size']:>10,} {r['wall_seconds']:>10.2f} {r['cpu_seconds']:>9.2f} "
+            f"{throughput:>18} {r['peak_rss_mb']:>7.1f} MB {r['requests']:>9,} {r['throttled']:>6}  {r['exit_code']}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the export scripts against a local fake Azure")
+    parser.add_argument(
+        "--blob-counts", default="1000,10000,100000",
+        help="Comma-separated container sizes to list (default: 1000,10000,100000)",
+    )
+    parser.add_argument(
+        "--modes", default="flat,parallel",
+        help="verify_exports.py listing modes to run: flat, parallel (default: both)",
+    )
+    parser.add_argument("--months", type=int, default=36, help="Period folders the blobs are spread over (default: 36)")
+    parser.add_argument("--page-size", type=int, default=5000, help="Blobs per List Blobs page (default: 5000)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Latency added to every request (default: 0)")
+    parser.add_argument(
+        "--throttle-every", type=int, default=0,
+        help="Answer every Nth request with 429 Too Many Requests (default: never)",
+    )
+    parser.add_argument(
+        "--arm-quota", type=int, default=0,
+        help="Emulate an ARM read quota of this many requests refilled at 25/s, with "
+             "x-ms-ratelimit-remaining-tenant-reads headers (default: off)",
+    )
+    parser.add_argument("--max-workers", type=int, default=8, help="Workers for --parallel listing (default: 8)")
+    parser.add_argument(
+        "--backfill-months", type=int, default=3,
+        help="Months to backfill in the polling benchmark, 0 to skip (default: 3)",
+    )
+    parser.add_argument("--run-seconds", type=float, default=2, help="Duration of each fake export run (default: 2)")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Print the output of each script run")
+    args = parser.parse_args()
+
+    blob_counts = [int(c) for c in args.blob_counts.split(",") if c]
+    modes = [m for m in args.modes.split(",") if m]
+    results = []
+
+    with tempfile.TemporaryDirectory(prefix="digiusher-bench-") as workdir:
+        for blob_count in blob_counts:
+            for mode in modes:
+                print(f"⏱️  verify_exports.py ({mode}) with {blob_count:,} blobs...", flush=True)
+                results.append(bench_verify(args, blob_count, mode, workdir))
+        if args.backfill_months:
+            print(f"⏱️  backfill_historical_data.py with {args.backfill_months} month(s)...", flush=True)
+            results.append(bench_backfill(args, workdir))
+
+    if args.verbose:
+        for r in results:
+            print(f"\n--- {r['scenario']} ({r['size']:,}) ---\n{r['output']}")
+
+    print_results(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([{k: v for k, v in r.items() if k != "output"} for r in results], f, indent=2)
+        print(f"\n   Results written to {args.json}")
+
+    failed = [r for r in results if r["exit_code"] != 0]
+    if failed:
+        print(f"\n❌ {len(failed)} scenario(s) exited with an error (use --verbose to see their output)")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
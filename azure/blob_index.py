@@ -0,0 +1,198 @@
+"""
+Local SQLite index of export blobs, used for incremental verification.
+
+The index stores name, size, Last-Modified and ETag for every blob, grouped by
+period folder (YYYYMMDD-YYYYMMDD/). verify_exports.py re-lists only the period
+folders that may have changed since the last sync and reads the rest from here.
+Periods still settling are always re-listed. Settled periods are re-listed when
+a delimiter listing shows run folders that differ from the index, as when a
+backfill re-exports an old month.
+With --change-feed the index is instead kept current from Blob change feed
+events, and the position in the feed is stored alongside it.
+"""
+
+import os
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+# A period keeps receiving data for a few days after it ends (month-end close),
+# so it is re-listed until this many days past its end date
+SETTLE_DAYS = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prefixes (
+    account TEXT NOT NULL,
+    container TEXT NOT NULL,
+    prefix TEXT NOT NULL,
+    synced_at TEXT NOT NULL,
+    PRIMARY KEY (account, container, prefix)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    account TEXT NOT NULL,
+    container TEXT NOT NULL,
+    prefix TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    modified TEXT NOT NULL,
+    etag TEXT NOT NULL,
+    PRIMARY KEY (account, container, name)
+);
+CREATE INDEX IF NOT EXISTS blobs_by_prefix ON blobs (account, container, prefix);
+CREATE TABLE IF NOT EXISTS change_feed (
+    account TEXT NOT NULL,
+    container TEXT NOT NULL,
+    cursor TEXT NOT NULL,
+    PRIMARY KEY (account, container)
+);
+"""
+
+
+def period_end_date(prefix: str):
+    """End date of a YYYYMMDD-YYYYMMDD/ period folder, or None if it is not one."""
+    folder = prefix.rstrip("/").rsplit("/", 1)[-1]
+    try:
+        return datetime.strptime(folder.split("-")[1], "%Y%m%d").date()
+    except (IndexError, ValueError):
+        return None
+
+
+def period_child(prefix: str, name: str) -> str:
+    """The run folder (or the blob itself) directly under `prefix` that holds `name`."""
+    rest = name[len(prefix):]
+    return prefix + rest.split("/", 1)[0] + "/" if "/" in rest else name
+
+
+class BlobIndex:
+    """Persistent per-container record of listed blobs."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def synced_prefixes(self, account: str, container: str) -> dict:
+        """Map of indexed prefix -> ISO timestamp of its last sync."""
+        rows = self.conn.execute(
+            "SELECT prefix, synced_at FROM prefixes WHERE account = ? AND container = ?",
+            (account, container),
+        )
+        return dict(rows)
+
+    def stale_prefixes(self, account: str, container: str, prefixes: list, now: datetime = None) -> list:
+        """Return the prefixes that must be listed again.
+
+        A prefix is stale if it was never indexed, or if its period had not yet
+        settled when it was last synced (the current period is always stale).
+        """
+        synced = self.synced_prefixes(account, container)
+        now = now or datetime.now(timezone.utc)
+        stale = []
+        for prefix in prefixes:
+            synced_at = synced.get(prefix)
+            end = period_end_date(prefix)
+            if synced_at is None or end is None:
+                stale.append(prefix)
+                continue
+            settled_on = end + timedelta(days=SETTLE_DAYS)
+            if datetime.fromisoformat(synced_at).date() <= settled_on:
+                stale.append(prefix)
+        return stale
+
+    def period_children(self, account: str, container: str, prefix: str) -> set:
+        """Run folders (and blobs directly) under an indexed prefix, as a delimiter listing names them."""
+        rows = self.conn.execute(
+            "SELECT name FROM blobs WHERE account = ? AND container = ? AND prefix = ?",
+            (account, container, prefix),
+        )
+        return {period_child(prefix, name) for (name,) in rows}
+
+    def replace_prefix(self, account: str, container: str, prefix: str, blobs, synced_at: str):
+        """Replace everything indexed under `prefix` with a fresh listing."""
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM blobs WHERE account = ? AND container = ? AND prefix = ?",
+                (account, container, prefix),
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO blobs (account, container, prefix, name, size, modified, etag) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (account, container, prefix, b["name"], b.get("size", 0), b.get("modified", ""), b.get("etag", ""))
+                    for b in blobs
+                ),
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO prefixes (account, container, prefix, synced_at) VALUES (?, ?, ?, ?)",
+                (account, container, prefix, synced_at),
+            )
+
+    def drop_prefixes(self, account: str, container: str, prefixes):
+        """Forget prefixes that no longer exist in storage."""
+        with self.conn:
+            for prefix in prefixes:
+                self.conn.execute(
+                    "DELETE FROM blobs WHERE account = ? AND container = ? AND prefix = ?",
+                    (account, container, prefix),
+                )
+                self.conn.execute(
+                    "DELETE FROM prefixes WHERE account = ? AND container = ? AND prefix = ?",
+                    (account, container, prefix),
+                )
+
+    def change_feed_cursor(self, account: str, container: str):
+        """Last change feed segment applied to the index, or None before the first sync."""
+        row = self.conn.execute(
+            "SELECT cursor FROM change_feed WHERE account = ? AND container = ?",
+            (account, container),
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_change_feed_cursor(self, account: str, container: str, cursor: str):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO change_feed (account, container, cursor) VALUES (?, ?, ?)",
+                (account, container, cursor),
+            )
+
+    def apply_changes(self, account: str, container: str, changes: list, cursor: str, synced_at: str):
+        """Apply one segment of change feed events and move the cursor past it, atomically.
+
+        Each change is a change_feed event with the blob's period `prefix` added.
+        """
+        with self.conn:
+            for change in changes:
+                if change["type"] == "deleted":
+                    self.conn.execute(
+                        "DELETE FROM blobs WHERE account = ? AND container = ? AND name = ?",
+                        (account, container, change["name"]),
+                    )
+                    continue
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO blobs (account, container, prefix, name, size, modified, etag) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (account, container, change["prefix"], change["name"], change["size"], change["modified"], change["etag"]),
+                )
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO prefixes (account, container, prefix, synced_at) VALUES (?, ?, ?, ?)",
+                    (account, container, change["prefix"], synced_at),
+                )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO change_feed (account, container, cursor) VALUES (?, ?, ?)",
+                (account, container, cursor),
+            )
+
+    def iter_blobs(self, account: str, container: str, prefixes: list):
+        """Yield indexed blobs under the given prefixes, in the list_blobs_rest format."""
+        for prefix in prefixes:
+            rows = self.conn.execute(
+                "SELECT name, size, modified, etag FROM blobs "
+                "WHERE account = ? AND container = ? AND prefix = ?",
+                (account, container, prefix),
+            )
+            for name, size, modified, etag in rows:
+                yield {"name": name, "size": size, "modified": modified, "etag": etag}
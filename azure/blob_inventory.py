@@ -0,0 +1,131 @@
+"""
+Readers for Azure Blob Inventory reports.
+
+An inventory rule writes a daily or weekly snapshot of every blob in a container
+as CSV or Parquet files, plus a {rule}-manifest.json naming those files. These
+readers stream the reports and yield blobs in the same format as
+verify_exports.list_blobs_rest, so the month summary can be built without listing
+the container.
+"""
+
+import csv
+import glob
+import io
+import json
+import os
+from datetime import datetime, timezone
+
+INVENTORY_COLUMNS = ["Name", "Last-Modified", "Etag", "Content-Length"]
+
+
+def http_date(value: str) -> str:
+    """Convert an inventory ISO timestamp to the RFC 1123 form used by List Blobs."""
+    if not value or value[0].isalpha():
+        return value or ""
+    try:
+        # Inventory timestamps carry 7 fractional digits, more than fromisoformat accepts
+        parsed = datetime.strptime(value[:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc)
+    except ValueError:
+        return value
+    return parsed.strftime("%a, %d %b %Y %H:%M:%S GMT")
+
+
+def parse_manifest(manifest: dict) -> dict:
+    """Extract the report files, format and snapshot time from an inventory manifest."""
+    files = [f["blob"] for f in manifest.get("files", []) if f.get("blob")]
+    completed = manifest.get("inventoryCompletionTime") or manifest.get("inventoryStartTime")
+    snapshot = None
+    if completed:
+        snapshot = datetime.strptime(completed[:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc)
+    file_format = "parquet" if any(name.endswith(".parquet") for name in files) else "csv"
+    return {"files": files, "format": file_format, "snapshot": snapshot}
+
+
+def find_local_manifest(report_path: str):
+    """Parsed manifest of a downloaded report, if a {rule}-manifest.json naming it sits next to it."""
+    name = os.path.basename(report_path)
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(report_path) or ".", "*-manifest.json"))):
+        try:
+            with open(path) as f:
+                manifest = parse_manifest(json.load(f))
+        except (OSError, ValueError, AttributeError):
+            continue
+        if any(os.path.basename(f) == name for f in manifest["files"]):
+            return manifest
+    return None
+
+
+def _blob_from_row(name, modified, etag, length) -> dict:
+    return {
+        "name": name or "",
+        "size": int(length) if length not in (None, "") else 0,
+        "modified": http_date(modified if isinstance(modified, str) else _format_timestamp(modified)),
+        "etag": etag or "",
+    }
+
+
+def _format_timestamp(value) -> str:
+    # Parquet reports store Last-Modified as a timestamp column
+    if value is None:
+        return ""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def iter_inventory_csv(lines, prefix: str = ""):
+    """Stream blobs from CSV report lines (an open text file or decoded line iterator)."""
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if not header:
+        return
+    missing = [c for c in INVENTORY_COLUMNS if c not in header]
+    if missing:
+        raise ValueError(f"inventory report is missing columns: {', '.join(missing)}")
+    positions = [header.index(c) for c in INVENTORY_COLUMNS]
+
+    for row in reader:
+        name, modified, etag, length = (row[i] for i in positions)
+        if prefix and not name.startswith(prefix):
+            continue
+        yield _blob_from_row(name, modified, etag, length)
+
+
+def iter_inventory_parquet(source, prefix: str = "", batch_size: int = 65536):
+    """Stream blobs from a Parquet report one record batch at a time.
+
+    `source` is a path or a seekable binary file. Requires pyarrow.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet inventory reports require pyarrow (pip install pyarrow)")
+
+    report = pq.ParquetFile(source)
+    missing = [c for c in INVENTORY_COLUMNS if c not in report.schema_arrow.names]
+    if missing:
+        raise ValueError(f"inventory report is missing columns: {', '.join(missing)}")
+
+    for batch in report.iter_batches(batch_size=batch_size, columns=INVENTORY_COLUMNS):
+        columns = [_python_values(pa, batch.column(c)) for c in INVENTORY_COLUMNS]
+        for name, modified, etag, length in zip(*columns):
+            if prefix and not (name or "").startswith(prefix):
+                continue
+            yield _blob_from_row(name, modified, etag, length)
+
+
+def _python_values(pa, column) -> list:
+    # datetime has microsecond precision; nanosecond timestamps would not convert
+    if pa.types.is_timestamp(column.type) and column.type.unit == "ns":
+        column = column.cast(pa.timestamp("us", column.type.tz), safe=False)
+    return column.to_pylist()
+
+
+def iter_inventory_file(path: str, prefix: str = ""):
+    """Stream blobs from a local CSV or Parquet report."""
+    if path.endswith(".parquet"):
+        yield from iter_inventory_parquet(path, prefix)
+    else:
+        with io.open(path, newline="", encoding="utf-8") as f:
+            yield from iter_inventory_csv(f, prefix)
@@ -0,0 +1,183 @@
+"""
+Incremental discovery of export files from the Blob change feed.
+
+With change feed enabled on the storage account, every blob create and delete
+is logged as Avro records in the $blobchangefeed container:
+
+  meta/segments.json                        lastConsumable: newest fully written segment
+  idx/segments/YYYY/MM/DD/hhmm/meta.json    one segment per hour, listing its chunk folders
+  log/NN/YYYY/MM/DD/hhmm/NNNNNN.avro         the events, one chunk folder per shard
+
+ChangeFeedReader reads the finished segments after a saved cursor and yields the
+create and delete events for one container, so discovering new export files
+costs a few small reads per hour of storage activity instead of a listing of
+the whole export path. A local copy of $blobchangefeed (same layout) can be
+read instead of the storage account. Reading Avro requires fastavro.
+"""
+
+import io
+import json
+import os
+from datetime import date, datetime, timedelta
+from email.utils import format_datetime
+
+CHANGE_FEED_CONTAINER = "$blobchangefeed"
+SEGMENTS_META = "meta/segments.json"
+SEGMENTS_PREFIX = "idx/segments/"
+
+# Event types that change which blobs exist; property and tier updates are ignored
+EVENT_TYPES = {"BlobCreated": "created", "BlobDeleted": "deleted"}
+
+
+def _require_fastavro():
+    try:
+        import fastavro  # noqa: F401
+    except ImportError:
+        raise RuntimeError("Change feed discovery requires fastavro (pip install fastavro)")
+
+
+class RemoteChangeFeed:
+    """The $blobchangefeed container of a storage account.
+
+    `list_blobs` and `get_blob` are verify_exports' functions of the same name,
+    passed in so their errors are the caller's BlobListingError even when
+    verify_exports runs as a script.
+    """
+
+    def __init__(self, auth, storage_account: str, list_blobs, get_blob):
+        self.auth = auth
+        self.storage_account = storage_account
+        self.list_blobs = list_blobs
+        self.get_blob = get_blob
+
+    def list(self, prefix: str) -> list:
+        return sorted(
+            blob["name"] for blob in self.list_blobs(self.auth, self.storage_account, CHANGE_FEED_CONTAINER, prefix=prefix)
+        )
+
+    def read(self, name: str) -> bytes:
+        return self.get_blob(self.auth, self.storage_account, CHANGE_FEED_CONTAINER, name).content
+
+
+class LocalChangeFeed:
+    """A local directory laid out like $blobchangefeed, e.g. a downloaded copy or test fixtures."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def list(self, prefix: str) -> list:
+        base = os.path.join(self.root, os.path.dirname(prefix))
+        names = []
+        for directory, _, files in os.walk(base):
+            for file in files:
+                name = os.path.relpath(os.path.join(directory, file), self.root).replace(os.sep, "/")
+                if name.startswith(prefix):
+                    names.append(name)
+        return sorted(names)
+
+    def read(self, name: str) -> bytes:
+        with open(os.path.join(self.root, name), "rb") as f:
+            return f.read()
+
+
+def segment_path(started: datetime) -> str:
+    """Path of the segment starting at `started`; also used as the change feed cursor."""
+    return f"{SEGMENTS_PREFIX}{started:%Y/%m/%d/%H%M}/meta.json"
+
+
+def segment_prefixes(cursor: datetime, until: datetime) -> list:
+    """idx/segments/ prefixes holding every segment from the cursor's day through `until`."""
+    prefixes = []
+    day = cursor.date() if cursor else date(until.year, 1, 1)
+    # Days of the cursor's month one by one; earlier days of that month are already consumed
+    while cursor and day <= until.date() and day.month == cursor.month:
+        prefixes.append(f"{SEGMENTS_PREFIX}{day:%Y/%m/%d}/")
+        day += timedelta(days=1)
+    # Then whole months
+    while day <= until.date():
+        prefixes.append(f"{SEGMENTS_PREFIX}{day:%Y/%m}/")
+        day = date(day.year + day.month // 12, day.month % 12 + 1, 1)
+    return prefixes
+
+
+def segment_time(path: str):
+    """Start time of a segment from its idx/segments/YYYY/MM/DD/hhmm/meta.json path, or None."""
+    parts = path.split("/")
+    try:
+        return datetime.strptime("".join(parts[2:6]), "%Y%m%d%H%M")
+    except ValueError:
+        return None
+
+
+class ChangeFeedReader:
+    """Create and delete events for one container, segment by segment."""
+
+    def __init__(self, source, container: str):
+        self.source = source
+        self.blob_subject = f"/blobServices/default/containers/{container}/blobs/"
+
+    def last_consumable(self) -> datetime:
+        """Start time of the newest segment that is completely written."""
+        meta = json.loads(self.source.read(SEGMENTS_META))
+        return datetime.strptime(meta["lastConsumable"][:19], "%Y-%m-%dT%H:%M:%S")
+
+    def segments(self, after: str, until: datetime) -> list:
+        """Segment paths newer than the `after` cursor (a segment path) up to `until`, oldest first.
+
+        Listing starts at the cursor's day: the rest of its month is listed one day
+        at a time and later months whole, so an hourly sync lists a single day.
+        Without a cursor everything from the start of `until`'s year is listed.
+        """
+        cursor = segment_time(after) if after else None
+        paths = []
+        for prefix in segment_prefixes(cursor, until):
+            for path in self.source.list(prefix):
+                started = segment_time(path)
+                if path.endswith("/meta.json") and started and started <= until and (not after or path > after):
+                    paths.append(path)
+        return paths
+
+    def events(self, segment: str) -> list:
+        """Create/delete events of one segment, in event time order.
+
+        Each event is {"type": "created" or "deleted", "name", "size", "modified", "etag"},
+        with `modified` in the HTTP date format List Blobs uses.
+        """
+        _require_fastavro()
+        import fastavro
+
+        meta = json.loads(self.source.read(segment))
+        events = []
+        for chunk_path in meta.get("chunkFilePaths", []):
+            chunk_prefix = chunk_path.split("/", 1)[1] if chunk_path.startswith(CHANGE_FEED_CONTAINER) else chunk_path
+            for name in self.source.list(chunk_prefix):
+                if not name.endswith(".avro"):
+                    continue
+                for record in fastavro.reader(io.BytesIO(self.source.read(name))):
+                    event = self._event(record)
+                    if event:
+                        events.append(event)
+        events.sort(key=lambda e: e["time"])
+        for event in events:
+            del event["time"]
+        return events
+
+    def _event(self, record: dict):
+        kind = EVENT_TYPES.get(record.get("eventType"))
+        subject = record.get("subject") or ""
+        if not kind or not subject.startswith(self.blob_subject):
+            return None
+        data = record.get("data") or {}
+        event_time = record.get("eventTime") or ""
+        try:
+            modified = format_datetime(datetime.fromisoformat(event_time[:19] + "+00:00"), usegmt=True)
+        except ValueError:
+            modified = ""
+        return {
+            "type": kind,
+            "name": subject[len(self.blob_subject):],
+            "size": data.get("contentLength") or 0,
+            "modified": modified,
+            "etag": data.get("etag") or "",
+            "time": event_time,
+        }
@@ -0,0 +1,102 @@
+"""
+Day-level coverage of export period folders.
+
+Each export writes its data under YYYYMMDD-YYYYMMDD/ period folders. The days
+covered by every distinct folder are set in a per-export bitmap (one bit per
+day, held in a Python int), so gaps and overlapping periods are found with a
+few bitwise operations, even across years of history and many exports.
+"""
+
+import re
+from datetime import date, datetime, timedelta
+
+# Export path (everything before the period folder) and the period dates
+PERIOD_PATTERN = re.compile(r"^(.*?)/?(\d{8})-(\d{8})/")
+
+# Bit 0 of every bitmap
+ORIGIN = date(2000, 1, 1)
+
+
+def _day(value: date) -> int:
+    return value.toordinal() - ORIGIN.toordinal()
+
+
+def _date(day: int) -> date:
+    return ORIGIN + timedelta(days=day)
+
+
+def _ranges(bitmap: int) -> list:
+    """Runs of set bits as inclusive (first_day, last_day) index pairs."""
+    if not bitmap:
+        return []
+    # bin() is most significant bit first; reverse so string index == day index
+    bits = bin(bitmap)[:1:-1]
+    return [(m.start(), m.end() - 1) for m in re.finditer("1+", bits)]
+
+
+class DayCoverage:
+    """Covered and overlapping days per export, built from period folder paths."""
+
+    def __init__(self):
+        self.covered = {}
+        self.overlap = {}
+        self.periods = {}
+
+    def add_period(self, export: str, start: date, end: date):
+        """Mark the days from start to end inclusive as covered for an export."""
+        if end < start:
+            start, end = end, start
+        first = max(0, _day(start))
+        mask = ((1 << (_day(end) - first + 1)) - 1) << first
+        covered = self.covered.get(export, 0)
+        if covered & mask:
+            self.overlap[export] = self.overlap.get(export, 0) | (covered & mask)
+        self.covered[export] = covered | mask
+        self.periods[export] = self.periods.get(export, 0) + 1
+
+    def add_period_prefix(self, prefix: str) -> bool:
+        """Add a {export path}/YYYYMMDD-YYYYMMDD/ folder. Returns False if it is not one."""
+        match = PERIOD_PATTERN.match(prefix)
+        if not match:
+            return False
+        try:
+            start = datetime.strptime(match.group(2), "%Y%m%d").date()
+            end = datetime.strptime(match.group(3), "%Y%m%d").date()
+        except ValueError:
+            return False
+        self.add_period(match.group(1), start, end)
+        return True
+
+    def exports(self) -> list:
+        return sorted(self.covered)
+
+    def span(self, export: str):
+        """First and last covered day of an export, or None."""
+        bitmap = self.covered.get(export, 0)
+        if not bitmap:
+            return None
+        lowest = (bitmap & -bitmap).bit_length() - 1
+        return _date(lowest), _date(bitmap.bit_length() - 1)
+
+    def missing_ranges(self, export: str, through: date = None, since: date = None) -> list:
+        """Uncovered (start, end) date ranges between `since` and `through`.
+
+        `since` defaults to the first covered day and `through` to the last, so
+        only interior gaps are reported.
+        """
+        bitmap = self.covered.get(export, 0)
+        if not bitmap and not (since and through):
+            return []
+        first = max(0, _day(since)) if since else (bitmap & -bitmap).bit_length() - 1
+        last = _day(through) if through else bitmap.bit_length() - 1
+        if last < first:
+            return []
+        span = ((1 << (last - first + 1)) - 1) << first
+        return [(_date(a), _date(b)) for a, b in _ranges(span & ~bitmap)]
+
+    def overlap_ranges(self, export: str) -> list:
+        """(start, end) date ranges covered by more than one period folder."""
+        return [(_date(a), _date(b)) for a, b in _ranges(self.overlap.get(export, 0))]
+
+    def covered_days(self, export: str) -> int:
+        return bin(self.covered.get(export, 0)).count("1")
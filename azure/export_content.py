@@ -0,0 +1,288 @@
+"""
+Content inspection for FOCUS export files.
+
+Parquet files are inspected from their footer only: row counts, the column
+schema and ChargePeriodStart min/max all come from the file metadata, which is
+fetched with HTTP Range requests. CSV files have no footer, so they are streamed
+once to read the header and count rows.
+
+Cost reconciliation streams only the cost and grouping columns through pyarrow
+in record batches, so memory stays bounded by one batch per file being read.
+"""
+
+import csv
+import io
+import threading
+import zlib
+from collections import defaultdict
+
+# Columns every FOCUS export must contain, per configured dataVersion
+FOCUS_CORE_COLUMNS = [
+    "BilledCost",
+    "BillingAccountId",
+    "BillingCurrency",
+    "BillingPeriodEnd",
+    "BillingPeriodStart",
+    "ChargeCategory",
+    "ChargePeriodEnd",
+    "ChargePeriodStart",
+    "ContractedCost",
+    "EffectiveCost",
+    "ListCost",
+    "PricingQuantity",
+    "ProviderName",
+    "ServiceName",
+    "SubAccountId",
+]
+FOCUS_REQUIRED_COLUMNS = {
+    "1.0": FOCUS_CORE_COLUMNS,
+    "1.0r2": FOCUS_CORE_COLUMNS,
+    "1.2-preview": FOCUS_CORE_COLUMNS + ["InvoiceId"],
+}
+DEFAULT_FOCUS_VERSION = "1.2-preview"
+
+# Smallest ranged read; pyarrow asks for the footer in one go and this usually covers it
+MIN_RANGE_SIZE = 64 * 1024
+
+
+def is_data_file(name: str) -> bool:
+    """True for export data files (not manifests or other metadata)."""
+    return name.endswith((".parquet", ".csv", ".csv.gz"))
+
+
+class RangedReader(io.RawIOBase):
+    """Seekable read-only file backed by ranged fetches of a remote object.
+
+    `fetch(start, end)` must return the bytes from start to end inclusive. Only
+    the ranges actually read are downloaded.
+    """
+
+    def __init__(self, fetch, size: int, min_range_size: int = MIN_RANGE_SIZE):
+        self.fetch = fetch
+        self.size = size
+        self.min_range_size = min_range_size
+        self.position = 0
+        self.requests = 0
+        self._buffer = b""
+        self._buffer_start = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = self.size + offset
+        self.position = max(0, min(self.position, self.size))
+        return self.position
+
+    def readinto(self, target) -> int:
+        wanted = min(len(target), self.size - self.position)
+        if wanted <= 0:
+            return 0
+
+        buffer_end = self._buffer_start + len(self._buffer)
+        if not (self._buffer_start <= self.position and self.position + wanted <= buffer_end):
+            # Read at least min_range_size, extending backwards near the end of the file
+            end = min(self.size, self.position + max(wanted, self.min_range_size)) - 1
+            start = min(self.position, max(0, end + 1 - self.min_range_size))
+            self._buffer = self.fetch(start, end)
+            self._buffer_start = start
+            self.requests += 1
+
+        offset = self.position - self._buffer_start
+        data = self._buffer[offset:offset + wanted]
+        target[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+def missing_focus_columns(columns, focus_version: str) -> list:
+    required = FOCUS_REQUIRED_COLUMNS.get(focus_version, FOCUS_CORE_COLUMNS)
+    present = set(columns)
+    return [c for c in required if c not in present]
+
+
+def inspect_parquet(reader, focus_version: str = DEFAULT_FOCUS_VERSION) -> dict:
+    """Read row count, schema and ChargePeriodStart range from a Parquet footer."""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet content checks require pyarrow (pip install pyarrow)")
+
+    metadata = pq.ParquetFile(reader).metadata
+    columns = [metadata.schema.column(i).name for i in range(metadata.num_columns)]
+
+    charge_min = charge_max = None
+    if "ChargePeriodStart" in columns:
+        index = columns.index("ChargePeriodStart")
+        for i in range(metadata.num_row_groups):
+            stats = metadata.row_group(i).column(index).statistics
+            if stats is None or not stats.has_min_max:
+                continue
+            low, high = str(stats.min), str(stats.max)
+            charge_min = low if charge_min is None or low < charge_min else charge_min
+            charge_max = high if charge_max is None or high > charge_max else charge_max
+
+    return {
+        "format": "parquet",
+        "rows": metadata.num_rows,
+        "columns": columns,
+        "missing_columns": missing_focus_columns(columns, focus_version),
+        "charge_start_min": charge_min,
+        "charge_start_max": charge_max,
+    }
+
+
+def _decoded_lines(chunks, gzipped: bool):
+    """Turn a stream of (optionally gzipped) byte chunks into text lines."""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else None
+    pending = b""
+    for chunk in chunks:
+        if decompressor:
+            chunk = decompressor.decompress(chunk)
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8-sig") + "\n"
+    if decompressor:
+        pending += decompressor.flush()
+    if pending:
+        yield pending.decode("utf-8-sig")
+
+
+def inspect_csv(chunks, gzipped: bool = False, focus_version: str = DEFAULT_FOCUS_VERSION) -> dict:
+    """Stream a CSV export once: header, row count and ChargePeriodStart range."""
+    reader = csv.reader(_decoded_lines(chunks, gzipped))
+    columns = next(reader, [])
+
+    index = columns.index("ChargePeriodStart") if "ChargePeriodStart" in columns else None
+    rows = 0
+    charge_min = charge_max = None
+    for row in reader:
+        if not row:
+            continue
+        rows += 1
+        if index is not None and index < len(row) and row[index]:
+            value = row[index]
+            charge_min = value if charge_min is None or value < charge_min else charge_min
+            charge_max = value if charge_max is None or value > charge_max else charge_max
+
+    return {
+        "format": "csv",
+        "rows": rows,
+        "columns": columns,
+        "missing_columns": missing_focus_columns(columns, focus_version),
+        "charge_start_min": charge_min,
+        "charge_start_max": charge_max,
+    }
+
+
+# Columns read for cost reconciliation; the first three are the grouping keys
+RECONCILE_KEYS = ["ServiceName", "SubAccountId", "BillingCurrency"]
+RECONCILE_COSTS = ["BilledCost", "EffectiveCost"]
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise RuntimeError("Cost reconciliation requires pyarrow (pip install pyarrow)")
+
+
+def iter_parquet_cost_batches(reader, batch_size: int = 65536):
+    """Yield record batches with only the reconciliation columns of a Parquet file."""
+    _require_pyarrow()
+    import pyarrow.parquet as pq
+
+    report = pq.ParquetFile(reader)
+    missing = [c for c in RECONCILE_KEYS + RECONCILE_COSTS if c not in report.schema_arrow.names]
+    if missing:
+        raise ValueError(f"missing columns: {', '.join(missing)}")
+    yield from report.iter_batches(batch_size=batch_size, columns=RECONCILE_KEYS + RECONCILE_COSTS)
+
+
+def iter_csv_cost_batches(stream, gzipped: bool = False):
+    """Yield record batches with only the reconciliation columns of a CSV stream."""
+    _require_pyarrow()
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    source = pa.PythonFile(stream, mode="r")
+    if gzipped:
+        source = pa.CompressedInputStream(source, "gzip")
+
+    column_types = {c: pa.string() for c in RECONCILE_KEYS}
+    column_types.update({c: pa.float64() for c in RECONCILE_COSTS})
+    reader = pa_csv.open_csv(
+        source,
+        read_options=pa_csv.ReadOptions(block_size=8 * 1024 * 1024),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=RECONCILE_KEYS + RECONCILE_COSTS,
+            column_types=column_types,
+        ),
+    )
+    yield from reader
+
+
+class CostAggregator:
+    """Thread-safe running totals of BilledCost and EffectiveCost.
+
+    Totals are keyed by (month, ServiceName, SubAccountId, BillingCurrency) and
+    each record batch is grouped with pyarrow before being added.
+    """
+
+    def __init__(self):
+        self.totals = defaultdict(lambda: [0.0, 0.0])
+        self.rows = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add_batch(self, month: str, batch):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        table = pa.Table.from_batches([batch])
+        for name in RECONCILE_COSTS:
+            column = pc.cast(table.column(name), pa.float64())
+            table = table.set_column(table.schema.get_field_index(name), name, column)
+        for name in RECONCILE_KEYS:
+            column = pc.cast(table.column(name), pa.string())
+            table = table.set_column(table.schema.get_field_index(name), name, column)
+
+        grouped = table.group_by(RECONCILE_KEYS).aggregate(
+            [(name, "sum") for name in RECONCILE_COSTS] + [([], "count_all")]
+        )
+
+        with self._lock:
+            for row in grouped.to_pylist():
+                key = (month,) + tuple(row[k] or "" for k in RECONCILE_KEYS)
+                totals = self.totals[key]
+                totals[0] += row["BilledCost_sum"] or 0.0
+                totals[1] += row["EffectiveCost_sum"] or 0.0
+                self.rows[month] += row["count_all"]
+
+    def month_totals(self) -> dict:
+        """Totals per (month, currency) as [BilledCost, EffectiveCost]."""
+        result = defaultdict(lambda: [0.0, 0.0])
+        for (month, _service, _sub_account, currency), (billed, effective) in self.totals.items():
+            result[(month, currency)][0] += billed
+            result[(month, currency)][1] += effective
+        return dict(result)
+
+    def write_csv(self, path: str):
+        """Write the detailed totals, one line per month/service/sub-account/currency."""
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Month"] + RECONCILE_KEYS + RECONCILE_COSTS)
+            for key in sorted(self.totals):
+                billed, effective = self.totals[key]
+                writer.writerow(list(key) + [f"{billed:.6f}", f"{effective:.6f}"])
@@ -0,0 +1,60 @@
+"""
+Completeness checks based on the manifest.json written by each export run.
+
+Cost Management writes {export_root_path}/{export_name}/YYYYMMDD-YYYYMMDD/{run_id}/manifest.json
+next to the data files of every run. The manifest names each blob it delivered
+with its byte and row count, so a run can be checked against what is actually
+in storage without inferring anything from file names.
+"""
+
+MANIFEST_NAME = "manifest.json"
+
+
+def parse_export_manifest(manifest: dict) -> dict:
+    """Normalize an export manifest into run details and expected blobs."""
+    run_info = manifest.get("runInfo", {})
+    export_config = manifest.get("exportConfig", {})
+    blobs = {}
+    for blob in manifest.get("blobs", []):
+        name = blob.get("blobName")
+        if name:
+            blobs[name] = {"size": blob.get("byteCount"), "rows": blob.get("dataRowCount")}
+
+    return {
+        "run_id": run_info.get("runId", ""),
+        "submitted": run_info.get("submittedTime", ""),
+        "start_date": run_info.get("startDate", ""),
+        "end_date": run_info.get("endDate", ""),
+        "data_version": export_config.get("dataVersion", ""),
+        "rows": manifest.get("dataRowCount"),
+        "bytes": manifest.get("byteCount"),
+        "blob_count": manifest.get("blobCount", len(blobs)),
+        "blobs": blobs,
+    }
+
+
+def compare_manifest(manifest: dict, present: dict) -> dict:
+    """Check a parsed manifest against the blobs found in its run folder.
+
+    `present` maps blob name -> size in bytes. Blob names in manifests may or may
+    not include the container, so they are matched on their path suffix.
+    """
+    missing = []
+    size_mismatch = []
+    for name, expected in manifest["blobs"].items():
+        found = present.get(name)
+        if found is None:
+            found = next((size for path, size in present.items() if name.endswith("/" + path) or path.endswith("/" + name)), None)
+        if found is None:
+            missing.append(name)
+        elif expected["size"] is not None and found != expected["size"]:
+            size_mismatch.append(name)
+
+    expected_count = manifest["blob_count"] or len(manifest["blobs"])
+    return {
+        "expected_blobs": expected_count,
+        "present_blobs": expected_count - len(missing),
+        "missing": missing,
+        "size_mismatch": size_mismatch,
+        "complete": not missing and not size_mismatch and len(manifest["blobs"]) >= expected_count,
+    }
@@ -0,0 +1,319 @@
+"""
+Local mirror of export files, downloaded as concurrent ranged chunks.
+
+Blobs come from a List Blobs listing. A blob is downloaded only if it is new or
+its size, Last-Modified or ETag differ from what the previous mirror run
+recorded in DEST/.mirror-state.json. Each download is split into fixed-size
+chunks fetched with Range requests (and If-Match, so a blob replaced mid-way
+fails instead of mixing two versions) by one pool of workers shared across all
+files, so a single multi-GB file uses every worker instead of one stream.
+
+Chunks are written in place into a preallocated NAME.part file. The chunks done
+so far are recorded in NAME.part.json, so an interrupted mirror resumes with the
+missing chunks of the same blob version. A finished file is checked against the
+blob's Content-MD5 (when the blob has one), gets its Last-Modified as mtime and
+is renamed into place. Local files whose blob was deleted are left alone.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import parsedate_to_datetime
+
+MIRROR_STATE = ".mirror-state.json"
+PART_SUFFIX = ".part"
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Write the mirror state at least this often while downloading
+STATE_SAVE_SECONDS = 30
+PROGRESS_SECONDS = 10
+
+
+class MirrorError(Exception):
+    """Raised when a downloaded file does not match its blob."""
+
+
+def _write_json(path: str, data):
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".mirror-")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def local_path(dest: str, name: str) -> str:
+    """Local path for a blob name, refusing names that would land outside `dest`."""
+    parts = [p for p in name.split("/") if p]
+    if not parts or any(p in (".", "..") for p in parts):
+        raise MirrorError(f"Cannot mirror blob name '{name}'")
+    return os.path.join(dest, *parts)
+
+
+def file_md5(path: str) -> str:
+    """Base64 MD5 of a local file, in the form Azure reports Content-MD5."""
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return base64.b64encode(digest.digest()).decode()
+
+
+def _blob_state(blob: dict) -> dict:
+    return {"size": blob["size"], "modified": blob["modified"], "etag": blob["etag"], "md5": blob.get("md5", "")}
+
+
+class _Download:
+    """One blob being written into its .part file."""
+
+    def __init__(self, blob: dict, path: str, chunk_size: int):
+        self.blob = blob
+        self.path = path
+        self.part_path = path + PART_SUFFIX
+        self.progress_path = self.part_path + ".json"
+        self.chunk_size = chunk_size
+        self.chunks = max(1, -(-blob["size"] // chunk_size))
+        self.done = set()
+        self.fd = None
+        self.resumed = False
+        self.failed = False
+        self.lock = threading.Lock()
+
+        progress = _read_json(self.progress_path)
+        if (
+            progress
+            and progress.get("etag") == blob["etag"]
+            and progress.get("size") == blob["size"]
+            and progress.get("chunk_size") == chunk_size
+            and os.path.exists(self.part_path)
+            and os.path.getsize(self.part_path) == blob["size"]
+        ):
+            self.done = {i for i in progress.get("done", []) if 0 <= i < self.chunks}
+            self.resumed = bool(self.done)
+
+    def remaining(self) -> list:
+        return [i for i in range(self.chunks) if i not in self.done]
+
+    def chunk_range(self, index: int) -> tuple:
+        start = index * self.chunk_size
+        return start, min(start + self.chunk_size, self.blob["size"]) - 1
+
+    def open(self):
+        """Open the .part file, creating and preallocating it unless resuming. Call with the lock held."""
+        if self.fd is not None:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.fd = os.open(self.part_path, os.O_RDWR | os.O_CREAT, 0o644)
+        if self.resumed:
+            return
+        os.ftruncate(self.fd, 0)
+        size = self.blob["size"]
+        if size:
+            try:
+                os.posix_fallocate(self.fd, 0, size)
+            except (AttributeError, OSError):
+                # Not available everywhere (macOS, some filesystems); a sparse file still works
+                os.ftruncate(self.fd, size)
+
+    def mark_done(self, index: int) -> bool:
+        """Record a written chunk. Returns True when it was the last one. Call with the lock held."""
+        self.done.add(index)
+        _write_json(self.progress_path, {
+            "etag": self.blob["etag"],
+            "size": self.blob["size"],
+            "chunk_size": self.chunk_size,
+            "done": sorted(self.done),
+        })
+        return len(self.done) == self.chunks
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def discard(self):
+        """Drop the partial download, so the next run starts this blob over."""
+        self.close()
+        for path in (self.part_path, self.progress_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def finish(self) -> bool:
+        """Verify and move the finished file into place. Returns whether Content-MD5 was checked."""
+        self.close()
+        expected = self.blob.get("md5")
+        if expected:
+            actual = file_md5(self.part_path)
+            if actual != expected:
+                self.discard()
+                raise MirrorError(f"Content-MD5 mismatch for '{self.blob['name']}' (expected {expected}, got {actual})")
+        try:
+            modified = parsedate_to_datetime(self.blob["modified"]).timestamp()
+            os.utime(self.part_path, (modified, modified))
+        except (TypeError, ValueError):
+            pass
+        os.replace(self.part_path, self.path)
+        try:
+            os.remove(self.progress_path)
+        except OSError:
+            pass
+        return bool(expected)
+
+
+class ExportMirror:
+    """Keeps a local directory in sync with a set of blobs.
+
+    `fetch(blob, start, end)` must return a streamed response for the bytes from
+    start to end inclusive of the blob's version identified by blob["etag"].
+    """
+
+    def __init__(self, dest: str, fetch, chunk_size: int = DEFAULT_CHUNK_SIZE, max_workers: int = 16):
+        self.dest = dest
+        self.fetch = fetch
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.state_path = os.path.join(dest, MIRROR_STATE)
+        self.state = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+
+    def load_state(self):
+        state = _read_json(self.state_path)
+        self.state = state if isinstance(state, dict) else {}
+
+    def save_state(self):
+        os.makedirs(self.dest, exist_ok=True)
+        with self._lock:
+            state = dict(self.state)
+        _write_json(self.state_path, state)
+
+    def is_current(self, blob: dict, path: str) -> bool:
+        """True if the local copy is of this blob version (same size, Last-Modified and ETag)."""
+        entry = self.state.get(blob["name"])
+        if not entry or any(entry.get(key) != blob[key] for key in ("size", "modified", "etag")):
+            return False
+        try:
+            return os.path.getsize(path) == blob["size"]
+        except OSError:
+            return False
+
+    def plan(self, blobs) -> tuple:
+        """Split blobs into downloads to run and the number already current."""
+        downloads = []
+        current = 0
+        for blob in blobs:
+            path = local_path(self.dest, blob["name"])
+            if self.is_current(blob, path):
+                current += 1
+            else:
+                downloads.append(_Download(blob, path, self.chunk_size))
+        return downloads, current
+
+    def _fetch_chunk(self, download: _Download, index: int):
+        """Write one chunk. Returns None, or whether Content-MD5 was checked if it completed the file."""
+        if download.failed:
+            return None
+        start, end = download.chunk_range(index)
+        with download.lock:
+            download.open()
+        if download.blob["size"]:
+            offset = start
+            response = self.fetch(download.blob, start, end)
+            with response:
+                # Raw bytes: a blob stored with Content-Encoding: gzip is mirrored as stored
+                for data in response.raw.stream(1024 * 1024, decode_content=False):
+                    os.pwrite(download.fd, data, offset)
+                    offset += len(data)
+            if offset != end + 1:
+                raise MirrorError(f"Short read for '{download.blob['name']}' bytes {start}-{end} ({offset - start} bytes)")
+            with self._lock:
+                self._bytes += end + 1 - start
+        with download.lock:
+            last = download.mark_done(index)
+        return self._complete(download) if last else None
+
+    def _complete(self, download: _Download) -> bool:
+        verified = download.finish()
+        with self._lock:
+            self.state[download.blob["name"]] = _blob_state(download.blob)
+        return verified
+
+    def mirror(self, blobs) -> dict:
+        """Download every new or changed blob. Returns counts, bytes and failures."""
+        self.load_state()
+        downloads, current = self.plan(blobs)
+        result = {
+            "current": current,
+            "downloaded": 0,
+            "resumed": sum(1 for d in downloads if d.resumed),
+            "verified": 0,
+            "failed": [],
+            "bytes": 0,
+            "total_bytes": sum(d.blob["size"] for d in downloads),
+            "seconds": 0.0,
+        }
+        if not downloads:
+            return result
+
+        started = time.monotonic()
+        last_save = last_progress = started
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            futures = {}
+            for download in downloads:
+                remaining = download.remaining()
+                if not remaining:
+                    # Every chunk was written before an interruption; only the check and rename are left
+                    futures[executor.submit(self._complete, download)] = download
+                for index in remaining:
+                    futures[executor.submit(self._fetch_chunk, download, index)] = download
+
+            for future in as_completed(futures):
+                download = futures[future]
+                try:
+                    verified = future.result()
+                except Exception as e:
+                    # The chunks written so far stay in .part.json for the next run
+                    if not download.failed:
+                        download.failed = True
+                        result["failed"].append({"name": download.blob["name"], "error": str(e)})
+                    continue
+                if verified is not None:
+                    result["downloaded"] += 1
+                    result["verified"] += verified
+
+                now = time.monotonic()
+                if now - last_save >= STATE_SAVE_SECONDS:
+                    self.save_state()
+                    last_save = now
+                if now - last_progress >= PROGRESS_SECONDS:
+                    last_progress = now
+                    print(
+                        f"   ⬇️  {result['downloaded']}/{len(downloads)} files, "
+                        f"{self._bytes / 1024 ** 2:,.0f} of {result['total_bytes'] / 1024 ** 2:,.0f} MB "
+                        f"({self._bytes / 1024 ** 2 / (now - started):,.1f} MB/s)",
+                        flush=True,
+                    )
+        finally:
+            # On Ctrl+C, let running chunks finish and drop the queued ones; .part.json keeps the progress
+            executor.shutdown(wait=True, cancel_futures=True)
+            for download in downloads:
+                download.close()
+            self.save_state()
+            result["bytes"] = self._bytes
+            result["seconds"] = time.monotonic() - started
+        return result
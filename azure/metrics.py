@@ -0,0 +1,240 @@
+"""
+Request-level metrics for the DigiUsher Azure scripts.
+
+When enabled with --metrics, every call made through azure_http is recorded per
+endpoint (Azure AD token, ARM export APIs, Blob list/get): request counts by
+status, a latency histogram, retries and throttled responses, and bytes sent
+and received. Scripts add the time spent in local phases such as XML parsing
+and month aggregation. The result is written at exit as JSON, or as a
+Prometheus textfile-collector file when the path ends in .prom.
+
+Recording is off by default; until enable() is called the hooks do nothing.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+# Latency histogram bucket upper bounds in seconds (Prometheus-style, cumulative on output)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+EXPORTS_SEGMENT = "/providers/Microsoft.CostManagement/exports/"
+
+_recorder = None
+
+
+def endpoint_name(method: str, url: str, params: dict = None) -> str:
+    """Classify a request URL into a stable, low-cardinality endpoint name."""
+    path = urlparse(url).path
+    if "/oauth2/" in path:
+        return "aad.token"
+    if EXPORTS_SEGMENT in path:
+        rest = path.split(EXPORTS_SEGMENT, 1)[1].split("/")[1:]
+        return "arm.export." + rest[0] if rest and rest[0] else "arm.export"
+    if "/providers/" in path:
+        return "arm.other"
+    query = urlparse(url).query
+    if (params or {}).get("comp") == "list" or "comp=list" in query:
+        return "blob.list"
+    return f"blob.{method.lower()}"
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                break
+        else:
+            i = len(LATENCY_BUCKETS)
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list:
+        total = 0
+        result = []
+        for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class Metrics:
+    """Thread-safe collector of per-endpoint request metrics and phase timings."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.requests = defaultdict(int)          # (endpoint, status) -> count
+        self.latency = defaultdict(_Histogram)    # endpoint -> histogram
+        self.retries = defaultdict(int)           # (endpoint, reason) -> count
+        self.throttled = defaultdict(int)         # endpoint -> count
+        self.bytes_sent = defaultdict(int)
+        self.bytes_received = defaultdict(int)
+        self.phases = defaultdict(float)          # phase -> seconds
+        self._lock = threading.Lock()
+
+    def record_request(self, endpoint: str, status, seconds: float, sent: int = 0, received: int = 0):
+        """Record one HTTP attempt. `status` is the HTTP status or "error" for network failures."""
+        with self._lock:
+            self.requests[(endpoint, str(status))] += 1
+            self.latency[endpoint].observe(seconds)
+            self.bytes_sent[endpoint] += sent
+            self.bytes_received[endpoint] += received
+            if status == 429:
+                self.throttled[endpoint] += 1
+
+    def record_retry(self, endpoint: str, reason: str):
+        with self._lock:
+            self.retries[(endpoint, reason)] += 1
+
+    def add_bytes_received(self, endpoint: str, count: int):
+        with self._lock:
+            self.bytes_received[endpoint] += count
+
+    def add_phase_time(self, phase: str, seconds: float):
+        with self._lock:
+            self.phases[phase] += seconds
+
+    def snapshot(self) -> dict:
+        """All metrics as a JSON-serializable dict."""
+        with self._lock:
+            endpoints = {}
+            for endpoint in sorted({e for e, _ in self.requests} | set(self.latency)):
+                histogram = self.latency[endpoint]
+                endpoints[endpoint] = {
+                    "requests": {s: c for (e, s), c in sorted(self.requests.items()) if e == endpoint},
+                    "retries": {r: c for (e, r), c in sorted(self.retries.items()) if e == endpoint},
+                    "throttled": self.throttled.get(endpoint, 0),
+                    "bytes_sent": self.bytes_sent.get(endpoint, 0),
+                    "bytes_received": self.bytes_received.get(endpoint, 0),
+                    "latency_seconds": {
+                        "count": histogram.count,
+                        "sum": round(histogram.sum, 6),
+                        "buckets": {
+                            ("+Inf" if bound == float("inf") else str(bound)): count
+                            for bound, count in histogram.cumulative()
+                        },
+                    },
+                }
+            return {
+                "started": self.started,
+                "duration_seconds": round(time.time() - self.started, 6),
+                "endpoints": endpoints,
+                "phases_seconds": {p: round(s, 6) for p, s in sorted(self.phases.items())},
+            }
+
+    def prometheus_text(self, tool: str) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        data = self.snapshot()
+        base = f'tool="{tool}"'
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        family("digiusher_http_requests_total", "counter", "HTTP attempts by endpoint and status.")
+        for endpoint, stats in data["endpoints"].items():
+            for status, count in stats["requests"].items():
+                lines.append(f'digiusher_http_requests_total{{{base},endpoint="{endpoint}",status="{status}"}} {count}')
+
+        family("digiusher_http_request_duration_seconds", "histogram", "Time to response headers per attempt.")
+        for endpoint, stats in data["endpoints"].items():
+            latency = stats["latency_seconds"]
+            for bound, count in latency["buckets"].items():
+                lines.append(
+                    f'digiusher_http_request_duration_seconds_bucket{{{base},endpoint="{endpoint}",le="{bound}"}} {count}'
+                )
+            lines.append(f'digiusher_http_request_duration_seconds_sum{{{base},endpoint="{endpoint}"}} {latency["sum"]}')
+            lines.append(f'digiusher_http_request_duration_seconds_count{{{base},endpoint="{endpoint}"}} {latency["count"]}')
+
+        family("digiusher_http_retries_total", "counter", "Retried attempts by endpoint and reason.")
+        for endpoint, stats in data["endpoints"].items():
+            for reason, count in stats["retries"].items():
+                lines.append(f'digiusher_http_retries_total{{{base},endpoint="{endpoint}",reason="{reason}"}} {count}')
+
+        family("digiusher_http_throttled_total", "counter", "429 responses by endpoint.")
+        for endpoint, stats in data["endpoints"].items():
+            lines.append(f'digiusher_http_throttled_total{{{base},endpoint="{endpoint}"}} {stats["throttled"]}')
+
+        for direction in ("sent", "received"):
+            name = f"digiusher_http_bytes_{direction}_total"
+            family(name, "counter", f"Bytes {direction} by endpoint.")
+            for endpoint, stats in data["endpoints"].items():
+                lines.append(f'{name}{{{base},endpoint="{endpoint}"}} {stats["bytes_" + direction]}')
+
+        family("digiusher_phase_seconds_total", "counter", "Time spent in local processing phases.")
+        for phase, seconds in data["phases_seconds"].items():
+            lines.append(f'digiusher_phase_seconds_total{{{base},phase="{phase}"}} {seconds}')
+
+        family("digiusher_run_duration_seconds", "gauge", "Wall-clock duration of the run.")
+        lines.append(f"digiusher_run_duration_seconds{{{base}}} {data['duration_seconds']}")
+        family("digiusher_run_timestamp_seconds", "gauge", "Unix time the run started.")
+        lines.append(f"digiusher_run_timestamp_seconds{{{base}}} {data['started']:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str, tool: str):
+        """Write JSON, or Prometheus text for .prom paths. Replaced atomically for the textfile collector."""
+        if path.endswith(".prom"):
+            content = self.prometheus_text(tool)
+        else:
+            content = json.dumps(dict(self.snapshot(), tool=tool), indent=2) + "\n"
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".metrics-")
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+
+
+def enable() -> Metrics:
+    """Start recording. Returns the active collector."""
+    global _recorder
+    if _recorder is None:
+        _recorder = Metrics()
+    return _recorder
+
+
+def active():
+    """The active collector, or None when metrics are disabled."""
+    return _recorder
+
+
+def write_at_exit(path: str, tool: str):
+    """Write the collected metrics to `path`; meant for atexit."""
+    if _recorder is None:
+        return
+    try:
+        _recorder.write(path, tool)
+    except OSError as e:
+        print(f"⚠️  Could not write metrics to {path}: {e}")
+
+
+def add_phase_time(phase: str, seconds: float):
+    """Add time spent in a local phase, if metrics are enabled."""
+    if _recorder is not None:
+        _recorder.add_phase_time(phase, seconds)
+
+
+@contextmanager
+def timed(phase: str):
+    """Add the time spent in the block to a phase, if metrics are enabled."""
+    if _recorder is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _recorder.add_phase_time(phase, time.perf_counter() - started)
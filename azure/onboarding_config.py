@@ -0,0 +1,260 @@
+"""
+Resolve onboarding settings (credentials, billing scope, storage) for the scripts.
+
+Settings come from, in order of precedence: explicit command-line arguments, a
+named profile, Terraform outputs (--from-terraform) and DIGIUSHER_* environment
+variables.
+
+Terraform outputs are read straight from a local state file when there is one,
+so no terraform process is started. With a remote backend a single
+`terraform output -json` call is made and its result cached per working
+directory and backend configuration for a few minutes.
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import tempfile
+import time
+
+from azure_auth import default_cache_path
+
+SETTINGS = (
+    "tenant_id",
+    "client_id",
+    "client_secret",
+    "billing_scope",
+    "export_name",
+    "storage_account",
+    "container",
+    "export_root_path",
+)
+
+# Terraform output (or digiusher_onboarding key) -> setting
+TERRAFORM_OUTPUTS = {
+    "tenant_id": "tenant_id",
+    "application_id": "client_id",
+    "client_secret": "client_secret",
+    "billing_scope": "billing_scope",
+    "export_name": "export_name",
+    "storage_account_name": "storage_account",
+    "storage_container_name": "container",
+    "export_root_path": "export_root_path",
+}
+
+# Remote state can change without anything local changing, so cached outputs expire
+REMOTE_OUTPUTS_TTL = 600
+
+
+class ConfigError(Exception):
+    """Raised when settings cannot be resolved."""
+
+
+def env_settings() -> dict:
+    """Settings from DIGIUSHER_TENANT_ID, DIGIUSHER_CLIENT_ID, ... environment variables."""
+    values = {}
+    for key in SETTINGS:
+        value = os.environ.get(f"DIGIUSHER_{key.upper()}")
+        if value:
+            values[key] = value
+    return values
+
+
+def default_profiles_path() -> str:
+    """Profiles file location, overridable with DIGIUSHER_PROFILES."""
+    override = os.environ.get("DIGIUSHER_PROFILES")
+    if override:
+        return override
+    config_home = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+    return os.path.join(config_home, "digiusher", "profiles.json")
+
+
+def load_profile(name: str, path: str = None) -> dict:
+    """Read one named profile. `client_secret_env` names a variable holding the secret."""
+    path = path or default_profiles_path()
+    try:
+        with open(path) as f:
+            profiles = json.load(f)
+    except OSError as e:
+        raise ConfigError(f"cannot read profiles file {path}: {e}")
+    except ValueError as e:
+        raise ConfigError(f"invalid JSON in {path}: {e}")
+
+    profile = profiles.get(name) if isinstance(profiles, dict) else None
+    if not isinstance(profile, dict):
+        raise ConfigError(f"profile '{name}' not found in {path}")
+
+    values = {TERRAFORM_OUTPUTS.get(k, k): v for k, v in profile.items() if v is not None}
+    secret_env = values.pop("client_secret_env", None)
+    if secret_env and "client_secret" not in values:
+        if not os.environ.get(secret_env):
+            raise ConfigError(f"profile '{name}': environment variable {secret_env} is not set")
+        values["client_secret"] = os.environ[secret_env]
+    return {k: v for k, v in values.items() if k in SETTINGS}
+
+
+def _flatten_outputs(outputs: dict) -> dict:
+    """Map `terraform output -json` / state outputs onto setting names."""
+    values = {}
+    for name, output in outputs.items():
+        value = output.get("value") if isinstance(output, dict) else None
+        if name == "digiusher_onboarding" and isinstance(value, dict):
+            for key, item in value.items():
+                if key in TERRAFORM_OUTPUTS and item is not None:
+                    values[TERRAFORM_OUTPUTS[key]] = item
+        elif name in TERRAFORM_OUTPUTS and value is not None:
+            values[TERRAFORM_OUTPUTS[name]] = value
+    return values
+
+
+def _data_dir(workdir: str) -> str:
+    return os.environ.get("TF_DATA_DIR") or os.path.join(workdir, ".terraform")
+
+
+def local_state_path(workdir: str = "."):
+    """Path of the local state file for the current workspace, or None for remote backends."""
+    data_dir = _data_dir(workdir)
+    try:
+        with open(os.path.join(data_dir, "terraform.tfstate")) as f:
+            backend = json.load(f).get("backend") or {}
+    except (OSError, ValueError):
+        backend = {}
+    if backend.get("type", "local") != "local":
+        return None
+
+    workspace = os.environ.get("TF_WORKSPACE")
+    if not workspace:
+        try:
+            with open(os.path.join(data_dir, "environment")) as f:
+                workspace = f.read().strip()
+        except OSError:
+            workspace = "default"
+
+    configured = (backend.get("config") or {}).get("path")
+    if configured and workspace in ("", "default"):
+        return os.path.join(workdir, configured)
+    if workspace in ("", "default"):
+        return os.path.join(workdir, "terraform.tfstate")
+    return os.path.join(workdir, "terraform.tfstate.d", workspace, "terraform.tfstate")
+
+
+def _cache_path(workdir: str) -> str:
+    data_dir = _data_dir(workdir)
+    digest = hashlib.sha256(os.path.abspath(workdir).encode())
+    try:
+        with open(os.path.join(data_dir, "terraform.tfstate"), "rb") as f:
+            digest.update(f.read())
+    except OSError:
+        pass
+    digest.update((os.environ.get("TF_WORKSPACE") or "").encode())
+    return os.path.join(os.path.dirname(default_cache_path()), "terraform_outputs", f"{digest.hexdigest()[:24]}.json")
+
+
+def _read_cached_outputs(path: str):
+    try:
+        with open(path) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if entry.get("fetched_at", 0) + REMOTE_OUTPUTS_TTL < time.time():
+        return None
+    return entry.get("values")
+
+
+def _write_cached_outputs(path: str, values: dict):
+    """Write the outputs readable only by the current user, replacing the old file atomically."""
+    directory = os.path.dirname(path)
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".outputs-")
+        try:
+            os.chmod(tmp_path, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump({"fetched_at": time.time(), "values": values}, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError:
+        # Outputs contain the client secret; if they cannot be cached safely, don't cache them
+        pass
+
+
+def terraform_settings(workdir: str = ".", use_cache: bool = True) -> dict:
+    """Settings from Terraform outputs, without running terraform when the state is local."""
+    state_path = local_state_path(workdir)
+    if state_path and os.path.exists(state_path):
+        try:
+            with open(state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ConfigError(f"cannot read terraform state {state_path}: {e}")
+        return _flatten_outputs(state.get("outputs", {}))
+
+    cache_path = _cache_path(workdir)
+    if use_cache:
+        cached = _read_cached_outputs(cache_path)
+        if cached is not None:
+            return cached
+
+    try:
+        result = subprocess.run(
+            ["terraform", "output", "-json"],
+            cwd=workdir,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        values = _flatten_outputs(json.loads(result.stdout))
+    except FileNotFoundError:
+        raise ConfigError("terraform is not installed or not on PATH")
+    except subprocess.CalledProcessError as e:
+        raise ConfigError(f"terraform output failed: {e.stderr.strip()}")
+    except ValueError:
+        raise ConfigError("failed to parse terraform output")
+
+    if use_cache and values:
+        _write_cached_outputs(cache_path, values)
+    return values
+
+
+def resolve_settings(args, from_terraform: bool = False, profile: str = None, terraform_dir: str = ".", use_cache: bool = True) -> dict:
+    """Merge settings from every source. `args` is an argparse namespace (unset flags are None)."""
+    settings = env_settings()
+    if from_terraform:
+        settings.update(terraform_settings(terraform_dir, use_cache=use_cache))
+    if profile:
+        settings.update(load_profile(profile))
+    for key in SETTINGS:
+        value = getattr(args, key, None)
+        if value:
+            settings[key] = value
+    return settings
+
+
+def load_fleet_file(path: str, required_keys: list) -> list:
+    """Load fleet entries from a JSON file.
+
+    The file holds a list of objects with the `required_keys`, tenant_id,
+    client_id and either client_secret or client_secret_env (name of an
+    environment variable holding the secret). An optional "name" labels the log output.
+    """
+    with open(path) as f:
+        entries = json.load(f)
+
+    if not isinstance(entries, list):
+        raise ValueError("fleet file must contain a JSON list of entries")
+
+    for i, entry in enumerate(entries):
+        missing = [k for k in required_keys if not entry.get(k)]
+        if missing:
+            raise ValueError(f"entry {i} is missing: {', '.join(missing)}")
+
+        if not entry.get("client_secret"):
+            env_name = entry.get("client_secret_env")
+            if not env_name or not os.environ.get(env_name):
+                raise ValueError(f"entry {i} has no client_secret and no usable client_secret_env")
+            entry["client_secret"] = os.environ[env_name]
+
+    return entries
@@ -0,0 +1,199 @@
+"""
+Adaptive client-side rate limiting for Azure requests.
+
+Every request made through azure_http takes a token from a bucket shared by all
+threads. There is one bucket per endpoint class and throttling scope: the ARM
+subscription (or tenant, for billing scopes), the storage account, or the
+Azure AD tenant.
+
+ARM enforces its limits per subscription for requests under /subscriptions/,
+and per tenant for everything else, including Cost Management billing scopes
+(the x-ms-ratelimit-remaining-tenant-* headers). The tenant is read from the
+tid claim of the request's bearer token. If the token cannot be decoded, the
+billing account in the URL is used instead, so different billing accounts
+never share a bucket.
+
+Bucket rates adapt to what Azure reports:
+
+- x-ms-ratelimit-remaining-* headers (ARM subscription/tenant reads and writes,
+  Cost Management QPU) slow the bucket down as the remaining quota runs low,
+  before Azure starts answering 429.
+- 429/503 responses and Retry-After (including the Cost Management
+  x-ms-ratelimit-microsoft.costmanagement-*-retry-after headers) pause the
+  bucket for every worker and halve its rate.
+- Successful responses with plenty of quota left raise the rate again.
+"""
+
+import base64
+import functools
+import json
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+# (initial rate per second, burst, maximum rate) per endpoint class
+LIMITS = {
+    "arm": (5.0, 10, 25.0),
+    "storage": (500.0, 500, 2000.0),
+    "aad": (5.0, 10, 20.0),
+}
+MIN_RATE = 0.2
+
+# Slow down once remaining quota drops below this share of the most seen
+LOW_REMAINING = 0.2
+RATE_INCREASE = 0.5
+RATE_DECREASE = 0.5
+RATE_EASE = 0.8
+
+_SUBSCRIPTION = re.compile(r"/subscriptions/([^/]+)", re.IGNORECASE)
+_BILLING_ACCOUNT = re.compile(r"/billingAccounts/([^/]+)", re.IGNORECASE)
+_INTEGER = re.compile(r"\d+")
+
+
+class TokenBucket:
+    """Thread-safe token bucket with an adjustable refill rate."""
+
+    def __init__(self, rate: float, capacity: float, max_rate: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_rate = max_rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.max_remaining = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self) -> float:
+        """Block until a token is available. Returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds: float):
+        """Hold every caller for `seconds` and cut the rate."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.rate = max(MIN_RATE, self.rate * RATE_DECREASE)
+            self.tokens = 0
+
+    def adjust(self, remaining: int = None):
+        """Adapt the rate after a successful response: ease off on low quota, else speed up."""
+        with self._lock:
+            if remaining is not None:
+                self.max_remaining = max(self.max_remaining, remaining)
+                if remaining < self.max_remaining * LOW_REMAINING:
+                    self.rate = max(MIN_RATE, self.rate * RATE_EASE)
+                    return
+            self.rate = min(self.max_rate, self.rate + RATE_INCREASE)
+
+
+@functools.lru_cache(maxsize=64)
+def token_tenant(authorization: str):
+    """Tenant id (tid claim) of a "Bearer <JWT>" Authorization header, or None."""
+    parts = authorization.split(" ", 1)[-1].split(".")
+    if len(parts) != 3:
+        return None
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(parts[1] + "=" * (-len(parts[1]) % 4)))
+    except ValueError:
+        return None
+    tenant = claims.get("tid") if isinstance(claims, dict) else None
+    return tenant.lower() if isinstance(tenant, str) else None
+
+
+def throttle_scope(url: str, headers: dict = None) -> tuple:
+    """(endpoint class, scope) a request is throttled under."""
+    parsed = urlparse(url)
+    parts = parsed.path.split("/")
+    if "oauth2" in parts:
+        return "aad", parts[parts.index("oauth2") - 1]
+    if "/providers/" in parsed.path or "/subscriptions/" in parsed.path:
+        match = _SUBSCRIPTION.search(parsed.path)
+        if match:
+            return "arm", match.group(1).lower()
+        tenant = token_tenant((headers or {}).get("Authorization", ""))
+        if tenant:
+            return "arm", f"tenant:{tenant}"
+        match = _BILLING_ACCOUNT.search(parsed.path)
+        return "arm", f"billingAccount:{match.group(1).lower()}" if match else "tenant"
+    # Each storage account has its own Blob host and its own limits
+    return "storage", parsed.netloc
+
+
+def remaining_quota(headers) -> int:
+    """Lowest remaining request count in x-ms-ratelimit-remaining-* style headers, or None."""
+    lowest = None
+    for name, value in headers.items():
+        name = name.lower()
+        if not name.startswith("x-ms-ratelimit-") or "remaining" not in name:
+            continue
+        for number in _INTEGER.findall(value):
+            count = int(number)
+            lowest = count if lowest is None or count < lowest else lowest
+    return lowest
+
+
+def throttle_delay(headers, include_retry_after: bool = True):
+    """Seconds to back off from Retry-After style headers, or None.
+
+    Plain Retry-After also appears on 202 responses of long-running operations,
+    so it only signals throttling together with a 429/503 status.
+    """
+    delays = []
+    for name, value in headers.items():
+        name = name.lower()
+        if (include_retry_after and name == "retry-after") or (
+            name.startswith("x-ms-ratelimit-") and name.endswith("retry-after")
+        ):
+            try:
+                delays.append(float(value))
+            except ValueError:
+                continue
+    return max(delays) if delays else None
+
+
+class RateLimiter:
+    """Registry of token buckets keyed by endpoint class and throttling scope."""
+
+    def __init__(self):
+        self.buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url: str, headers: dict = None) -> TokenBucket:
+        key = throttle_scope(url, headers)
+        with self._lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                rate, capacity, max_rate = LIMITS[key[0]]
+                bucket = self.buckets[key] = TokenBucket(rate, capacity, max_rate)
+            return bucket
+
+    def acquire(self, url: str, headers: dict = None) -> float:
+        return self.bucket(url, headers).acquire()
+
+    def observe(self, url: str, response, headers: dict = None):
+        """Feed a response's status and throttling headers back into its bucket."""
+        bucket = self.bucket(url, headers)
+        headers = response.headers
+        if response.status_code in (429, 503):
+            delay = throttle_delay(headers)
+            bucket.pause(delay if delay is not None else 1.0)
+            return
+        delay = throttle_delay(headers, include_retry_after=False)
+        if delay:
+            bucket.pause(delay)
+            return
+        bucket.adjust(remaining_quota(headers))
@@ -0,0 +1,216 @@
+"""
+Local, indexed store of Cost Management export runs.
+
+Runs are merged in as they are fetched and kept indexed by submitted time and by
+the months they cover, so the latest run is a cheap lookup and per-month views
+do not have to re-sort the whole history. The store is persisted to a JSON file
+so later invocations only need to fetch recent runs.
+
+The store keeps at most MAX_RUNS runs per export, dropping the oldest
+submitted first. History files of exports that have not been used for
+STALE_FILE_DAYS are removed whenever another history is saved.
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from dateutil.relativedelta import relativedelta
+
+from azure_auth import default_cache_path
+
+SUCCESS_STATUSES = ("Completed", "Succeeded")
+ACTIVE_STATUSES = ("Queued", "InProgress")
+
+# Runs kept per export: several years of daily scheduled runs plus backfills
+MAX_RUNS = 2000
+STALE_FILE_DAYS = 180
+
+
+def run_info_from_api(run: dict) -> dict:
+    """Flatten a runHistory item into the run_info format used by the backfill script."""
+    props = run.get("properties", {})
+    return {
+        "id": run.get("id") or run.get("name") or props.get("submittedTime", ""),
+        "status": props.get("status", "Unknown"),
+        "submitted": props.get("submittedTime", ""),
+        "processing_start": props.get("processingStartTime", ""),
+        "processing_end": props.get("processingEndTime", ""),
+        "file_name": props.get("fileName", ""),
+        "start_date": props.get("startDate", ""),
+        "end_date": props.get("endDate", ""),
+        "execution_type": props.get("executionType", ""),
+    }
+
+
+def covered_months(run: dict) -> list:
+    """YYYY-MM keys of every month a run's period touches."""
+    try:
+        start = datetime.strptime(run["start_date"][:7], "%Y-%m")
+        end = datetime.strptime((run["end_date"] or run["start_date"])[:7], "%Y-%m")
+    except (KeyError, ValueError):
+        return []
+    months = []
+    while start <= end and len(months) < 120:
+        months.append(start.strftime("%Y-%m"))
+        start += relativedelta(months=1)
+    return months
+
+
+def run_duration(run: dict):
+    """Processing time of a finished run as a timedelta, or None if unknown."""
+    start, end = run.get("processing_start", ""), run.get("processing_end", "")
+    if not start or not end or start.startswith("0001") or end.startswith("0001"):
+        return None
+    try:
+        return datetime.fromisoformat(end[:19]) - datetime.fromisoformat(start[:19])
+    except ValueError:
+        return None
+
+
+def period_days(run: dict) -> int:
+    """Number of days in a run's export period, or 0 if unknown."""
+    try:
+        start = datetime.strptime(run["start_date"][:10], "%Y-%m-%d")
+        end = datetime.strptime((run["end_date"] or run["start_date"])[:10], "%Y-%m-%d")
+    except (KeyError, ValueError):
+        return 0
+    return max(0, (end - start).days + 1)
+
+
+def seconds_per_day(runs) -> float:
+    """Median processing seconds per exported day over runs with a known duration, or None."""
+    rates = []
+    for run in runs:
+        duration = run_duration(run)
+        days = period_days(run)
+        if duration and days:
+            rates.append(duration.total_seconds() / days)
+    if not rates:
+        return None
+    rates.sort()
+    return rates[len(rates) // 2]
+
+
+def history_cache_path(billing_scope: str, export_name: str) -> str:
+    """Per-export history file next to the token cache."""
+    key = hashlib.sha256(f"{billing_scope}|{export_name}".encode()).hexdigest()[:24]
+    return os.path.join(os.path.dirname(default_cache_path()), "run_history", f"{key}.json")
+
+
+def remove_stale_histories(directory: str, max_age_days: float = STALE_FILE_DAYS):
+    """Delete history files in `directory` not written for `max_age_days`."""
+    cutoff = time.time() - max_age_days * 86400
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            if name.endswith(".json") and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            continue
+
+
+class RunHistory:
+    """Export runs indexed by id, submitted time and covered month."""
+
+    def __init__(self, cache_path: str = None):
+        self.cache_path = cache_path
+        self.runs = {}
+        self.by_submitted = []
+        self.by_month = {}
+        if cache_path:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_path) as f:
+                runs = json.load(f)
+        except (OSError, ValueError):
+            return
+        for run in runs:
+            self._add(run)
+        self._prune()
+
+    def save(self):
+        if not self.cache_path:
+            return
+        directory = os.path.dirname(self.cache_path)
+        try:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".runs-")
+            with os.fdopen(fd, "w") as f:
+                json.dump(list(self.runs.values()), f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            # The history cache is an optimization; the API stays the source of truth
+            pass
+        remove_stale_histories(directory)
+
+    def _add(self, run: dict):
+        old = self.runs.get(run["id"])
+        if old:
+            self.by_submitted.remove((old["submitted"], old["id"]))
+            for month in covered_months(old):
+                self.by_month.get(month, set()).discard(old["id"])
+        self.runs[run["id"]] = run
+        bisect.insort(self.by_submitted, (run["submitted"], run["id"]))
+        for month in covered_months(run):
+            self.by_month.setdefault(month, set()).add(run["id"])
+
+    def _prune(self):
+        """Drop the oldest submitted runs beyond MAX_RUNS."""
+        excess = len(self.by_submitted) - MAX_RUNS
+        if excess <= 0:
+            return
+        dropped = self.by_submitted[:excess]
+        del self.by_submitted[:excess]
+        for _, run_id in dropped:
+            run = self.runs.pop(run_id)
+            for month in covered_months(run):
+                month_runs = self.by_month.get(month)
+                if month_runs is not None:
+                    month_runs.discard(run_id)
+                    if not month_runs:
+                        del self.by_month[month]
+
+    def merge(self, api_runs: list) -> int:
+        """Merge runs from the API. Returns how many were new or changed."""
+        changed = 0
+        for api_run in api_runs:
+            run = run_info_from_api(api_run)
+            if self.runs.get(run["id"]) != run:
+                self._add(run)
+                changed += 1
+        if changed:
+            self._prune()
+            self.save()
+        return changed
+
+    def latest(self):
+        """Most recently submitted run, or None."""
+        if not self.by_submitted:
+            return None
+        return self.runs[self.by_submitted[-1][1]]
+
+    def runs_for_month(self, month: str) -> list:
+        """Runs covering a YYYY-MM month, newest first."""
+        runs = [self.runs[run_id] for run_id in self.by_month.get(month, ())]
+        return sorted(runs, key=lambda r: r["submitted"], reverse=True)
+
+    def latest_successful_by_month(self) -> dict:
+        """Map of YYYY-MM -> newest successful run covering that month."""
+        result = {}
+        for month in self.by_month:
+            for run in self.runs_for_month(month):
+                if run["status"] in SUCCESS_STATUSES:
+                    result[month] = run
+                    break
+        return result
@@ -0,0 +1,41 @@
+"""
+Shared fixtures. The scripts import their siblings directly, so the scripts
+directory and benchmarks/ (for the fake Azure endpoints) go on sys.path.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [SCRIPTS_DIR, os.path.join(SCRIPTS_DIR, "benchmarks")]
+
+from fake_azure import FakeAzure  # noqa: E402
+
+CREDENTIALS = ["--tenant-id", "test-tenant", "--client-id", "test-client", "--client-secret", "test-secret"]
+
+
+@pytest.fixture
+def fake_azure():
+    fake = FakeAzure(blob_count=24, months=3, first_month="2025-01").start()
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture
+def run_script(tmp_path):
+    """Run a script as `python3 <script>` against a fake server, like a user would."""
+
+    def run(fake: FakeAzure, script: str, *args: str) -> subprocess.CompletedProcess:
+        env = dict(os.environ, **fake.environment())
+        # Keep token, run history and journal caches out of the real home directory
+        env["XDG_CACHE_HOME"] = str(tmp_path / "cache")
+        env.pop("DIGIUSHER_TOKEN_CACHE", None)
+        return subprocess.run(
+            [sys.executable, script, *CREDENTIALS, *args],
+            cwd=SCRIPTS_DIR, env=env, capture_output=True, text=True, timeout=120,
+        )
+
+    return run
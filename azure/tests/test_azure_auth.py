@@ -0,0 +1,118 @@
+import json
+import os
+import stat
+import threading
+import time
+
+import pytest
+
+import azure_auth
+from azure_auth import ARM_RESOURCE, REFRESH_WINDOW, STORAGE_RESOURCE, AzureAuthenticator, TokenCache
+
+
+class StubTokenResponse:
+    def __init__(self, token: str):
+        self.token = token
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"access_token": self.token, "expires_in": 3600}
+
+
+class TokenEndpoint:
+    """Counts token exchanges; `gate` holds them until set."""
+
+    def __init__(self):
+        self.calls = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self._lock = threading.Lock()
+
+    def post(self, url, data=None, **kwargs):
+        self.gate.wait(5)
+        with self._lock:
+            self.calls.append(data)
+            return StubTokenResponse(f"token-{len(self.calls)}")
+
+
+@pytest.fixture
+def endpoint(tmp_path, monkeypatch):
+    monkeypatch.setenv("DIGIUSHER_TOKEN_CACHE", str(tmp_path / "cache" / "tokens.json"))
+    stub = TokenEndpoint()
+    monkeypatch.setattr(azure_auth.azure_http, "post", stub.post)
+    return stub
+
+
+def authenticator(secret: str = "secret-a") -> AzureAuthenticator:
+    return AzureAuthenticator("tenant", "client", secret)
+
+
+def test_tokens_are_reused_from_the_file_cache(endpoint):
+    assert authenticator().get_token() == "token-1"
+    assert authenticator().get_token() == "token-1"
+    assert len(endpoint.calls) == 1
+
+
+def test_cache_key_changes_with_the_secret(endpoint):
+    authenticator("secret-a").get_token()
+    assert authenticator("secret-b").get_token() == "token-2"
+    assert len(endpoint.calls) == 2
+    assert authenticator("secret-a")._cache_key("s") != authenticator("secret-b")._cache_key("s")
+    with open(azure_auth.default_cache_path()) as f:
+        assert len(json.load(f)) == 2
+
+
+def test_cache_file_is_private_and_written_atomically(endpoint):
+    authenticator().get_token()
+    path = azure_auth.default_cache_path()
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert os.listdir(os.path.dirname(path)) == ["tokens.json"]
+    with open(path) as f:
+        assert "secret-a" not in f.read()
+
+
+def test_expired_entries_are_dropped(tmp_path):
+    cache = TokenCache(str(tmp_path / "tokens.json"))
+    with open(cache.path, "w") as f:
+        json.dump({"old": {"access_token": "old", "expires_on": time.time() - 1}}, f)
+    assert cache.get("old") is None
+
+    cache.put("new", "new", time.time() + 60)
+    with open(cache.path) as f:
+        assert list(json.load(f)) == ["new"]
+
+
+def test_concurrent_callers_share_one_exchange(endpoint):
+    auth = authenticator()
+    endpoint.gate.clear()
+    tokens = []
+    threads = [threading.Thread(target=lambda: tokens.append(auth.get_token(STORAGE_RESOURCE))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    endpoint.gate.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert tokens == ["token-1"] * 8
+    assert len(endpoint.calls) == 1
+
+
+def test_token_near_expiry_is_refreshed_in_the_background(endpoint):
+    auth = authenticator()
+    scope = azure_auth.scope_for_resource(ARM_RESOURCE)
+    auth._tokens[scope] = {"access_token": "old", "expires_on": time.time() + REFRESH_WINDOW - 10}
+    endpoint.gate.clear()
+
+    # The still-valid token is handed out while the refresh waits on the token endpoint
+    assert auth.get_token() == "old"
+    assert auth.get_token() == "old"
+    endpoint.gate.set()
+
+    deadline = time.time() + 5
+    while auth._tokens[scope]["access_token"] == "old" and time.time() < deadline:
+        time.sleep(0.01)
+    assert auth.get_token() == "token-1"
+    assert len(endpoint.calls) == 1
@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+import requests
+
+import azure_http
+
+URL = "https://management.azure.com/providers/Microsoft.CostManagement/exports/focus-export"
+
+
+def response(status: int, **headers) -> requests.Response:
+    r = requests.Response()
+    r.status_code = status
+    r.headers.update(headers)
+    r._content = b""
+    r._content_consumed = True
+    return r
+
+
+class StubSession:
+    """Answers each request with the next scripted response, or raises it if it is an exception."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def request(self, method, url, timeout=None, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    """Install a scripted session; returns (install, sleeps)."""
+    sleeps = []
+    monkeypatch.setattr(azure_http.time, "sleep", sleeps.append)
+    monkeypatch.setitem(azure_http._settings, "rate_limit", False)
+    monkeypatch.setattr(azure_http.metrics, "active", lambda: None)
+
+    def install(*outcomes) -> StubSession:
+        session = StubSession(*outcomes)
+        monkeypatch.setattr(azure_http, "get_session", lambda: session)
+        return session
+
+    return install, sleeps
+
+
+@pytest.mark.parametrize("method", ["GET", "PUT", "DELETE", "POST"])
+@pytest.mark.parametrize("status", [429, 503])
+def test_throttling_is_retried_for_every_method(transport, method, status):
+    install, sleeps = transport
+    session = install(response(status, **{"Retry-After": "2"}), response(200))
+    assert azure_http.request(method, URL).status_code == 200
+    assert session.calls == 2
+    assert sleeps == [2.0]
+
+
+@pytest.mark.parametrize("status", [500, 502, 504])
+def test_server_errors_are_retried_only_for_idempotent_methods(transport, status):
+    install, _ = transport
+    session = install(response(status), response(200))
+    assert azure_http.request("GET", URL).status_code == 200
+    assert session.calls == 2
+
+    session = install(response(status), response(200))
+    assert azure_http.request("POST", URL).status_code == status
+    assert session.calls == 1
+
+
+def test_read_timeout_on_post_is_not_retried(transport):
+    install, _ = transport
+    session = install(requests.ReadTimeout("read timed out"), response(200))
+    with pytest.raises(requests.ReadTimeout):
+        azure_http.request("POST", URL)
+    assert session.calls == 1
+
+
+def test_connect_timeout_is_retried_for_post(transport):
+    install, _ = transport
+    session = install(requests.ConnectTimeout("connect timed out"), response(200))
+    assert azure_http.request("POST", URL).status_code == 200
+    assert session.calls == 2
+
+
+def test_read_timeout_on_get_is_retried(transport):
+    install, _ = transport
+    session = install(requests.ReadTimeout("read timed out"), response(200))
+    assert azure_http.request("GET", URL).status_code == 200
+    assert session.calls == 2
+
+
+def test_retry_after_as_http_date(transport):
+    install, sleeps = transport
+    retry_at = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    install(response(429, **{"Retry-After": retry_at}), response(200))
+    azure_http.request("GET", URL)
+    assert 25 <= sleeps[0] <= 30
+
+
+def test_cost_management_retry_after_is_the_fallback(transport):
+    install, sleeps = transport
+    install(
+        response(429, **{"x-ms-ratelimit-microsoft.costmanagement-clienttype-retry-after": "17"}),
+        response(200),
+    )
+    azure_http.request("POST", URL)
+    assert sleeps == [17.0]
+
+
+def test_retry_after_is_capped_and_retries_run_out(transport):
+    install, sleeps = transport
+    session = install(*[response(429, **{"Retry-After": "600"}) for _ in range(3)])
+    assert azure_http.request("GET", URL, max_retries=2).status_code == 429
+    assert session.calls == 3
+    assert sleeps == [azure_http.BACKOFF_MAX] * 2
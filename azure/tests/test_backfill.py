@@ -0,0 +1,14 @@
+SCOPE = "/providers/Microsoft.Billing/billingAccounts/1234"
+
+
+def backfill_args(*args: str) -> list:
+    return ["--billing-scope", SCOPE, "--export-name", "focus-export", *args]
+
+
+def test_single_month_does_not_fetch_full_run_history(fake_azure, run_script):
+    result = run_script(fake_azure, "backfill_historical_data.py", *backfill_args("--month", "2025-01"))
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert len(fake_azure.runs) == 1
+    assert fake_azure.runs[0]["from"].startswith("2025-01-01")
+    assert fake_azure.stats["run_history"] == 0
+
@@ -0,0 +1,171 @@
+import json
+from datetime import datetime, timezone
+
+from backfill_historical_data import FocusExportBackfill
+from backfill_journal import BackfillJournal
+from run_history import RunHistory
+
+SCOPE = "/providers/Microsoft.Billing/billingAccounts/1234"
+EXPORT = "focus-export"
+
+JAN = (datetime(2025, 1, 1), datetime(2025, 1, 31))
+FEB = (datetime(2025, 2, 1), datetime(2025, 2, 28))
+MAR = (datetime(2025, 3, 1), datetime(2025, 3, 31))
+
+TRIGGERED = {"success": True, "status_code": 200}
+
+
+def now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def run(run_id: str, window: tuple, status: str) -> dict:
+    return {
+        "id": run_id,
+        "status": status,
+        "submitted": now(),
+        "start_date": window[0].strftime("%Y-%m-%dT00:00:00Z"),
+        "end_date": window[1].strftime("%Y-%m-%dT00:00:00Z"),
+    }
+
+
+def api_run(run_id: str, window: tuple, status: str) -> dict:
+    info = run(run_id, window, status)
+    return {"id": run_id, "properties": {
+        "status": status, "submittedTime": info["submitted"],
+        "startDate": info["start_date"], "endDate": info["end_date"],
+    }}
+
+
+def open_journal(tmp_path) -> BackfillJournal:
+    return BackfillJournal(str(tmp_path / "journal.jsonl"), SCOPE, EXPORT)
+
+
+def test_trigger_without_status_is_pending_not_done(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.record_trigger(*JAN, TRIGGERED)
+
+    reopened = open_journal(tmp_path)
+    assert reopened.is_pending(*JAN)
+    assert not reopened.is_done(*JAN)
+
+    reopened.record_run(run("run-1", JAN, "Completed"))
+    assert not reopened.is_pending(*JAN)
+    assert open_journal(tmp_path).is_done(*JAN)
+
+
+def test_failed_trigger_is_neither_pending_nor_done(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.record_trigger(*JAN, {"success": False, "status_code": 429})
+    assert not journal.is_pending(*JAN)
+    assert not journal.is_done(*JAN)
+
+
+def test_torn_last_line_is_skipped_and_next_record_kept(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.record_trigger(*JAN, TRIGGERED)
+    with open(journal.path, "a") as f:
+        f.write('{"type": "trigger", "from": "2025-02-01", "to": "2025-0')
+
+    reopened = open_journal(tmp_path)
+    assert list(reopened.windows) == [("2025-01-01", "2025-01-31")]
+
+    reopened.record_trigger(*MAR, TRIGGERED)
+    assert open_journal(tmp_path).is_pending(*MAR)
+
+
+def test_reset_forgets_earlier_windows(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.record_trigger(*JAN, TRIGGERED)
+    journal.record_run(run("run-1", JAN, "Completed"))
+    journal.reset()
+    journal.record_trigger(*FEB, TRIGGERED)
+
+    reopened = open_journal(tmp_path)
+    assert not reopened.is_done(*JAN)
+    assert reopened.is_pending(*FEB)
+
+
+def test_other_exports_in_the_same_file_are_ignored(tmp_path):
+    open_journal(tmp_path).record_trigger(*JAN, TRIGGERED)
+    other = BackfillJournal(str(tmp_path / "journal.jsonl"), SCOPE, "other-export")
+    assert other.windows == {}
+
+
+def test_reconcile_records_newest_matching_run(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.record_trigger(*JAN, TRIGGERED)
+    journal.record_trigger(*FEB, TRIGGERED)
+
+    history = RunHistory(None)
+    history.merge([
+        api_run("run-jan", JAN, "Completed"),
+        api_run("run-feb", FEB, "InProgress"),
+        # A run for another window in the same month does not count
+        api_run("run-feb-half", (datetime(2025, 2, 1), datetime(2025, 2, 14)), "Completed"),
+    ])
+
+    assert journal.reconcile(history) == 2
+    assert journal.is_done(*JAN)
+    assert journal.is_pending(*FEB) and not journal.is_done(*FEB)
+    # Nothing new the second time
+    assert journal.reconcile(history) == 0
+
+    with open(journal.path) as f:
+        records = [json.loads(line) for line in f]
+    assert [r["run_id"] for r in records if r["type"] == "status"] == ["run-jan", "run-feb"]
+
+
+def test_is_done_combines_completed_windows(tmp_path):
+    journal = open_journal(tmp_path)
+    halves = [(datetime(2025, 1, 1), datetime(2025, 1, 15)), (datetime(2025, 1, 16), datetime(2025, 1, 31))]
+    for i, window in enumerate(halves):
+        journal.record_trigger(*window, TRIGGERED)
+        journal.record_run(run(f"run-{i}", window, "Completed"))
+    assert journal.is_done(*JAN)
+    assert not journal.is_done(datetime(2025, 1, 20), datetime(2025, 2, 2))
+
+
+class QueueBackfill(FocusExportBackfill):
+    """Backfill with the ARM calls replaced; runHistory comes from `api_runs`."""
+
+    def __init__(self, journal, api_runs):
+        super().__init__(None, SCOPE, EXPORT, use_cache=False, journal=journal)
+        self.api_runs = api_runs
+        self.triggered = []
+
+    def log(self, message: str = ""):
+        pass
+
+    def load_run_history(self):
+        pass
+
+    def refresh_run_history(self):
+        self.history.merge(self.api_runs)
+        return None
+
+    def plan_windows(self, year, month):
+        return [{1: JAN, 2: FEB, 3: MAR}[month]]
+
+    def wait_for_export_idle(self, since=None, max_wait=0):
+        return {"idle": True, "run_info": {"submitted": ""}}
+
+    def execute_export_for_period(self, first_day, last_day):
+        self.triggered.append(first_day.month)
+        return dict(TRIGGERED, date_range="")
+
+
+def test_month_queue_resumes_from_journal(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.record_trigger(*JAN, TRIGGERED)
+    journal.record_run(run("run-jan", JAN, "Completed"))
+    # February was triggered just before a crash; its run finished while nothing was watching
+    journal.record_trigger(*FEB, TRIGGERED)
+
+    backfill = QueueBackfill(open_journal(tmp_path), [api_run("run-feb", FEB, "Completed")])
+    backfill.month_queue = [(2025, 1), (2025, 2), (2025, 3)]
+    result = backfill.run_month_queue()
+
+    assert backfill.triggered == [3]
+    assert result["skipped"] == 2
+    assert result["success"]
@@ -0,0 +1,58 @@
+import verify_exports
+from blob_index import BlobIndex
+
+RUN = "focus/focus-export/20240101-20240131/"
+
+
+def blob(name: str, size: int = 100) -> dict:
+    return {"name": name, "size": size, "modified": "Fri, 02 Feb 2024 08:00:00 GMT", "etag": f"0x{size:X}", "md5": ""}
+
+
+class StubContainer:
+    """In-memory container answering List Blobs, with or without a "/" delimiter."""
+
+    def __init__(self, blobs):
+        self.blobs = list(blobs)
+        self.full_listings = []
+
+    def list(self, auth, account, container, prefix=None, delimiter=None):
+        prefix = prefix or ""
+        if not delimiter:
+            self.full_listings.append(prefix)
+        folders = set()
+        for item in self.blobs:
+            if not item["name"].startswith(prefix):
+                continue
+            rest = item["name"][len(prefix):]
+            if delimiter and delimiter in rest:
+                folders.add(prefix + rest.split(delimiter, 1)[0] + delimiter)
+            else:
+                yield "blob", item
+        for folder in sorted(folders):
+            yield "prefix", folder
+
+
+def scan(index: BlobIndex):
+    return verify_exports.list_export_months_incremental(None, "acct", "exports", "focus", index)
+
+
+def test_settled_period_with_new_run_folder_is_relisted(tmp_path, monkeypatch):
+    container = StubContainer([blob(f"{RUN}run-a/part_0_0001.parquet", 100)])
+    monkeypatch.setattr(verify_exports, "_list_container", container.list)
+    index = BlobIndex(str(tmp_path / "index.db"))
+
+    first = scan(index)
+    assert first["2024-01"]["files"] == 1
+    assert container.full_listings == [RUN]
+
+    # The period settled long ago: an unchanged run folder set is served from the index
+    container.full_listings.clear()
+    assert scan(index) == first
+    assert container.full_listings == []
+
+    # A backfill re-export writes a new run folder under the old period
+    container.blobs.append(blob(f"{RUN}run-b/part_0_0001.parquet", 300))
+    second = scan(index)
+    assert container.full_listings == [RUN]
+    assert second["2024-01"]["files"] == 2
+    assert second["2024-01"]["periods"] == {RUN}
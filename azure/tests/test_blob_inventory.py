@@ -0,0 +1,121 @@
+import json
+import os
+
+import pytest
+
+import verify_exports
+from blob_index import period_child
+from blob_inventory import find_local_manifest, iter_inventory_file, iter_inventory_parquet
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "inventory.csv")
+
+# The same blobs as fixtures/inventory.csv, as List Blobs returns them
+LISTING = [
+    {"name": "focus/focus-export/20250101-20250131/run-a/part_0_0001.parquet", "size": 1048576,
+     "modified": "Sun, 02 Feb 2025 08:15:30 GMT", "etag": "0x8DD4310A1B2C3D4"},
+    {"name": "focus/focus-export/20250101-20250131/run-a/part_1_0001.parquet", "size": 524288,
+     "modified": "Sun, 02 Feb 2025 08:16:01 GMT", "etag": "0x8DD4310A1B2C3D5"},
+    {"name": "focus/focus-export/20250101-20250131/run-a/manifest.json", "size": 1432,
+     "modified": "Sun, 02 Feb 2025 08:17:00 GMT", "etag": "0x8DD4310A1B2C3D6"},
+    {"name": "focus/focus-export/20250201-20250228/run-b/part_0_0001.parquet", "size": 2097152,
+     "modified": "Sun, 02 Mar 2025 07:05:42 GMT", "etag": "0x8DD5910A1B2C3D7"},
+    {"name": "focus/focus-export/20250201-20250228/run-b/manifest.json", "size": 1250,
+     "modified": "Sun, 02 Mar 2025 07:06:10 GMT", "etag": "0x8DD5910A1B2C3D8"},
+    {"name": "focus/focus-export/20250201-20250228/run-c/part_0_0001.parquet", "size": 2097000,
+     "modified": "Mon, 03 Mar 2025 07:04:00 GMT", "etag": "0x8DD5A10A1B2C3D9"},
+    {"name": "focus/readme.txt", "size": 12,
+     "modified": "Wed, 15 Jan 2025 12:00:00 GMT", "etag": "0x8DD3510A1B2C3DA"},
+]
+PERIODS = ["focus/focus-export/20250101-20250131/", "focus/focus-export/20250201-20250228/"]
+
+
+def serve(monkeypatch, blobs: list) -> list:
+    """Answer the live listings from `blobs`; returns the prefixes listed in full."""
+    live_listings = []
+
+    def list_blobs(auth, account, container, prefix=None):
+        live_listings.append(prefix)
+        return iter([dict(b, md5="") for b in blobs if not prefix or b["name"].startswith(prefix)])
+
+    def list_children(auth, account, container, prefix):
+        return {period_child(prefix, b["name"]) for b in blobs if b["name"].startswith(prefix)}
+
+    monkeypatch.setattr(verify_exports, "list_blobs_rest", list_blobs)
+    monkeypatch.setattr(verify_exports, "list_period_children", list_children)
+    monkeypatch.setattr(verify_exports, "discover_period_prefixes", lambda *args, **kwargs: list(PERIODS))
+    return live_listings
+
+
+def copy_report(tmp_path, completed: str = None) -> str:
+    report = tmp_path / "focus-exports_1000000_0.csv"
+    report.write_bytes(open(FIXTURE, "rb").read())
+    if completed:
+        (tmp_path / "focus-exports-manifest.json").write_text(json.dumps({
+            "inventoryCompletionTime": completed,
+            "files": [{"blob": "2025/04/01/00-00-00/focus-exports/focus-exports_1000000_0.csv"}],
+        }))
+    return str(report)
+
+
+def test_csv_report_yields_listing_blobs():
+    assert list(iter_inventory_file(FIXTURE, "focus/")) == LISTING
+
+
+def test_parquet_report_yields_listing_blobs(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    csv = pytest.importorskip("pyarrow.csv")
+    pq = pytest.importorskip("pyarrow.parquet")
+    # Inventory Parquet files store Last-Modified as a timestamp and Etag as a string
+    table = csv.read_csv(FIXTURE, convert_options=csv.ConvertOptions(column_types={"Etag": pa.string()}))
+    path = str(tmp_path / "inventory.parquet")
+    pq.write_table(table, path)
+    assert list(iter_inventory_parquet(path, "focus/")) == LISTING
+
+
+def test_inventory_summary_matches_listing(tmp_path, monkeypatch):
+    # Snapshot long after both periods settled, so nothing is listed live
+    report = copy_report(tmp_path, completed="2025-04-01T02:00:00.1234567Z")
+    live_listings = serve(monkeypatch, LISTING)
+
+    from_inventory = verify_exports.list_export_months_from_inventory(
+        None, "acct", "exports", "focus", inventory_path=report,
+    )
+    assert live_listings == []
+
+    from_listing = verify_exports.list_export_months(None, "acct", "exports", "focus")
+
+    assert from_inventory == from_listing
+    assert sorted(from_inventory) == ["2025-01", "2025-02"]
+    assert from_inventory["2025-02"]["files"] == 3
+    assert from_inventory["2025-02"]["periods"] == {PERIODS[1]}
+
+
+def test_local_manifest_is_found_next_to_report(tmp_path):
+    report = copy_report(tmp_path, completed="2025-04-01T02:00:00.1234567Z")
+    assert find_local_manifest(report)["snapshot"].isoformat() == "2025-04-01T02:00:00+00:00"
+    assert find_local_manifest(str(tmp_path / "other.csv")) is None
+
+
+def test_snapshot_without_manifest_is_newest_last_modified(tmp_path, monkeypatch):
+    # The file's mtime is when it was copied, not when the inventory ran
+    report = copy_report(tmp_path)
+    live_listings = serve(monkeypatch, LISTING)
+
+    verify_exports.list_export_months_from_inventory(None, "acct", "exports", "focus", inventory_path=report)
+
+    # Newest blob is 2025-03-03, so February was still settling at the snapshot
+    assert live_listings == [PERIODS[1]]
+
+
+def test_settled_period_with_run_after_snapshot_is_listed_live(tmp_path, monkeypatch):
+    report = copy_report(tmp_path, completed="2025-04-01T02:00:00.1234567Z")
+    rerun = {"name": f"{PERIODS[0]}run-z/part_0_0001.parquet", "size": 4096,
+             "modified": "Tue, 10 Jun 2025 09:00:00 GMT", "etag": "0x8DDA810A1B2C3DB"}
+    live_listings = serve(monkeypatch, LISTING + [rerun])
+
+    months = verify_exports.list_export_months_from_inventory(
+        None, "acct", "exports", "focus", inventory_path=report,
+    )
+
+    assert live_listings == [PERIODS[0]]
+    assert months["2025-01"]["files"] == 4
@@ -0,0 +1,170 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from change_feed import ChangeFeedReader, LocalChangeFeed, segment_path, segment_prefixes, segment_time
+
+SCHEMA = {
+    "type": "record",
+    "name": "BlobChangeEvent",
+    "fields": [
+        {"name": "schemaVersion", "type": "int"},
+        {"name": "topic", "type": "string"},
+        {"name": "subject", "type": "string"},
+        {"name": "eventType", "type": "string"},
+        {"name": "eventTime", "type": "string"},
+        {"name": "id", "type": "string"},
+        {"name": "data", "type": {
+            "type": "record",
+            "name": "Data",
+            "fields": [
+                {"name": "api", "type": "string"},
+                {"name": "contentLength", "type": ["null", "long"]},
+                {"name": "etag", "type": "string"},
+            ],
+        }},
+    ],
+}
+PERIOD = "focus/focus-export/20250301-20250331/run-0001"
+
+
+def event(container: str, name: str, kind: str, time: str, length=None, etag="") -> dict:
+    return {
+        "schemaVersion": 3,
+        "topic": "/subscriptions/s/resourceGroups/r/providers/Microsoft.Storage/storageAccounts/acct",
+        "subject": f"/blobServices/default/containers/{container}/blobs/{name}",
+        "eventType": kind,
+        "eventTime": time,
+        "id": f"{kind}-{name}",
+        "data": {"api": "PutBlockList" if kind == "BlobCreated" else "DeleteBlob", "contentLength": length, "etag": etag},
+    }
+
+
+@pytest.fixture
+def feed(tmp_path):
+    """A $blobchangefeed copy with two finished hourly segments and one still being written."""
+    fastavro = pytest.importorskip("fastavro")
+
+    def write_json(path: str, data: dict):
+        target = tmp_path / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(json.dumps(data))
+
+    def write_avro(path: str, records: list):
+        target = tmp_path / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(target, "wb") as f:
+            fastavro.writer(f, SCHEMA, records)
+
+    write_json("meta/segments.json", {"version": 0, "lastConsumable": "2025-04-02T11:00:00.0000000Z"})
+
+    write_json("idx/segments/2025/04/02/1000/meta.json", {"chunkFilePaths": ["$blobchangefeed/log/00/2025/04/02/1000/"]})
+    write_avro("log/00/2025/04/02/1000/000000.avro", [
+        event("exports", f"{PERIOD}/part_0000001.parquet", "BlobCreated", "2025-04-02T10:05:00.0000000Z", 2048, "0x2"),
+        event("exports", f"{PERIOD}/part_0000000.parquet", "BlobCreated", "2025-04-02T10:01:00.0000000Z", 1024, "0x1"),
+        # Other containers and event types are ignored
+        event("other", f"{PERIOD}/part_0000000.parquet", "BlobCreated", "2025-04-02T10:02:00.0000000Z", 1, "0x9"),
+        event("exports", f"{PERIOD}/part_0000000.parquet", "BlobPropertiesUpdated", "2025-04-02T10:03:00.0000000Z"),
+    ])
+
+    write_json("idx/segments/2025/04/02/1100/meta.json", {"chunkFilePaths": [
+        "$blobchangefeed/log/00/2025/04/02/1100/",
+        "$blobchangefeed/log/01/2025/04/02/1100/",
+    ]})
+    write_avro("log/00/2025/04/02/1100/000000.avro", [
+        event("exports", f"{PERIOD}/part_0000000.parquet", "BlobDeleted", "2025-04-02T11:20:00.0000000Z"),
+    ])
+    write_avro("log/01/2025/04/02/1100/000000.avro", [
+        event("exports", f"{PERIOD}/part_0000002.parquet", "BlobCreated", "2025-04-02T11:10:00.0000000Z", 4096, "0x3"),
+    ])
+
+    # Not yet consumable
+    write_json("idx/segments/2025/04/02/1200/meta.json", {"chunkFilePaths": []})
+    return ChangeFeedReader(LocalChangeFeed(str(tmp_path)), "exports")
+
+
+def test_segment_path_round_trip():
+    path = segment_path(segment_time("idx/segments/2025/04/02/1100/meta.json"))
+    assert path == "idx/segments/2025/04/02/1100/meta.json"
+    assert segment_time("idx/segments/bad/meta.json") is None
+
+
+def test_segments_stop_at_last_consumable(feed):
+    until = feed.last_consumable()
+    assert feed.segments(None, until) == [
+        "idx/segments/2025/04/02/1000/meta.json",
+        "idx/segments/2025/04/02/1100/meta.json",
+    ]
+
+
+def test_segments_after_cursor(feed):
+    until = feed.last_consumable()
+    assert feed.segments("idx/segments/2025/04/02/1000/meta.json", until) == ["idx/segments/2025/04/02/1100/meta.json"]
+    assert feed.segments("idx/segments/2025/04/02/1100/meta.json", until) == []
+
+
+def test_segments_list_from_the_cursor_day(feed):
+    listed = []
+    source_list = feed.source.list
+    feed.source.list = lambda prefix: listed.append(prefix) or source_list(prefix)
+
+    feed.segments("idx/segments/2025/04/02/1000/meta.json", feed.last_consumable())
+    assert listed == ["idx/segments/2025/04/02/"]
+
+
+def test_segment_prefixes_span_days_then_months():
+    assert segment_prefixes(datetime(2024, 12, 30, 23), datetime(2025, 2, 3, 1)) == [
+        "idx/segments/2024/12/30/",
+        "idx/segments/2024/12/31/",
+        "idx/segments/2025/01/",
+        "idx/segments/2025/02/",
+    ]
+    assert segment_prefixes(None, datetime(2025, 2, 3)) == ["idx/segments/2025/01/", "idx/segments/2025/02/"]
+
+
+def test_events_are_container_creates_and_deletes_in_time_order(feed):
+    events = feed.events("idx/segments/2025/04/02/1000/meta.json")
+    assert [(e["type"], e["name"]) for e in events] == [
+        ("created", f"{PERIOD}/part_0000000.parquet"),
+        ("created", f"{PERIOD}/part_0000001.parquet"),
+    ]
+    assert events[0]["size"] == 1024
+    assert events[0]["etag"] == "0x1"
+    assert events[0]["modified"] == "Wed, 02 Apr 2025 10:01:00 GMT"
+
+
+def test_events_across_shards(feed):
+    events = feed.events("idx/segments/2025/04/02/1100/meta.json")
+    assert [(e["type"], e["name"]) for e in events] == [
+        ("created", f"{PERIOD}/part_0000002.parquet"),
+        ("deleted", f"{PERIOD}/part_0000000.parquet"),
+    ]
+
+
+def test_index_follows_the_change_feed(feed, fake_azure, run_script, tmp_path):
+    index = str(tmp_path / "index.db")
+    args = [
+        "--storage-account", "acct", "--container", "exports", "--export-root-path", "focus",
+        "--index", index, "--change-feed-dir", feed.source.root,
+    ]
+    first = run_script(fake_azure, "verify_exports.py", *args)
+    assert first.returncode == 0, first.stdout + first.stderr
+    assert "Found 24 blobs" in first.stdout
+
+    # The saved cursor is the last consumable segment, so nothing is replayed
+    second = run_script(fake_azure, "verify_exports.py", *args)
+    assert second.returncode == 0, second.stdout + second.stderr
+    assert "Read 0 change feed segment(s)" in second.stdout
+
+
+def test_falls_back_to_listing_without_change_feed(fake_azure, run_script, tmp_path):
+    # The fake storage account has no $blobchangefeed container
+    result = run_script(
+        fake_azure, "verify_exports.py",
+        "--storage-account", "acct", "--container", "exports", "--export-root-path", "focus",
+        "--index", str(tmp_path / "index.db"), "--change-feed",
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "Change feed unavailable" in result.stdout
+    assert "Found 24 blobs" in result.stdout
@@ -0,0 +1,106 @@
+from datetime import date
+
+import pytest
+
+import verify_exports
+from day_coverage import PERIOD_PATTERN, DayCoverage
+
+EXPORT = "focus/focus-export"
+
+
+def coverage(*folders: str) -> DayCoverage:
+    result = DayCoverage()
+    for folder in folders:
+        assert result.add_period_prefix(f"{EXPORT}/{folder}/")
+    return result
+
+
+@pytest.mark.parametrize("prefix, expected", [
+    ("focus/focus-export/20250101-20250131/", ("focus/focus-export", "20250101", "20250131")),
+    ("focus/focus-export/20250101-20250131/run-a/part_0_0001.parquet", ("focus/focus-export", "20250101", "20250131")),
+    ("20250101-20250131/", ("", "20250101", "20250131")),
+    ("a/b/c/20241201-20241231/", ("a/b/c", "20241201", "20241231")),
+])
+def test_period_pattern_splits_export_path_and_dates(prefix, expected):
+    assert PERIOD_PATTERN.match(prefix).groups() == expected
+
+
+@pytest.mark.parametrize("prefix", [
+    "focus/focus-export/20250101-20250131",
+    "focus/focus-export/2025010-20250131/",
+    "focus/focus-export/run-a/",
+])
+def test_period_pattern_rejects_other_folders(prefix):
+    assert PERIOD_PATTERN.match(prefix) is None
+
+
+def test_invalid_dates_are_not_added():
+    result = DayCoverage()
+    assert not result.add_period_prefix(f"{EXPORT}/20250230-20250231/")
+    assert result.exports() == []
+
+
+def test_consecutive_months_have_no_gap_across_year_end():
+    result = coverage("20241201-20241231", "20250101-20250131", "20250201-20250228")
+    assert result.span(EXPORT) == (date(2024, 12, 1), date(2025, 2, 28))
+    assert result.covered_days(EXPORT) == 31 + 31 + 28
+    assert result.missing_ranges(EXPORT) == []
+    assert result.overlap_ranges(EXPORT) == []
+
+
+def test_leap_day_is_a_gap_when_february_ends_on_the_28th():
+    result = coverage("20240201-20240228", "20240301-20240331")
+    assert result.missing_ranges(EXPORT) == [(date(2024, 2, 29), date(2024, 2, 29))]
+
+    result = coverage("20240201-20240229", "20240301-20240331")
+    assert result.missing_ranges(EXPORT) == []
+    assert result.covered_days(EXPORT) == 29 + 31
+
+
+def test_overlapping_runs_are_reported_once():
+    # A full month plus two backfill windows inside it
+    result = coverage("20250101-20250131", "20250110-20250115", "20250114-20250120")
+    assert result.periods[EXPORT] == 3
+    assert result.covered_days(EXPORT) == 31
+    assert result.overlap_ranges(EXPORT) == [(date(2025, 1, 10), date(2025, 1, 20))]
+
+
+def test_missing_ranges_outside_the_covered_span():
+    result = coverage("20250201-20250228")
+    assert result.missing_ranges(EXPORT, since=date(2025, 1, 1), through=date(2025, 3, 31)) == [
+        (date(2025, 1, 1), date(2025, 1, 31)),
+        (date(2025, 3, 1), date(2025, 3, 31)),
+    ]
+    assert DayCoverage().missing_ranges(EXPORT, since=date(2025, 1, 1), through=date(2025, 1, 2)) == [
+        (date(2025, 1, 1), date(2025, 1, 2)),
+    ]
+
+
+def test_exports_are_kept_apart():
+    result = DayCoverage()
+    result.add_period_prefix("focus/a/20250101-20250131/")
+    result.add_period_prefix("focus/b/20250115-20250215/")
+    assert result.exports() == ["focus/a", "focus/b"]
+    assert result.overlap_ranges("focus/a") == []
+
+
+def test_print_day_coverage_reports_gaps_and_overlaps(capsys):
+    months = {
+        "2024-02": {"periods": {f"{EXPORT}/20240201-20240228/"}},
+        "2024-03": {"periods": {f"{EXPORT}/20240301-20240331/", f"{EXPORT}/20240330-20240402/"}},
+        "2024-04": {"periods": {f"{EXPORT}/20240330-20240402/"}},
+    }
+    verify_exports.print_day_coverage(months)
+    out = capsys.readouterr().out
+
+    assert f"{EXPORT}: 2024-02-01 to 2024-04-02, 61 day(s) in 3 period folder(s)" in out
+    assert "Missing 2024-02-29 to 2024-02-29 (1 day(s))" in out
+    assert "Overlapping periods 2024-03-30 to 2024-03-31 (2 day(s))" in out
+    assert "--heal" in out
+
+
+def test_print_day_coverage_without_gaps(capsys):
+    verify_exports.print_day_coverage({"2025-01": {"periods": {f"{EXPORT}/20250101-20250131/"}}})
+    out = capsys.readouterr().out
+    assert "No missing days" in out
+    assert "--heal" not in out
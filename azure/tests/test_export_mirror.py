@@ -0,0 +1,134 @@
+import base64
+import hashlib
+import json
+import os
+
+from export_mirror import PART_SUFFIX, ExportMirror
+
+CHUNK = 1024
+NAME = "focus/focus-export/20250101-20250131/run-a/part_0_0001.parquet"
+
+
+def content(seed: int, size: int = 4 * CHUNK + 100) -> bytes:
+    return bytes((i * seed) % 251 for i in range(size))
+
+
+def md5(data: bytes) -> str:
+    return base64.b64encode(hashlib.md5(data).digest()).decode()
+
+
+def blob(data: bytes, etag: str, checksum: str = None) -> dict:
+    return {"name": NAME, "size": len(data), "modified": "Sun, 02 Feb 2025 08:15:30 GMT",
+            "etag": etag, "md5": md5(data) if checksum is None else checksum}
+
+
+class StubRaw:
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def stream(self, amount, decode_content=True):
+        for i in range(0, len(self.data), 300):
+            yield self.data[i:i + 300]
+
+
+class StubResponse:
+    def __init__(self, data: bytes):
+        self.raw = StubRaw(data)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class StubStore:
+    """Serves ranges of the current version of one blob; If-Match style, a stale ETag fails."""
+
+    def __init__(self, data: bytes, etag: str):
+        self.data, self.etag = data, etag
+        self.ranges = []
+        self.fail_at = None
+
+    def fetch(self, blob, start, end):
+        if blob["etag"] != self.etag:
+            raise RuntimeError("HTTP 412")
+        if start == self.fail_at:
+            raise ConnectionError("connection reset")
+        self.ranges.append(start)
+        return StubResponse(self.data[start:end + 1])
+
+
+def mirror(tmp_path, store: StubStore) -> ExportMirror:
+    return ExportMirror(str(tmp_path / "mirror"), store.fetch, chunk_size=CHUNK, max_workers=1)
+
+
+def target(tmp_path) -> str:
+    return os.path.join(str(tmp_path / "mirror"), *NAME.split("/"))
+
+
+def test_interrupted_download_resumes_missing_chunks(tmp_path):
+    data = content(7)
+    store = StubStore(data, "0x1")
+    store.fail_at = 2 * CHUNK
+
+    first = mirror(tmp_path, store).mirror([blob(data, "0x1")])
+    assert [f["name"] for f in first["failed"]] == [NAME]
+    with open(target(tmp_path) + PART_SUFFIX + ".json") as f:
+        done = json.load(f)["done"]
+    assert 2 not in done and {0, 1} <= set(done)
+
+    store.fail_at = None
+    store.ranges.clear()
+    second = mirror(tmp_path, store).mirror([blob(data, "0x1")])
+
+    assert second["resumed"] == 1 and second["downloaded"] == 1 and second["verified"] == 1
+    assert sorted(store.ranges) == [i * CHUNK for i in range(5) if i not in done]
+    with open(target(tmp_path), "rb") as f:
+        assert f.read() == data
+    assert not os.path.exists(target(tmp_path) + PART_SUFFIX)
+
+
+def test_blob_replaced_between_runs_restarts_instead_of_splicing(tmp_path):
+    old = content(7)
+    store = StubStore(old, "0x1")
+    store.fail_at = 3 * CHUNK
+    mirror(tmp_path, store).mirror([blob(old, "0x1")])
+    assert os.path.exists(target(tmp_path) + PART_SUFFIX)
+
+    new = content(11)
+    store.data, store.etag, store.fail_at = new, "0x2", None
+    store.ranges.clear()
+    result = mirror(tmp_path, store).mirror([blob(new, "0x2")])
+
+    assert result["resumed"] == 0 and result["downloaded"] == 1
+    assert sorted(store.ranges) == [i * CHUNK for i in range(5)]
+    with open(target(tmp_path), "rb") as f:
+        assert f.read() == new
+
+
+def test_content_md5_mismatch_fails_and_drops_partial_file(tmp_path):
+    data = content(7)
+    store = StubStore(data, "0x1")
+    result = mirror(tmp_path, store).mirror([blob(data, "0x1", checksum=md5(b"something else"))])
+
+    assert result["downloaded"] == 0
+    assert "Content-MD5 mismatch" in result["failed"][0]["error"]
+    assert not os.path.exists(target(tmp_path))
+    assert not os.path.exists(target(tmp_path) + PART_SUFFIX)
+    assert not os.path.exists(target(tmp_path) + PART_SUFFIX + ".json")
+
+    # Nothing is recorded as current, so the next run downloads it again
+    store.ranges.clear()
+    mirror(tmp_path, store).mirror([blob(data, "0x1")])
+    assert len(store.ranges) == 5
+
+
+def test_current_file_is_not_downloaded_again(tmp_path):
+    data = content(7)
+    store = StubStore(data, "0x1")
+    mirror(tmp_path, store).mirror([blob(data, "0x1")])
+    store.ranges.clear()
+
+    result = mirror(tmp_path, store).mirror([blob(data, "0x1")])
+    assert result["current"] == 1 and store.ranges == []
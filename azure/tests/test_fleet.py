@@ -0,0 +1,35 @@
+import threading
+import time
+
+import verify_exports
+
+
+def test_fleet_runs_other_accounts_while_one_account_is_busy(monkeypatch):
+    """With one worker slot per account, a backlog on one account must not hold up the others."""
+    lock = threading.Lock()
+    active = {}
+    peak = {}
+    order = []
+
+    def fake_listing(auth, account, container, root=None):
+        with lock:
+            active[account] = active.get(account, 0) + 1
+            peak[account] = max(peak.get(account, 0), active[account])
+            order.append(account)
+        time.sleep(0.05)
+        with lock:
+            active[account] -= 1
+        return {}
+
+    monkeypatch.setattr(verify_exports, "list_export_months", fake_listing)
+    entries = [
+        {"tenant_id": "t", "client_id": "c", "client_secret": "s", "storage_account": "busy", "container": f"c{i}"}
+        for i in range(6)
+    ] + [{"tenant_id": "t", "client_id": "c", "client_secret": "s", "storage_account": "quiet", "container": "c0"}]
+
+    results = verify_exports.verify_fleet(entries, max_workers=2, account_concurrency=1, use_token_cache=False)
+
+    assert len(results) == 7
+    assert peak == {"busy": 1, "quiet": 1}
+    # The quiet account starts in the first wave instead of after the busy account's backlog
+    assert order.index("quiet") < 2
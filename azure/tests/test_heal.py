@@ -0,0 +1,57 @@
+from datetime import datetime
+
+import backfill_historical_data as backfill
+import verify_exports
+
+
+class StubBackfill:
+    export_name = "focus-export"
+
+    def __init__(self):
+        self.queued = []
+
+    def is_export_in_progress(self):
+        return False, {}
+
+    def queue_windows(self, windows):
+        self.queued.extend(windows)
+
+    def run_month_queue(self, max_wait=0):
+        return {"success": True, "results": []}
+
+
+def months_with(*periods: str) -> dict:
+    months = verify_exports.new_month_summary()
+    for period in periods:
+        verify_exports.add_blob_to_months(months, {"name": f"focus/focus-export/{period}/run/part_0.parquet", "size": 1, "modified": ""})
+    return dict(months)
+
+
+def test_plan_heal_finds_missing_days():
+    months = months_with("20250101-20250109", "20250301-20250331")
+    windows = backfill.plan_heal(months, [], "focus-export", since=datetime(2025, 1, 1), through=datetime(2025, 3, 31))
+    assert [(f"{first:%Y-%m-%d}", f"{last:%Y-%m-%d}", reason) for first, last, reason in windows] == [
+        ("2025-01-10", "2025-01-31", "missing"),
+        ("2025-02-01", "2025-02-28", "missing"),
+    ]
+
+
+def test_heal_triggers_nothing_when_listing_fails(monkeypatch):
+    monkeypatch.setattr(verify_exports, "check_export_manifests", lambda *args, **kwargs: (None, None))
+    stub = StubBackfill()
+    result = backfill.heal_export(stub, None, "acct", "exports", "focus", since=datetime(2025, 1, 1), through=datetime(2025, 3, 31))
+    assert not result["success"]
+    assert result["reason"] == "listing_failed"
+    assert stub.queued == []
+
+
+def test_heal_dry_run_triggers_nothing(monkeypatch):
+    months = months_with("20250101-20250131")
+    monkeypatch.setattr(verify_exports, "check_export_manifests", lambda *args, **kwargs: (months, []))
+    stub = StubBackfill()
+    result = backfill.heal_export(
+        stub, None, "acct", "exports", "focus",
+        since=datetime(2025, 1, 1), through=datetime(2025, 2, 28), dry_run=True,
+    )
+    assert result["success"]
+    assert stub.queued == []
@@ -0,0 +1,59 @@
+import verify_exports
+
+
+class StubAuth:
+    def get_token(self, resource=None):
+        return "token"
+
+
+class StubResponse:
+    status_code = 200
+    ok = True
+
+    def __init__(self, body: str):
+        self.body = body.encode()
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.body), 7):
+            yield self.body[i:i + 7]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def serve(monkeypatch, *pages: str):
+    responses = iter(StubResponse(page) for page in pages)
+    monkeypatch.setattr(verify_exports.azure_http, "get", lambda *args, **kwargs: next(responses))
+
+
+def test_page_without_blobs_element(monkeypatch):
+    serve(monkeypatch, '<?xml version="1.0" encoding="utf-8"?><EnumerationResults><Prefix>none/</Prefix><NextMarker /></EnumerationResults>')
+    assert list(verify_exports.list_blobs_rest(StubAuth(), "acct", "exports", prefix="none/")) == []
+
+
+def test_blob_outside_blobs_element(monkeypatch):
+    serve(monkeypatch, (
+        "<EnumerationResults><Blob><Name>a/20250101-20250131/x.parquet</Name><Properties>"
+        "<Content-Length>5</Content-Length><Etag>0x1</Etag><Content-MD5 /></Properties></Blob>"
+        "<NextMarker /></EnumerationResults>"
+    ))
+    assert list(verify_exports.list_blobs_rest(StubAuth(), "acct", "exports")) == [
+        {"name": "a/20250101-20250131/x.parquet", "size": 5, "modified": "", "etag": "0x1", "md5": ""},
+    ]
+
+
+def test_listing_follows_markers(monkeypatch):
+    def page(name: str, marker: str) -> str:
+        return (
+            f"<EnumerationResults><Blobs><Blob><Name>{name}</Name><Properties>"
+            f"<Last-Modified>Sun, 02 Feb 2025 08:15:30 GMT</Last-Modified><Etag>0x{name}</Etag>"
+            f"<Content-Length>1</Content-Length><Content-MD5>AAAA</Content-MD5></Properties></Blob>"
+            f"</Blobs><NextMarker>{marker}</NextMarker></EnumerationResults>"
+        )
+
+    serve(monkeypatch, page("a", "m1"), page("b", ""))
+    blobs = list(verify_exports.list_blobs_rest(StubAuth(), "acct", "exports"))
+    assert [(b["name"], b["md5"]) for b in blobs] == [("a", "AAAA"), ("b", "AAAA")]
@@ -0,0 +1,154 @@
+import json
+import os
+import stat
+import sys
+from argparse import Namespace
+
+import pytest
+
+import onboarding_config
+from onboarding_config import ConfigError, resolve_settings, terraform_settings
+
+OUTPUTS = {
+    "digiusher_onboarding": {"sensitive": True, "value": {
+        "tenant_id": "tf-tenant",
+        "application_id": "tf-client",
+        "client_secret": "tf-secret",
+        "storage_account_name": "tfstorage",
+        "storage_container_name": "exports",
+        "unrelated": "ignored",
+    }},
+    "billing_scope": {"value": "/providers/Microsoft.Billing/billingAccounts/1234"},
+    "export_name": {"value": None},
+}
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    for key in onboarding_config.SETTINGS:
+        monkeypatch.delenv(f"DIGIUSHER_{key.upper()}", raising=False)
+    for name in ("TF_DATA_DIR", "TF_WORKSPACE"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("DIGIUSHER_TOKEN_CACHE", str(tmp_path / "cache" / "tokens.json"))
+    monkeypatch.setenv("DIGIUSHER_PROFILES", str(tmp_path / "profiles.json"))
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(str(path)), exist_ok=True)
+    with open(str(path), "w") as f:
+        json.dump(data, f)
+
+
+def args(**values) -> Namespace:
+    return Namespace(**{key: values.get(key) for key in onboarding_config.SETTINGS})
+
+
+def test_local_state_outputs_are_read_without_terraform(tmp_path):
+    write_json(tmp_path / "terraform.tfstate", {"outputs": OUTPUTS})
+    assert terraform_settings(str(tmp_path)) == {
+        "tenant_id": "tf-tenant",
+        "client_id": "tf-client",
+        "client_secret": "tf-secret",
+        "storage_account": "tfstorage",
+        "container": "exports",
+        "billing_scope": "/providers/Microsoft.Billing/billingAccounts/1234",
+    }
+
+
+def test_workspace_state_is_read_from_terraform_tfstate_d(tmp_path):
+    os.makedirs(tmp_path / ".terraform")
+    (tmp_path / ".terraform" / "environment").write_text("staging\n")
+    write_json(tmp_path / "terraform.tfstate", {"outputs": {"tenant_id": {"value": "default-tenant"}}})
+    write_json(tmp_path / "terraform.tfstate.d" / "staging" / "terraform.tfstate",
+               {"outputs": {"tenant_id": {"value": "staging-tenant"}}})
+    assert terraform_settings(str(tmp_path)) == {"tenant_id": "staging-tenant"}
+
+
+def test_local_backend_path_is_honored(tmp_path):
+    write_json(tmp_path / ".terraform" / "terraform.tfstate",
+               {"backend": {"type": "local", "config": {"path": "state/onboarding.tfstate"}}})
+    write_json(tmp_path / "state" / "onboarding.tfstate", {"outputs": {"tenant_id": {"value": "configured"}}})
+    assert terraform_settings(str(tmp_path)) == {"tenant_id": "configured"}
+
+
+def test_unreadable_state_is_a_config_error(tmp_path):
+    (tmp_path / "terraform.tfstate").write_text("{not json")
+    with pytest.raises(ConfigError):
+        terraform_settings(str(tmp_path))
+
+
+def fake_terraform(tmp_path, monkeypatch) -> str:
+    """Put a `terraform` on PATH that prints OUTPUTS and counts its calls."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    calls = tmp_path / "calls"
+    script = bin_dir / "terraform"
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import json\n"
+        f"open({str(calls)!r}, 'a').write('x')\n"
+        f"print(json.dumps({OUTPUTS!r}))\n"
+    )
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    return str(calls)
+
+
+def test_remote_outputs_are_cached_privately(tmp_path, monkeypatch):
+    calls = fake_terraform(tmp_path, monkeypatch)
+    workdir = tmp_path / "remote"
+    write_json(workdir / ".terraform" / "terraform.tfstate", {"backend": {"type": "azurerm", "config": {}}})
+
+    first = terraform_settings(str(workdir))
+    assert terraform_settings(str(workdir)) == first
+    assert first["client_secret"] == "tf-secret"
+    with open(calls) as f:
+        assert f.read() == "x"
+
+    cache_dir = os.path.dirname(onboarding_config._cache_path(str(workdir)))
+    files = os.listdir(cache_dir)
+    assert len(files) == 1 and not files[0].startswith(".outputs-")
+    assert stat.S_IMODE(os.stat(os.path.join(cache_dir, files[0])).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(cache_dir).st_mode) == 0o700
+
+    assert terraform_settings(str(workdir), use_cache=False) == first
+    with open(calls) as f:
+        assert f.read() == "xx"
+
+
+def test_precedence_is_env_then_terraform_then_profile_then_args(tmp_path, monkeypatch):
+    write_json(tmp_path / "terraform.tfstate", {"outputs": OUTPUTS})
+    monkeypatch.setenv("DIGIUSHER_TENANT_ID", "env-tenant")
+    monkeypatch.setenv("DIGIUSHER_EXPORT_NAME", "env-export")
+    monkeypatch.setenv("DIGIUSHER_EXPORT_ROOT_PATH", "env-root")
+    monkeypatch.setenv("PROFILE_SECRET", "profile-secret")
+    write_json(tmp_path / "profiles.json", {"contoso": {
+        "client_id": "profile-client",
+        "client_secret_env": "PROFILE_SECRET",
+        "storage_account_name": "profilestorage",
+    }})
+
+    settings = resolve_settings(
+        args(storage_account="argstorage", export_root_path=""),
+        from_terraform=True, profile="contoso", terraform_dir=str(tmp_path),
+    )
+
+    assert settings["tenant_id"] == "tf-tenant"           # terraform over env
+    assert settings["export_name"] == "env-export"        # env when nothing else sets it
+    assert settings["client_id"] == "profile-client"      # profile over terraform
+    assert settings["client_secret"] == "profile-secret"
+    assert settings["storage_account"] == "argstorage"    # args over everything
+    assert settings["export_root_path"] == "env-root"     # empty args are unset
+    assert settings["container"] == "exports"
+
+
+def test_profile_secret_env_must_be_set(tmp_path):
+    write_json(tmp_path / "profiles.json", {"contoso": {"client_secret_env": "MISSING_SECRET"}})
+    with pytest.raises(ConfigError, match="MISSING_SECRET"):
+        resolve_settings(args(), profile="contoso")
+
+
+def test_missing_profile_is_a_config_error(tmp_path):
+    write_json(tmp_path / "profiles.json", {})
+    with pytest.raises(ConfigError, match="not found"):
+        resolve_settings(args(), profile="contoso")
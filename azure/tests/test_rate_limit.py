@@ -0,0 +1,47 @@
+import base64
+import json
+
+from rate_limit import RateLimiter, throttle_scope
+
+ARM = "https://management.azure.com"
+EXPORT = "/providers/Microsoft.CostManagement/exports/focus-export"
+
+
+def bearer(tenant: str) -> dict:
+    def part(data: dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+
+    return {"Authorization": f"Bearer {part({'alg': 'RS256'})}.{part({'tid': tenant})}.signature"}
+
+
+def test_subscription_requests_are_throttled_per_subscription():
+    url = f"{ARM}/subscriptions/ABC/providers/Microsoft.CostManagement/exports"
+    assert throttle_scope(url, bearer("t1")) == ("arm", "abc")
+
+
+def test_billing_scope_requests_are_throttled_per_tenant():
+    first = f"{ARM}/providers/Microsoft.Billing/billingAccounts/111{EXPORT}"
+    second = f"{ARM}/providers/Microsoft.Billing/billingAccounts/222{EXPORT}"
+    assert throttle_scope(first, bearer("T1")) == ("arm", "tenant:t1")
+    assert throttle_scope(second, bearer("t1")) == ("arm", "tenant:t1")
+    assert throttle_scope(first, bearer("t2")) == ("arm", "tenant:t2")
+
+
+def test_billing_account_is_the_fallback_without_a_readable_token():
+    url = f"{ARM}/providers/Microsoft.Billing/billingAccounts/111:222_2019-05-31{EXPORT}"
+    assert throttle_scope(url, {"Authorization": "Bearer opaque"}) == ("arm", "billingAccount:111:222_2019-05-31")
+    assert throttle_scope(url) == ("arm", "billingAccount:111:222_2019-05-31")
+
+
+def test_storage_and_aad_scopes():
+    assert throttle_scope("https://acct.blob.core.windows.net/exports?comp=list") == ("storage", "acct.blob.core.windows.net")
+    assert throttle_scope("https://login.microsoftonline.com/t1/oauth2/v2.0/token") == ("aad", "t1")
+
+
+def test_throttling_one_tenant_does_not_slow_another():
+    limiter = RateLimiter()
+    url = f"{ARM}/providers/Microsoft.Billing/billingAccounts/111{EXPORT}"
+    throttled = limiter.bucket(url, bearer("t1"))
+    throttled.pause(60)
+    assert limiter.bucket(url, bearer("t2")) is not throttled
+    assert limiter.acquire(url, bearer("t2")) == 0
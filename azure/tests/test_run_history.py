@@ -0,0 +1,45 @@
+import os
+import time
+
+import run_history
+from run_history import RunHistory
+
+
+def api_run(i: int) -> dict:
+    month = 1 + i % 12
+    return {
+        "id": f"run-{i:04d}",
+        "properties": {
+            "status": "Completed",
+            "submittedTime": f"2024-01-01T00:{i // 60:02d}:{i % 60:02d}Z",
+            "startDate": f"2023-{month:02d}-01T00:00:00",
+            "endDate": f"2023-{month:02d}-28T00:00:00",
+        },
+    }
+
+
+def test_history_keeps_the_newest_runs(tmp_path, monkeypatch):
+    monkeypatch.setattr(run_history, "MAX_RUNS", 10)
+    path = str(tmp_path / "history.json")
+    history = RunHistory(path)
+    history.merge([api_run(i) for i in range(25)])
+
+    assert len(history.runs) == 10
+    assert history.latest()["id"] == "run-0024"
+    assert min(history.runs) == "run-0015"
+    assert all(run_id in history.runs for ids in history.by_month.values() for run_id in ids)
+
+    # The pruned store is what gets persisted
+    assert len(RunHistory(path).runs) == 10
+
+
+def test_stale_history_files_are_removed(tmp_path):
+    stale = tmp_path / "stale.json"
+    stale.write_text("[]")
+    old = time.time() - (run_history.STALE_FILE_DAYS + 1) * 86400
+    os.utime(stale, (old, old))
+
+    RunHistory(str(tmp_path / "current.json")).merge([api_run(0)])
+
+    assert not stale.exists()
+    assert (tmp_path / "current.json").exists()
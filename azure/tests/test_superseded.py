@@ -0,0 +1,63 @@
+import verify_exports
+
+BOUNDARY = "batchresponse_66925647-d0cb-4109-b6d3-28efe3e1e5ed"
+
+
+def sub_response(content_id: int, status: str) -> str:
+    return (
+        f"--{BOUNDARY}\r\n"
+        "Content-Type: application/http\r\n"
+        f"Content-ID: {content_id}\r\n"
+        "\r\n"
+        f"HTTP/1.1 {status}\r\n"
+        "x-ms-version: 2020-10-02\r\n"
+        "\r\n"
+    )
+
+
+class StubAuth:
+    def get_token(self, resource=None):
+        return "token"
+
+
+class StubResponse:
+    status_code = 202
+    ok = True
+
+    def __init__(self, text: str):
+        self.text = text
+        self.headers = {"Content-Type": f"multipart/mixed; boundary={BOUNDARY}"}
+
+
+def test_batch_statuses_are_matched_by_content_id(monkeypatch):
+    # Sub-responses out of request order: blob 1 failed, blobs 0 and 2 were deleted
+    body = sub_response(2, "202 Accepted") + sub_response(1, "403 Forbidden") + sub_response(0, "404 Not Found") + f"--{BOUNDARY}--\r\n"
+    monkeypatch.setattr(verify_exports.azure_http, "post", lambda *args, **kwargs: StubResponse(body))
+
+    deleted, failed = verify_exports.delete_blobs_batch(StubAuth(), "acct", "exports", ["a", "b", "c"])
+
+    assert deleted == 2
+    assert failed == ["b: HTTP 403"]
+
+
+def test_missing_sub_response_is_a_failure(monkeypatch):
+    body = sub_response(0, "202 Accepted") + f"--{BOUNDARY}--\r\n"
+    monkeypatch.setattr(verify_exports.azure_http, "post", lambda *args, **kwargs: StubResponse(body))
+
+    deleted, failed = verify_exports.delete_blobs_batch(StubAuth(), "acct", "exports", ["a", "b"])
+
+    assert deleted == 1
+    assert failed == ["b: no response"]
+
+
+def test_delete_superseded_defaults_to_report_only(monkeypatch):
+    blobs = [{"name": f"focus/x/20250101-20250131/old/part_{i}.parquet"} for i in range(3)]
+    monkeypatch.setattr(verify_exports, "list_blobs_rest", lambda *args, **kwargs: iter(blobs))
+
+    def fail(*args, **kwargs):
+        raise AssertionError("nothing may be deleted in a dry run")
+
+    monkeypatch.setattr(verify_exports, "delete_blobs_batch", fail)
+    runs = [{"prefix": "focus/x/20250101-20250131/old/"}]
+
+    assert verify_exports.delete_superseded_runs(StubAuth(), "acct", "exports", runs)
@@ -0,0 +1,81 @@
+import watch_exports
+from run_history import RunHistory
+
+SCOPE = "/providers/Microsoft.Billing/billingAccounts/1234"
+
+
+class StubAuth:
+    def get_token(self, resource=None):
+        return "token"
+
+
+class StubResponse:
+    def __init__(self, status_code: int, runs: list = None, etag: str = None):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.text = ""
+        self.headers = {"ETag": etag} if etag else {}
+        self.runs = runs or []
+
+    def json(self):
+        return {"properties": {"runHistory": {"value": self.runs}}}
+
+
+def api_run(run_id: str, status: str) -> dict:
+    return {
+        "id": run_id,
+        "properties": {
+            "status": status,
+            "submittedTime": "2025-02-01T00:00:00Z",
+            "startDate": "2025-01-01T00:00:00Z",
+            "endDate": "2025-01-31T00:00:00Z",
+        },
+    }
+
+
+class StubArm:
+    """Serves the export with a fixed ETag, whatever runHistory holds, as ARM may."""
+
+    def __init__(self):
+        self.runs = []
+        self.conditional = []
+
+    def get(self, url, headers=None, params=None):
+        self.conditional.append("If-None-Match" in headers)
+        if headers.get("If-None-Match") == '"same"':
+            return StubResponse(304)
+        return StubResponse(200, list(self.runs), etag='"same"')
+
+
+def watcher(monkeypatch) -> tuple:
+    arm = StubArm()
+    monkeypatch.setattr(watch_exports.azure_http, "get", arm.get)
+    w = watch_exports.ExportWatcher(StubAuth(), SCOPE, "focus-export")
+    w.export.history = RunHistory(None)
+    return w, arm
+
+
+def test_run_change_behind_unchanged_etag_is_reported(monkeypatch):
+    w, arm = watcher(monkeypatch)
+    assert w.poll() == []
+
+    # A new run appears but the ETag stays the same: 304 until the periodic refresh
+    arm.runs = [api_run("run-1", "Completed")]
+    events = []
+    for _ in range(watch_exports.RUNS_REFRESH_EVERY):
+        events.extend(w.poll())
+
+    assert [e["event"] for e in events] == ["run_completed"]
+    assert arm.conditional.count(False) == 2
+
+
+def test_active_run_is_fetched_without_condition(monkeypatch):
+    w, arm = watcher(monkeypatch)
+    arm.runs = [api_run("run-1", "InProgress")]
+    w.poll()
+
+    arm.runs = [api_run("run-1", "Completed")]
+    events = w.poll()
+
+    assert arm.conditional == [False, False]
+    assert [e["event"] for e in events] == ["run_completed"]
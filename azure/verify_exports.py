@@ -8,6 +8,9 @@ Usage:
   # Using terraform output
   python3 verify_exports.py --from-terraform
 
+  # Using a named profile (or DIGIUSHER_* environment variables)
+  python3 verify_exports.py --profile contoso
+
   # Using explicit credentials
   python3 verify_exports.py \
     --tenant-id <tenant> \
@@ -19,63 +22,63 @@ Usage:
 """
 
 import argparse
-import json
+import atexit
+import os
 import re
-import subprocess
 import sys
-from collections import defaultdict
-from datetime import datetime, timedelta
-import requests
-
-
-class AzureAuthenticator:
-    """Authenticate with Azure using service principal."""
+import tempfile
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import quote
 
-    def __init__(self, tenant_id: str, client_id: str, client_secret: str):
-        self.tenant_id = tenant_id
-        self.client_id = client_id
-        self.client_secret = client_secret
-        self._tokens = {}
+import azure_http
+import metrics
+from azure_auth import AzureAuthenticator, STORAGE_RESOURCE, blob_account_url
+from day_coverage import DayCoverage
+from onboarding_config import ConfigError, load_fleet_file, resolve_settings
+from blob_index import SETTLE_DAYS, BlobIndex, period_child, period_end_date
+from export_content import (
+    DEFAULT_FOCUS_VERSION,
+    CostAggregator,
+    RangedReader,
+    inspect_csv,
+    inspect_parquet,
+    is_data_file,
+    iter_csv_cost_batches,
+    iter_parquet_cost_batches,
+)
+from export_mirror import DEFAULT_CHUNK_SIZE, ExportMirror
+from export_manifest import MANIFEST_NAME, compare_manifest, parse_export_manifest
+from blob_inventory import find_local_manifest, iter_inventory_csv, iter_inventory_file, iter_inventory_parquet, parse_manifest
 
-    def get_token(self, resource: str = "https://management.azure.com/") -> str:
-        """Get access token for a specific resource."""
-        cache_key = resource
-        cached = self._tokens.get(cache_key)
-        if cached and cached["expires"] > datetime.now():
-            return cached["token"]
 
-        url = f"https://login.microsoftonline.com/{self.tenant_id}/oauth2/v2.0/token"
+# Expected path: {export_root_path}/{export_name}/YYYYMMDD-YYYYMMDD/...
+DATE_PATTERN = re.compile(r"/(\d{8})-(\d{8})/")
+PERIOD_FOLDER_PATTERN = re.compile(r"(^|/)\d{8}-\d{8}/$")
 
-        # Determine scope based on resource
-        if "blob.core.windows.net" in resource or "storage.azure.com" in resource:
-            scope = "https://storage.azure.com/.default"
-        else:
-            scope = f"{resource}.default"
 
-        data = {
-            "grant_type": "client_credentials",
-            "client_id": self.client_id,
-            "client_secret": self.client_secret,
-            "scope": scope,
-        }
+# Blob Batch accepts at most this many sub-requests per call
+BATCH_MAX_SUBREQUESTS = 256
 
-        response = requests.post(url, data=data)
-        response.raise_for_status()
 
-        token_data = response.json()
-        self._tokens[cache_key] = {
-            "token": token_data["access_token"],
-            "expires": datetime.now() + timedelta(seconds=token_data["expires_in"] - 300)
-        }
+class BlobListingError(Exception):
+    """Raised when the storage account rejects a List Blobs request."""
 
-        return token_data["access_token"]
 
+def _list_container(auth: AzureAuthenticator, storage_account: str, container: str, prefix: str = None, delimiter: str = None):
+    """Page through a List Blobs call, yielding ("blob", dict) and ("prefix", name) items.
 
-def list_blobs_rest(auth: AzureAuthenticator, storage_account: str, container: str, prefix: str = None) -> list:
-    """List blobs using Azure Storage REST API."""
-    token = auth.get_token("https://storage.azure.com/")
+    Each page is parsed incrementally, so memory use does not grow with the number
+    of blobs in the container.
+    """
+    token = auth.get_token(STORAGE_RESOURCE)
 
-    url = f"https://{storage_account}.blob.core.windows.net/{container}"
+    url = f"{blob_account_url(storage_account)}/{container}"
     headers = {
         "Authorization": f"Bearer {token}",
         "x-ms-version": "2020-10-02",
@@ -83,50 +86,217 @@ def list_blobs_rest(auth: AzureAuthenticator, storage_account: str, container: s
     params = {"restype": "container", "comp": "list"}
     if prefix:
         params["prefix"] = prefix
+    if delimiter:
+        params["delimiter"] = delimiter
 
-    blobs = []
     marker = None
 
     while True:
         if marker:
             params["marker"] = marker
 
-        response = requests.get(url, headers=headers, params=params)
+        response = azure_http.get(url, headers=headers, params=params, stream=True)
 
         if response.status_code == 404:
-            print(f"   ❌ Container '{container}' not found")
-            return []
+            raise BlobListingError(f"Container '{container}' not found")
         elif response.status_code == 403:
-            print(f"   ❌ Access denied - check service principal permissions")
-            return []
+            raise BlobListingError("Access denied - check service principal permissions")
         elif not response.ok:
-            print(f"   ❌ Error: {response.status_code} - {response.text[:200]}")
-            return []
+            raise BlobListingError(f"Error: {response.status_code} - {response.text[:200]}")
 
-        # Parse XML response
-        import xml.etree.ElementTree as ET
-        root = ET.fromstring(response.content)
+        # Parse XML response as it streams in, dropping each entry once handled
+        parser = ET.XMLPullParser(events=("start", "end"))
+        blobs_element = None
+        marker = None
+        parse_seconds = 0.0
 
-        for blob in root.findall(".//Blob"):
-            name = blob.find("Name").text
-            props = blob.find("Properties")
-            size = int(props.find("Content-Length").text) if props.find("Content-Length") is not None else 0
-            modified = props.find("Last-Modified").text if props.find("Last-Modified") is not None else ""
+        with response:
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                started = time.perf_counter()
+                parser.feed(chunk)
+                parse_seconds += time.perf_counter() - started
+                for event, elem in parser.read_events():
+                    if event == "start":
+                        if elem.tag == "Blobs":
+                            blobs_element = elem
+                        continue
 
-            blobs.append({
-                "name": name,
-                "size": size,
-                "modified": modified
-            })
+                    if elem.tag == "Blob":
+                        props = elem.find("Properties")
+                        length = props.find("Content-Length") if props is not None else None
+                        modified = props.find("Last-Modified") if props is not None else None
+                        etag = props.find("Etag") if props is not None else None
+                        md5 = props.find("Content-MD5") if props is not None else None
+                        yield "blob", {
+                            "name": elem.findtext("Name", ""),
+                            "size": int(length.text) if length is not None and length.text else 0,
+                            "modified": modified.text if modified is not None else "",
+                            "etag": etag.text if etag is not None else "",
+                            "md5": md5.text if md5 is not None and md5.text else "",
+                        }
+                        if blobs_element is not None:
+                            blobs_element.clear()
+                    elif elem.tag == "BlobPrefix":
+                        yield "prefix", elem.findtext("Name", "")
+                        if blobs_element is not None:
+                            blobs_element.clear()
+                    elif elem.tag == "NextMarker":
+                        marker = elem.text
+
+        parser.close()
+        metrics.add_phase_time("xml_parse", parse_seconds)
 
         # Check for continuation
-        next_marker = root.find("NextMarker")
-        if next_marker is not None and next_marker.text:
-            marker = next_marker.text
-        else:
+        if not marker:
             break
 
-    return blobs
+
+def list_blobs_rest(auth: AzureAuthenticator, storage_account: str, container: str, prefix: str = None):
+    """List blobs using Azure Storage REST API.
+
+    Yields one dict per blob as pages arrive.
+    """
+    for kind, item in _list_container(auth, storage_account, container, prefix):
+        if kind == "blob":
+            yield item
+
+
+def list_blob_prefixes(auth: AzureAuthenticator, storage_account: str, container: str, prefix: str = ""):
+    """List the virtual folders directly under `prefix` (names end with "/")."""
+    for kind, item in _list_container(auth, storage_account, container, prefix, delimiter="/"):
+        if kind == "prefix":
+            yield item
+
+
+def list_period_children(auth: AzureAuthenticator, storage_account: str, container: str, prefix: str) -> set:
+    """Names of the run folders and blobs directly under a period folder (one delimiter listing)."""
+    return {
+        item if kind == "prefix" else item["name"]
+        for kind, item in _list_container(auth, storage_account, container, prefix, delimiter="/")
+    }
+
+
+def get_blob(auth: AzureAuthenticator, storage_account: str, container: str, name: str, headers: dict = None, stream: bool = False):
+    """Download a blob (or part of one, with a Range header) using Azure Storage REST API."""
+    request_headers = {
+        "Authorization": f"Bearer {auth.get_token(STORAGE_RESOURCE)}",
+        "x-ms-version": "2020-10-02",
+    }
+    request_headers.update(headers or {})
+    url = f"{blob_account_url(storage_account)}/{container}/{quote(name)}"
+
+    response = azure_http.get(url, headers=request_headers, stream=stream)
+    if response.status_code == 404:
+        raise BlobListingError(f"Blob '{name}' not found")
+    elif response.status_code == 403:
+        raise BlobListingError("Access denied - check service principal permissions")
+    elif not response.ok:
+        raise BlobListingError(f"Error: {response.status_code} - {response.text[:200]}")
+    return response
+
+
+def delete_blobs_batch(auth: AzureAuthenticator, storage_account: str, container: str, names: list):
+    """Delete up to 256 blobs in one Blob Batch request. Returns (deleted count, failures)."""
+    token = auth.get_token(STORAGE_RESOURCE)
+    boundary = f"batch_{uuid.uuid4()}"
+    date = datetime.now(timezone.utc).strftime("%a, %d %b %Y %H:%M:%S GMT")
+
+    parts = []
+    for i, name in enumerate(names):
+        parts.append(
+            f"--{boundary}\r\n"
+            "Content-Type: application/http\r\n"
+            "Content-Transfer-Encoding: binary\r\n"
+            f"Content-ID: {i}\r\n"
+            "\r\n"
+            f"DELETE /{container}/{quote(name)} HTTP/1.1\r\n"
+            f"Authorization: Bearer {token}\r\n"
+            f"x-ms-date: {date}\r\n"
+            "Content-Length: 0\r\n"
+            "\r\n"
+        )
+    body = "".join(parts) + f"--{boundary}--\r\n"
+
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "x-ms-version": "2020-10-02",
+        "Content-Type": f"multipart/mixed; boundary={boundary}",
+    }
+    url = f"{blob_account_url(storage_account)}/{container}"
+    response = azure_http.post(url, headers=headers, params={"restype": "container", "comp": "batch"}, data=body.encode())
+    if response.status_code == 403:
+        raise BlobListingError("Access denied - deleting blobs needs Storage Blob Data Contributor")
+    elif not response.ok:
+        raise BlobListingError(f"Error: {response.status_code} - {response.text[:200]}")
+
+    # 202 is deleted, 404 is already gone
+    statuses = parse_batch_statuses(response.text, response.headers.get("Content-Type"))
+    deleted, failed = 0, []
+    for i, name in enumerate(names):
+        status = statuses.get(i)
+        if status in (202, 404):
+            deleted += 1
+        elif status is None:
+            failed.append(f"{name}: no response")
+        else:
+            failed.append(f"{name}: HTTP {status}")
+    return deleted, failed
+
+
+def parse_batch_statuses(body: str, content_type: str = None) -> dict:
+    """Map of Content-ID -> HTTP status of the sub-responses in a Blob Batch response."""
+    match = re.search(r'boundary="?([^";\s]+)"?', content_type or "")
+    if match:
+        parts = body.split(f"--{match.group(1)}")
+    else:
+        parts = re.split(r"^--\S+[ \t]*\r?$", body, flags=re.MULTILINE)
+    statuses = {}
+    for part in parts:
+        content_id = re.search(r"^Content-ID:\s*(\d+)", part, re.MULTILINE | re.IGNORECASE)
+        status = re.search(r"^HTTP/1\.1 (\d{3})", part, re.MULTILINE)
+        if content_id and status:
+            statuses[int(content_id.group(1))] = int(status.group(1))
+    return statuses
+
+
+def parse_http_date(value: str):
+    """Parse an RFC 1123 Last-Modified value, or None."""
+    try:
+        return parsedate_to_datetime(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def period_prefix_of(name: str):
+    """Path of the YYYYMMDD-YYYYMMDD/ period folder a blob belongs to, or None."""
+    match = DATE_PATTERN.search(name)
+    return name[:match.end()] if match else None
+
+
+def new_month_summary() -> defaultdict:
+    """Empty per-month aggregate, keyed by YYYY-MM."""
+    return defaultdict(lambda: {"files": 0, "size_mb": 0, "latest": None, "periods": set()})
+
+
+def add_blob_to_months(months: dict, blob: dict) -> bool:
+    """Add one blob to the per-month aggregate. Returns False if the path has no period folder."""
+    match = DATE_PATTERN.search(blob.get("name", ""))
+    if not match:
+        return False
+
+    start_date = match.group(1)
+    # Extract YYYY-MM from start date
+    month_key = f"{start_date[:4]}-{start_date[4:6]}"
+    modified = blob.get("modified", "")
+
+    month = months[month_key]
+    # Distinct period folders feed the day-level coverage check
+    month["periods"].add(blob["name"][:match.end()])
+    month["files"] += 1
+    month["size_mb"] += blob.get("size", 0) / (1024 * 1024)
+    if not month["latest"] or modified > month["latest"]:
+        month["latest"] = modified
+    return True
 
 
 def list_export_months(auth: AzureAuthenticator, storage_account: str, container: str, export_root_path: str = None) -> dict:
@@ -136,37 +306,858 @@ def list_export_months(auth: AzureAuthenticator, storage_account: str, container
         path_display += f"/{export_root_path}"
     print(f"\n📦 Scanning storage: {path_display}")
 
-    blobs = list_blobs_rest(auth, storage_account, container, prefix=export_root_path)
+    # Aggregate while listing so the full blob list is never held in memory
+    months = new_month_summary()
+    blob_count = 0
+    aggregate_seconds = 0.0
+
+    try:
+        for blob in list_blobs_rest(auth, storage_account, container, prefix=export_root_path):
+            blob_count += 1
+            started = time.perf_counter()
+            add_blob_to_months(months, blob)
+            aggregate_seconds += time.perf_counter() - started
+    except BlobListingError as e:
+        print(f"   ❌ {e}")
+        return {}
+    finally:
+        metrics.add_phase_time("aggregation", aggregate_seconds)
+
+    if not blob_count:
+        return {}
+
+    print(f"   Found {blob_count} blobs")
+
+    return dict(months)
+
+
+def discover_period_prefixes(auth: AzureAuthenticator, storage_account: str, container: str, export_root_path: str = None, max_workers: int = 8, max_depth: int = 3) -> list:
+    """Find the YYYYMMDD-YYYYMMDD/ period folders below the export root.
+
+    Walks the folder tree with delimiter listings, one level at a time, until it
+    reaches folders named like a period. Folder listings at each level run concurrently.
+    """
+    root = export_root_path.strip("/") + "/" if export_root_path else ""
+    level = [root]
+    periods = []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for _ in range(max_depth):
+            if not level:
+                break
+            next_level = []
+            listings = executor.map(
+                lambda folder: list(list_blob_prefixes(auth, storage_account, container, folder)),
+                level,
+            )
+            for children in listings:
+                for child in children:
+                    if PERIOD_FOLDER_PATTERN.search(child):
+                        periods.append(child)
+                    else:
+                        next_level.append(child)
+            level = next_level
+
+    return sorted(periods)
+
+
+def merge_month_summaries(target: dict, source: dict):
+    """Fold one per-month aggregate into another."""
+    for month_key, data in source.items():
+        month = target[month_key]
+        month["files"] += data["files"]
+        month["size_mb"] += data["size_mb"]
+        if data["latest"] and (not month["latest"] or data["latest"] > month["latest"]):
+            month["latest"] = data["latest"]
+        month["periods"] |= data.get("periods", set())
+
+
+def list_export_months_parallel(auth: AzureAuthenticator, storage_account: str, container: str, export_root_path: str = None, max_workers: int = 8) -> dict:
+    """List all months available in the export container, one listing per period folder.
+
+    Period folders are discovered first and then listed concurrently, so total time
+    is bounded by the largest period rather than the size of the whole container.
+    """
+    path_display = f"{storage_account}/{container}"
+    if export_root_path:
+        path_display += f"/{export_root_path}"
+    print(f"\n📦 Scanning storage: {path_display} ({max_workers} workers)")
+
+    def scan_period(prefix: str):
+        period_months = new_month_summary()
+        count = 0
+        aggregate_seconds = 0.0
+        for blob in list_blobs_rest(auth, storage_account, container, prefix=prefix):
+            count += 1
+            started = time.perf_counter()
+            add_blob_to_months(period_months, blob)
+            aggregate_seconds += time.perf_counter() - started
+        metrics.add_phase_time("aggregation", aggregate_seconds)
+        return period_months, count
+
+    months = new_month_summary()
+    blob_count = 0
+
+    try:
+        periods = discover_period_prefixes(auth, storage_account, container, export_root_path, max_workers)
+        if not periods:
+            return {}
+        print(f"   Found {len(periods)} period folders")
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(scan_period, prefix) for prefix in periods]
+            for future in as_completed(futures):
+                period_months, count = future.result()
+                merge_month_summaries(months, period_months)
+                blob_count += count
+    except BlobListingError as e:
+        print(f"   ❌ {e}")
+        return {}
+
+    if not blob_count:
+        return {}
+
+    print(f"   Found {blob_count} blobs")
+
+    return dict(months)
+
+
+def list_export_months_incremental(auth: AzureAuthenticator, storage_account: str, container: str, export_root_path: str, index: BlobIndex, max_workers: int = 8, full: bool = False) -> dict:
+    """List all months available in the export container, using a local blob index.
+
+    Only period folders that are new or may still be receiving data are listed
+    again. Settled periods are summarized from the index after a delimiter
+    listing of their run folders confirms the index still matches; a settled
+    period that gained or lost a run folder (a backfill re-run) is listed again.
+    """
+    path_display = f"{storage_account}/{container}"
+    if export_root_path:
+        path_display += f"/{export_root_path}"
+    print(f"\n📦 Scanning storage: {path_display} (incremental)")
+
+    try:
+        periods = discover_period_prefixes(auth, storage_account, container, export_root_path, max_workers)
+    except BlobListingError as e:
+        print(f"   ❌ {e}")
+        return {}
+
+    # Drop periods that were deleted from storage since the last sync
+    removed = set(index.synced_prefixes(storage_account, container)) - set(periods)
+    root = export_root_path.strip("/") + "/" if export_root_path else ""
+    index.drop_prefixes(storage_account, container, [p for p in removed if p.startswith(root)])
+
+    stale = periods if full else index.stale_prefixes(storage_account, container, periods)
+    changed = []
+    if not full:
+        settled = [p for p in periods if p not in set(stale)]
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    executor.submit(list_period_children, auth, storage_account, container, prefix): prefix
+                    for prefix in settled
+                }
+                for future in as_completed(futures):
+                    prefix = futures[future]
+                    if future.result() != index.period_children(storage_account, container, prefix):
+                        changed.append(prefix)
+        except BlobListingError as e:
+            print(f"   ❌ {e}")
+            return {}
+        stale = stale + sorted(changed)
+    note = f" ({len(changed)} settled period(s) changed)" if changed else ""
+    print(f"   Found {len(periods)} period folders, {len(stale)} to refresh{note}")
+
+    synced_at = datetime.now(timezone.utc).isoformat()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(lambda p: list(list_blobs_rest(auth, storage_account, container, prefix=p)), prefix): prefix
+                for prefix in stale
+            }
+            # SQLite writes stay on this thread; each worker only holds one period
+            for future in as_completed(futures):
+                index.replace_prefix(storage_account, container, futures[future], future.result(), synced_at)
+    except BlobListingError as e:
+        print(f"   ❌ {e}")
+        return {}
+
+    months = new_month_summary()
+    blob_count = 0
+    for blob in index.iter_blobs(storage_account, container, periods):
+        blob_count += 1
+        add_blob_to_months(months, blob)
+
+    if not blob_count:
+        return {}
+
+    print(f"   Found {blob_count} blobs")
+
+    return dict(months)
+
+
+def list_export_months_change_feed(auth: AzureAuthenticator, storage_account: str, container: str, export_root_path: str, index: BlobIndex, change_feed_dir: str = None, max_workers: int = 8) -> dict:
+    """List all months available in the export container, keeping a local blob index current from the Blob change feed.
+
+    The first run lists the container once to fill the index. Later runs read
+    only the change feed segments written since the saved cursor, so their cost
+    grows with new files rather than with all of history.
+    """
+    from change_feed import ChangeFeedReader, LocalChangeFeed, RemoteChangeFeed, segment_path
+
+    path_display = f"{storage_account}/{container}"
+    if export_root_path:
+        path_display += f"/{export_root_path}"
+
+    if change_feed_dir:
+        source = LocalChangeFeed(change_feed_dir)
+    else:
+        source = RemoteChangeFeed(auth, storage_account, list_blobs_rest, get_blob)
+    reader = ChangeFeedReader(source, container)
+    try:
+        until = reader.last_consumable()
+    except (BlobListingError, OSError, KeyError, ValueError) as e:
+        print(f"\n⚠️  Change feed unavailable ({e}); is change feed enabled on {storage_account}?")
+        return list_export_months_incremental(auth, storage_account, container, export_root_path, index, max_workers)
+
+    cursor = index.change_feed_cursor(storage_account, container)
+    if cursor is None:
+        # Events from here on are replayed next time; applying them twice is harmless
+        months = list_export_months_incremental(
+            auth, storage_account, container, export_root_path, index, max_workers, full=True
+        )
+        index.set_change_feed_cursor(storage_account, container, segment_path(until))
+        return months
+
+    print(f"\n📦 Scanning storage: {path_display} (change feed)")
+    root = export_root_path.strip("/") + "/" if export_root_path else ""
+    synced_at = datetime.now(timezone.utc).isoformat()
+    created = deleted = 0
+    try:
+        segments = reader.segments(cursor, until)
+        for segment in segments:
+            changes = []
+            for event in reader.events(segment):
+                prefix = period_prefix_of(event["name"])
+                if prefix and event["name"].startswith(root):
+                    changes.append(dict(event, prefix=prefix))
+            index.apply_changes(storage_account, container, changes, segment, synced_at)
+            created += sum(1 for c in changes if c["type"] == "created")
+            deleted += sum(1 for c in changes if c["type"] == "deleted")
+    except (BlobListingError, RuntimeError, ValueError) as e:
+        print(f"   ❌ {e}")
+        return {}
+    print(f"   Read {len(segments)} change feed segment(s): {created} created, {deleted} deleted")
+
+    prefixes = [p for p in index.synced_prefixes(storage_account, container) if p.startswith(root)]
+    months = new_month_summary()
+    blob_count = 0
+    for blob in index.iter_blobs(storage_account, container, prefixes):
+        blob_count += 1
+        add_blob_to_months(months, blob)
+
+    if not blob_count:
+        return {}
+
+    print(f"   Found {blob_count} blobs")
+
+    return dict(months)
+
+
+def load_remote_inventory(auth: AzureAuthenticator, storage_account: str, inventory_container: str, rule_name: str = None, prefix: str = ""):
+    """Find the latest inventory report in storage. Returns (snapshot time, blob iterator)."""
+    suffix = f"{rule_name}-manifest.json" if rule_name else "-manifest.json"
+    manifests = [b["name"] for b in list_blobs_rest(auth, storage_account, inventory_container) if b["name"].endswith(suffix)]
+    if not manifests:
+        raise BlobListingError(f"No inventory manifest found in container '{inventory_container}'")
+
+    # Report folders start with the run date (YYYY/MM/DD/HH-MM-SS/...), so the newest sorts last
+    latest = max(manifests)
+    manifest = parse_manifest(get_blob(auth, storage_account, inventory_container, latest).json())
+    print(f"   Using inventory report: {latest}")
+
+    def iter_blobs():
+        for report in manifest["files"]:
+            response = get_blob(auth, storage_account, inventory_container, report, stream=True)
+            with response:
+                if manifest["format"] == "csv":
+                    lines = (line.decode("utf-8") for line in response.iter_lines())
+                    yield from iter_inventory_csv(lines, prefix)
+                    continue
+                # Parquet needs random access to its footer, so spool the report to disk first
+                with tempfile.TemporaryFile() as spool:
+                    for chunk in response.iter_content(chunk_size=1024 * 1024):
+                        spool.write(chunk)
+                    spool.seek(0)
+                    yield from iter_inventory_parquet(spool, prefix)
+
+    return manifest["snapshot"], iter_blobs()
+
+
+def list_export_months_from_inventory(auth: AzureAuthenticator, storage_account: str, container: str, export_root_path: str = None, inventory_path: str = None, inventory_container: str = None, inventory_rule: str = None, max_workers: int = 8) -> dict:
+    """List all months available in the export container from a Blob Inventory report.
+
+    The snapshot time comes from the report's manifest, or failing that from the
+    newest Last-Modified in the report. Periods that were still settling at the
+    snapshot, or that are not in the report at all, are listed live. Settled
+    periods get one delimiter listing of their run folders and are listed live
+    too when those differ from the report (a run written after the snapshot).
+    """
+    path_display = f"{storage_account}/{container}"
+    if export_root_path:
+        path_display += f"/{export_root_path}"
+    print(f"\n📦 Scanning storage: {path_display} (inventory)")
+
+    root = export_root_path.strip("/") + "/" if export_root_path else ""
+
+    # Aggregate the report per period folder so live listings can replace whole periods
+    periods_seen = defaultdict(new_month_summary)
+    period_counts = defaultdict(int)
+    period_children = defaultdict(set)
+    newest = None
+
+    try:
+        if inventory_path:
+            manifest = find_local_manifest(inventory_path)
+            snapshot = manifest["snapshot"] if manifest else None
+            blobs = iter_inventory_file(inventory_path, root)
+            print(f"   Using inventory report: {inventory_path}")
+        else:
+            snapshot, blobs = load_remote_inventory(auth, storage_account, inventory_container, inventory_rule, root)
+
+        for blob in blobs:
+            prefix = period_prefix_of(blob["name"])
+            if prefix:
+                add_blob_to_months(periods_seen[prefix], blob)
+                period_counts[prefix] += 1
+                period_children[prefix].add(period_child(prefix, blob["name"]))
+            try:
+                modified = parsedate_to_datetime(blob["modified"])
+            except (TypeError, ValueError):
+                continue
+            if newest is None or modified > newest:
+                newest = modified
+
+        if snapshot is None and newest is not None:
+            # No manifest: the report was taken no earlier than its newest blob
+            snapshot = newest
+            print(f"   Inventory snapshot: {snapshot.strftime('%Y-%m-%d %H:%M')} UTC (newest Last-Modified), {sum(period_counts.values())} blobs")
+        elif snapshot is not None:
+            print(f"   Inventory snapshot: {snapshot.strftime('%Y-%m-%d %H:%M')} UTC, {sum(period_counts.values())} blobs")
+
+        periods = discover_period_prefixes(auth, storage_account, container, export_root_path, max_workers)
+        live = [
+            p for p in periods
+            if snapshot is None
+            or p not in periods_seen
+            or period_end_date(p) is None
+            or period_end_date(p) + timedelta(days=SETTLE_DAYS) >= snapshot.date()
+        ]
+        settled = [p for p in periods if p not in set(live)]
+        changed = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(list_period_children, auth, storage_account, container, prefix): prefix
+                for prefix in settled
+            }
+            for future in as_completed(futures):
+                prefix = futures[future]
+                if future.result() != period_children[prefix]:
+                    changed.append(prefix)
+        live += sorted(changed)
+        note = f" ({len(changed)} changed since the snapshot)" if changed else ""
+        print(f"   Found {len(periods)} period folders, {len(live)} listed live{note}")
+
+        def scan_period(prefix: str):
+            period_months = new_month_summary()
+            count = 0
+            for blob in list_blobs_rest(auth, storage_account, container, prefix=prefix):
+                count += 1
+                add_blob_to_months(period_months, blob)
+            return period_months, count
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(scan_period, prefix): prefix for prefix in live}
+            for future in as_completed(futures):
+                prefix = futures[future]
+                periods_seen[prefix], period_counts[prefix] = future.result()
+    except (BlobListingError, OSError, ValueError, RuntimeError) as e:
+        print(f"   ❌ {e}")
+        return {}
+
+    # Periods deleted since the snapshot are no longer in storage
+    months = new_month_summary()
+    blob_count = 0
+    for prefix in periods:
+        merge_month_summaries(months, periods_seen.get(prefix, {}))
+        blob_count += period_counts.get(prefix, 0)
+
+    if not blob_count:
+        return {}
+
+    print(f"   Found {blob_count} blobs")
+
+    return dict(months)
+
+
+def check_export_manifests(auth: AzureAuthenticator, storage_account: str, container: str, export_root_path: str = None, max_workers: int = 8):
+    """Check every export run against its manifest.json.
+
+    Lists run folders with delimiter listings and then each run folder on its
+    own, so I/O grows with the number of runs rather than scanning the whole
+    container. Returns (month summary, per-run results), or (None, None) if the
+    container could not be listed, so callers can tell a failure from an empty container.
+    """
+    path_display = f"{storage_account}/{container}"
+    if export_root_path:
+        path_display += f"/{export_root_path}"
+    print(f"\n📦 Scanning storage: {path_display} (manifests)")
+
+    def check_run(run_prefix: str):
+        run_months = new_month_summary()
+        present = {}
+        total_files = total_bytes = 0
+        latest = None
+        for blob in list_blobs_rest(auth, storage_account, container, prefix=run_prefix):
+            total_files += 1
+            total_bytes += blob["size"]
+            modified = parse_http_date(blob["modified"])
+            if modified and (latest is None or modified > latest):
+                latest = modified
+            if blob["name"].endswith("/" + MANIFEST_NAME):
+                continue
+            present[blob["name"]] = blob["size"]
+            add_blob_to_months(run_months, blob)
+
+        result = {
+            "prefix": run_prefix,
+            "period": period_prefix_of(run_prefix),
+            "data_blobs": len(present),
+            "files": total_files,
+            "bytes": total_bytes,
+            "latest": latest,
+            "months": dict(run_months),
+        }
+        try:
+            response = get_blob(auth, storage_account, container, run_prefix + MANIFEST_NAME)
+            manifest = parse_export_manifest(response.json())
+        except BlobListingError:
+            result.update({"complete": False, "status": "NoManifest"})
+            return run_months, result
+        except ValueError:
+            result.update({"complete": False, "status": "InvalidManifest"})
+            return run_months, result
+
+        comparison = compare_manifest(manifest, present)
+        result.update(comparison)
+        result.update({
+            "run_id": manifest["run_id"] or run_prefix.rstrip("/").rsplit("/", 1)[-1],
+            "rows": manifest["rows"],
+            "status": "Complete" if comparison["complete"] else "Incomplete",
+        })
+        return run_months, result
+
+    months = new_month_summary()
+    runs = []
+
+    try:
+        periods = discover_period_prefixes(auth, storage_account, container, export_root_path, max_workers)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            run_prefixes = [
+                run for children in executor.map(
+                    lambda period: list(list_blob_prefixes(auth, storage_account, container, period)), periods
+                )
+                for run in children
+            ]
+            print(f"   Found {len(periods)} period folders, {len(run_prefixes)} runs")
+
+            for future in as_completed([executor.submit(check_run, run) for run in run_prefixes]):
+                run_months, result = future.result()
+                merge_month_summaries(months, run_months)
+                runs.append(result)
+    except BlobListingError as e:
+        print(f"   ❌ {e}")
+        return None, None
+
+    return dict(months), runs
+
+
+def print_manifest_summary(runs: list) -> bool:
+    """Print per-run completeness. Returns True if every run matches its manifest."""
+    if not runs:
+        print("\n   No export runs found")
+        return False
+
+    print(f"\n📋 Export runs ({len(runs)} total):\n")
+    print(f"   {'Period':<18} {'Run':<38} {'Blobs':<10} {'Rows':<12} {'Status'}")
+    print(f"   {'-'*18} {'-'*38} {'-'*10} {'-'*12} {'-'*12}")
+
+    problems = []
+    for run in sorted(runs, key=lambda r: r["prefix"], reverse=True):
+        period = run["period"].rstrip("/").rsplit("/", 1)[-1] if run["period"] else "Unknown"
+        run_id = run.get("run_id") or run["prefix"].rstrip("/").rsplit("/", 1)[-1]
+        if "expected_blobs" in run:
+            blobs = f"{run['present_blobs']}/{run['expected_blobs']}"
+        else:
+            blobs = str(run["data_blobs"])
+        rows = run.get("rows")
+        rows = str(rows) if rows is not None else "-"
+        status = "✅ Complete" if run["complete"] else f"❌ {run['status']}"
+        print(f"   {period:<18} {run_id[:38]:<38} {blobs:<10} {rows:<12} {status}")
+
+        for name in run.get("missing", []):
+            problems.append(f"{run_id}: missing {name}")
+        for name in run.get("size_mismatch", []):
+            problems.append(f"{run_id}: size differs from manifest for {name}")
+
+    incomplete = sum(1 for r in runs if not r["complete"])
+    if incomplete:
+        print(f"\n   ⚠️  {incomplete} run(s) incomplete or without manifest")
+        for problem in sorted(problems)[:20]:
+            print(f"      {problem}")
+        if len(problems) > 20:
+            print(f"      ... and {len(problems) - 20} more")
 
-    if not blobs:
+    return not incomplete
+
+
+def find_superseded_runs(runs: list) -> list:
+    """Pick the newest complete run per period; older runs of that period are superseded.
+
+    Runs are ordered by the last write to their folder. Runs newer than the
+    newest complete one are probably still being written and are kept, as are
+    all runs of a period that has no complete run yet.
+    """
+    by_period = defaultdict(list)
+    for run in runs:
+        if run["period"]:
+            by_period[run["period"]].append(run)
+
+    superseded = []
+    oldest = datetime.min.replace(tzinfo=timezone.utc)
+    for period_runs in by_period.values():
+        complete = [r for r in period_runs if r["complete"]]
+        if not complete:
+            continue
+        current = max(complete, key=lambda r: r["latest"] or oldest)
+        current_time = current["latest"] or oldest
+        for run in period_runs:
+            if run is not current and (run["latest"] or oldest) <= current_time:
+                superseded.append(dict(run, superseded_by=current["prefix"]))
+    return superseded
+
+
+def months_without_runs(runs: list, excluded: list) -> dict:
+    """Month summary of every run except the excluded ones."""
+    excluded_prefixes = {r["prefix"] for r in excluded}
+    months = new_month_summary()
+    for run in runs:
+        if run["prefix"] not in excluded_prefixes:
+            merge_month_summaries(months, run["months"])
+    return dict(months)
+
+
+def print_superseded_summary(superseded: list):
+    """Print superseded runs and the storage they take up."""
+    if not superseded:
+        print("\n♻️  No superseded runs")
+        return
+
+    periods = {r["period"] for r in superseded}
+    print(f"\n♻️  Superseded runs ({len(superseded)} in {len(periods)} period folder(s)):\n")
+    print(f"   {'Period':<18} {'Run':<38} {'Files':<8} {'Size (MB)':<12} {'Last Written'}")
+    print(f"   {'-'*18} {'-'*38} {'-'*8} {'-'*12} {'-'*16}")
+    for run in sorted(superseded, key=lambda r: r["prefix"], reverse=True):
+        period = run["period"].rstrip("/").rsplit("/", 1)[-1]
+        run_id = run.get("run_id") or run["prefix"].rstrip("/").rsplit("/", 1)[-1]
+        latest = run["latest"].strftime("%Y-%m-%d %H:%M") if run["latest"] else "Unknown"
+        print(f"   {period:<18} {run_id[:38]:<38} {run['files']:<8} {run['bytes'] / (1024 * 1024):<12.2f} {latest}")
+
+    total_files = sum(r["files"] for r in superseded)
+    total_bytes = sum(r["bytes"] for r in superseded)
+    print(f"\n   Reclaimable: {total_files} files, {total_bytes / (1024 * 1024):.2f} MB")
+    print(f"   Month totals above count only the newest complete run of each period")
+
+
+def delete_superseded_runs(auth: AzureAuthenticator, storage_account: str, container: str, superseded: list, max_workers: int = 8, dry_run: bool = True) -> bool:
+    """Delete every blob of the superseded runs with Blob Batch requests. Returns True if all were deleted.
+
+    With `dry_run` (the default) the blobs are only listed and counted.
+    """
+    def delete_run(run: dict):
+        names = [b["name"] for b in list_blobs_rest(auth, storage_account, container, prefix=run["prefix"])]
+        if dry_run:
+            return run, len(names), []
+        deleted, failed = 0, []
+        for i in range(0, len(names), BATCH_MAX_SUBREQUESTS):
+            batch_deleted, batch_failed = delete_blobs_batch(
+                auth, storage_account, container, names[i:i + BATCH_MAX_SUBREQUESTS]
+            )
+            deleted += batch_deleted
+            failed.extend(batch_failed)
+        return run, deleted, failed
+
+    if dry_run:
+        print(f"\n🗑️  Dry run: would delete {len(superseded)} superseded run(s)...")
+    else:
+        print(f"\n🗑️  Deleting {len(superseded)} superseded run(s)...")
+    deleted_total, failed_total = 0, []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(delete_run, run) for run in superseded]
+        for future in as_completed(futures):
+            try:
+                run, deleted, failed = future.result()
+            except BlobListingError as e:
+                failed_total.append(str(e))
+                continue
+            deleted_total += deleted
+            failed_total.extend(failed)
+
+    if dry_run:
+        print(f"   Would delete {deleted_total} blobs; nothing was deleted. Add --yes to delete them")
+    else:
+        print(f"   Deleted {deleted_total} blobs")
+    if failed_total:
+        print(f"   ❌ {len(failed_total)} blob(s) could not be deleted")
+        for failure in failed_total[:20]:
+            print(f"      {failure}")
+    return not failed_total
+
+
+def inspect_export_file(auth: AzureAuthenticator, storage_account: str, container: str, blob: dict, focus_version: str) -> dict:
+    """Inspect one export file: Parquet via footer range reads, CSV by streaming it once."""
+    name = blob["name"]
+    try:
+        if name.endswith(".parquet"):
+            def fetch(start: int, end: int) -> bytes:
+                headers = {"Range": f"bytes={start}-{end}"}
+                return get_blob(auth, storage_account, container, name, headers=headers).content
+
+            result = inspect_parquet(RangedReader(fetch, blob["size"]), focus_version)
+        else:
+            response = get_blob(auth, storage_account, container, name, stream=True)
+            with response:
+                # requests already decompresses blobs stored with Content-Encoding: gzip
+                gzipped = name.endswith(".gz") and response.headers.get("Content-Encoding") != "gzip"
+                result = inspect_csv(response.iter_content(chunk_size=1024 * 1024), gzipped, focus_version)
+    except Exception as e:
+        result = {"error": str(e)}
+
+    result["name"] = name
+    return result
+
+
+def check_export_contents(auth: AzureAuthenticator, storage_account: str, container: str, export_root_path: str = None, focus_version: str = DEFAULT_FOCUS_VERSION, max_workers: int = 8) -> dict:
+    """Check row counts, schema and charge periods of every export file, per month."""
+    print(f"\n🔎 Checking file contents (FOCUS {focus_version})")
+
+    try:
+        data_blobs = [
+            b for b in list_blobs_rest(auth, storage_account, container, prefix=export_root_path)
+            if is_data_file(b["name"]) and period_prefix_of(b["name"])
+        ]
+    except BlobListingError as e:
+        print(f"   ❌ {e}")
         return {}
 
-    print(f"   Found {len(blobs)} blobs")
+    months = defaultdict(lambda: {
+        "files": 0, "rows": 0, "empty": 0, "schema": 0, "errors": 0,
+        "out_of_period": 0, "charge_min": None, "charge_max": None, "problems": [],
+    })
 
-    # Parse blob paths to extract months
-    # Expected path: {export_root_path}/{export_name}/YYYYMMDD-YYYYMMDD/...
-    months = defaultdict(lambda: {"files": 0, "size_mb": 0, "latest": None})
-    date_pattern = re.compile(r"/(\d{8})-(\d{8})/")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(inspect_export_file, auth, storage_account, container, blob, focus_version)
+            for blob in data_blobs
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            match = DATE_PATTERN.search(result["name"])
+            period_start, period_end = match.group(1), match.group(2)
+            month = months[f"{period_start[:4]}-{period_start[4:6]}"]
+            month["files"] += 1
 
-    for blob in blobs:
-        name = blob.get("name", "")
-        size = blob.get("size", 0)
-        modified = blob.get("modified", "")
+            if "error" in result:
+                month["errors"] += 1
+                month["problems"].append(f"{result['name']}: {result['error'][:120]}")
+                continue
 
-        match = date_pattern.search(name)
-        if match:
-            start_date = match.group(1)
-            # Extract YYYY-MM from start date
-            month_key = f"{start_date[:4]}-{start_date[4:6]}"
-            months[month_key]["files"] += 1
-            months[month_key]["size_mb"] += size / (1024 * 1024)
+            month["rows"] += result["rows"]
+            if not result["rows"]:
+                month["empty"] += 1
+                month["problems"].append(f"{result['name']}: no rows")
+            if result["missing_columns"]:
+                month["schema"] += 1
+                month["problems"].append(f"{result['name']}: missing {', '.join(result['missing_columns'])}")
 
-            if not months[month_key]["latest"] or modified > months[month_key]["latest"]:
-                months[month_key]["latest"] = modified
+            low, high = result["charge_start_min"], result["charge_start_max"]
+            if low and high:
+                if low[:10].replace("-", "") < period_start or high[:10].replace("-", "") > period_end:
+                    month["out_of_period"] += 1
+                    month["problems"].append(f"{result['name']}: ChargePeriodStart {low[:10]}..{high[:10]} outside period")
+                if not month["charge_min"] or low < month["charge_min"]:
+                    month["charge_min"] = low
+                if not month["charge_max"] or high > month["charge_max"]:
+                    month["charge_max"] = high
 
     return dict(months)
 
 
+def print_content_summary(content: dict) -> bool:
+    """Print the per-month content check. Returns True if no problems were found."""
+    if not content:
+        print("\n   No export files to check")
+        return False
+
+    print(f"\n🧾 File contents:\n")
+    print(f"   {'Month':<10} {'Files':<8} {'Rows':<12} {'Empty':<7} {'Schema':<8} {'Errors':<8} {'ChargePeriodStart'}")
+    print(f"   {'-'*10} {'-'*8} {'-'*12} {'-'*7} {'-'*8} {'-'*8} {'-'*23}")
+
+    problems = []
+    for month in sorted(content.keys(), reverse=True):
+        data = content[month]
+        charge_range = "Unknown"
+        if data["charge_min"] and data["charge_max"]:
+            charge_range = f"{data['charge_min'][:10]} to {data['charge_max'][:10]}"
+        print(f"   {month:<10} {data['files']:<8} {data['rows']:<12} {data['empty']:<7} {data['schema']:<8} {data['errors']:<8} {charge_range}")
+        problems.extend(data["problems"])
+
+    if problems:
+        print(f"\n   ⚠️  {len(problems)} problem(s) found:")
+        for problem in sorted(problems)[:20]:
+            print(f"      {problem}")
+        if len(problems) > 20:
+            print(f"      ... and {len(problems) - 20} more")
+
+    return not problems
+
+
+def reconcile_export_costs(auth: AzureAuthenticator, storage_account: str, container: str, export_root_path: str = None, max_workers: int = 8):
+    """Stream every export file and total BilledCost/EffectiveCost per month, service and sub-account."""
+    print(f"\n💰 Reconciling cost totals")
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("   ❌ Cost reconciliation requires pyarrow (pip install pyarrow)")
+        return None
+
+    try:
+        data_blobs = [
+            b for b in list_blobs_rest(auth, storage_account, container, prefix=export_root_path)
+            if is_data_file(b["name"]) and period_prefix_of(b["name"])
+        ]
+    except BlobListingError as e:
+        print(f"   ❌ {e}")
+        return None
+
+    aggregator = CostAggregator()
+    errors = []
+
+    def process(blob: dict):
+        name = blob["name"]
+        start = DATE_PATTERN.search(name).group(1)
+        month = f"{start[:4]}-{start[4:6]}"
+
+        if name.endswith(".parquet"):
+            # Only the projected column chunks are downloaded, in large ranged reads
+            def fetch(start: int, end: int) -> bytes:
+                headers = {"Range": f"bytes={start}-{end}"}
+                return get_blob(auth, storage_account, container, name, headers=headers).content
+
+            reader = RangedReader(fetch, blob["size"], min_range_size=8 * 1024 * 1024)
+            for batch in iter_parquet_cost_batches(reader):
+                aggregator.add_batch(month, batch)
+            return
+
+        response = get_blob(auth, storage_account, container, name, stream=True)
+        with response:
+            response.raw.decode_content = True
+            gzipped = name.endswith(".gz") and response.headers.get("Content-Encoding") != "gzip"
+            for batch in iter_csv_cost_batches(response.raw, gzipped):
+                aggregator.add_batch(month, batch)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(process, blob): blob["name"] for blob in data_blobs}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                errors.append(f"{futures[future]}: {str(e)[:120]}")
+
+    if errors:
+        print(f"   ⚠️  {len(errors)} file(s) could not be read:")
+        for error in sorted(errors)[:20]:
+            print(f"      {error}")
+
+    return aggregator
+
+
+def mirror_export_files(auth: AzureAuthenticator, storage_account: str, container: str, dest: str, export_root_path: str = None, months: list = None, chunk_size: int = DEFAULT_CHUNK_SIZE, max_workers: int = 16):
+    """Download new and changed export files to `dest` in concurrent ranged chunks."""
+    print(f"\n⬇️  Mirroring export files to {dest}")
+
+    def fetch(blob: dict, start: int, end: int):
+        # If-Match makes a blob replaced during the mirror fail instead of mixing versions
+        headers = {"Range": f"bytes={start}-{end}", "If-Match": blob["etag"]}
+        return get_blob(auth, storage_account, container, blob["name"], headers=headers, stream=True)
+
+    def selected(blob: dict) -> bool:
+        if not months:
+            return True
+        match = DATE_PATTERN.search(blob["name"])
+        return bool(match) and f"{match.group(1)[:4]}-{match.group(1)[4:6]}" in months
+
+    mirror = ExportMirror(dest, fetch, chunk_size=chunk_size, max_workers=max_workers)
+    try:
+        blobs = [b for b in list_blobs_rest(auth, storage_account, container, prefix=export_root_path) if selected(b)]
+        return mirror.mirror(blobs)
+    except BlobListingError as e:
+        print(f"   ❌ {e}")
+        return None
+    except KeyboardInterrupt:
+        print("\n   ⚠️  Interrupted; run again to resume the partial downloads")
+        sys.exit(130)
+
+
+def print_mirror_summary(result: dict) -> bool:
+    """Print what the mirror downloaded. Returns False if any file failed."""
+    if result is None:
+        return False
+    mb = result["bytes"] / (1024 * 1024)
+    rate = mb / result["seconds"] if result["seconds"] else 0
+    print(f"   Up to date: {result['current']} file(s)")
+    print(f"   Downloaded: {result['downloaded']} file(s), {mb:,.1f} MB in {result['seconds']:.1f}s ({rate:,.1f} MB/s)")
+    if result["resumed"]:
+        print(f"   Resumed:    {result['resumed']} partial download(s)")
+    if result["downloaded"]:
+        unverified = result["downloaded"] - result["verified"]
+        note = f" ({unverified} without Content-MD5 on the blob)" if unverified else ""
+        print(f"   Verified:   {result['verified']} file(s) against Content-MD5{note}")
+    if result["failed"]:
+        print(f"   ❌ {len(result['failed'])} file(s) failed; run again to retry:")
+        for failure in sorted(result["failed"], key=lambda f: f["name"])[:20]:
+            print(f"      {failure['name']}: {failure['error'][:120]}")
+    return not result["failed"]
+
+
+def print_cost_totals(aggregator: CostAggregator, months: dict):
+    """Print cost totals per month alongside the file counts from the storage scan."""
+    totals = aggregator.month_totals()
+    if not totals:
+        print("\n   No cost rows found")
+        return
+
+    print(f"\n💰 Cost totals per month:\n")
+    print(f"   {'Month':<10} {'Files':<8} {'Rows':<12} {'Currency':<9} {'BilledCost':>16} {'EffectiveCost':>16}")
+    print(f"   {'-'*10} {'-'*8} {'-'*12} {'-'*9} {'-'*16} {'-'*16}")
+
+    for month, currency in sorted(totals, key=lambda k: (k[0], k[1]), reverse=True):
+        billed, effective = totals[(month, currency)]
+        files = months.get(month, {}).get("files", 0)
+        rows = aggregator.rows.get(month, 0)
+        print(f"   {month:<10} {files:<8} {rows:<12} {currency or '-':<9} {billed:>16,.2f} {effective:>16,.2f}")
+
+
 def print_month_summary(months: dict):
     """Print a summary of available months."""
     if not months:
@@ -187,32 +1178,149 @@ def print_month_summary(months: dict):
     total_size = sum(m["size_mb"] for m in months.values())
     print(f"\n   Total: {total_files} files, {total_size:.2f} MB")
 
-    # Check for gaps
-    if len(months) > 1:
-        sorted_months = sorted(months.keys())
-        first = datetime.strptime(sorted_months[0], "%Y-%m")
-        last = datetime.strptime(sorted_months[-1], "%Y-%m")
-        expected = (last.year - first.year) * 12 + (last.month - first.month) + 1
-        if expected > len(months):
-            print(f"\n   ⚠️  Warning: {expected - len(months)} month(s) may be missing")
+    print_day_coverage(months)
 
 
-def get_terraform_outputs() -> dict:
-    """Get onboarding values from terraform output."""
-    try:
-        result = subprocess.run(
-            ["terraform", "output", "-json", "digiusher_onboarding"],
-            capture_output=True,
-            text=True,
-            check=True
+def day_coverage(months: dict) -> DayCoverage:
+    """Build the per-export day bitmap from the period folders seen while listing."""
+    coverage = DayCoverage()
+    for prefix in set().union(*(m.get("periods", ()) for m in months.values())):
+        coverage.add_period_prefix(prefix)
+    return coverage
+
+
+def print_day_coverage(months: dict):
+    """Report missing and overlapping days per export, from period folder ranges."""
+    coverage = day_coverage(months)
+    if not coverage.exports():
+        return
+
+    print(f"\n🗓️  Day coverage:")
+    gaps = False
+    for export in coverage.exports():
+        first, last = coverage.span(export)
+        print(f"   {export or '(root)'}: {first} to {last}, {coverage.covered_days(export)} day(s) "
+              f"in {coverage.periods[export]} period folder(s)")
+
+        missing = coverage.missing_ranges(export)
+        for start, end in missing:
+            print(f"      ⚠️  Missing {start} to {end} ({(end - start).days + 1} day(s))")
+        for start, end in coverage.overlap_ranges(export):
+            print(f"      ⚠️  Overlapping periods {start} to {end} ({(end - start).days + 1} day(s))")
+        if not missing:
+            print(f"      ✅ No missing days")
+        gaps = gaps or bool(missing)
+
+    if gaps:
+        print(f"\n   Export only the missing days again with: python3 backfill_historical_data.py --from-terraform --heal")
+
+
+# Fields every --fleet entry needs besides the client secret
+FLEET_KEYS = ["tenant_id", "client_id", "storage_account", "container"]
+
+
+def verify_fleet(entries: list, max_workers: int = 8, account_concurrency: int = 2, parallel: bool = False, use_token_cache: bool = True) -> dict:
+    """Verify many storage accounts and containers concurrently.
+
+    Entries run on a shared worker pool, at most `account_concurrency` at a time
+    per storage account, so total time follows the slowest account rather than
+    the sum. Each account's entries wait in their own queue and are only
+    submitted when one of its slots frees up, so workers never sit blocked on a
+    busy account while other accounts have work. Entries of the same service principal share one authenticator and
+    its tokens. Returns per-entry results keyed by (storage_account, container, root).
+    """
+    started = time.monotonic()
+    authenticators = {}
+    account_queues = {}
+    jobs = {}
+
+    for entry in entries:
+        key = (entry["storage_account"], entry["container"], (entry.get("export_root_path") or "").strip("/"))
+        if key in jobs:
+            print(f"⚠️  Skipping duplicate entry for {entry['storage_account']}/{entry['container']}")
+            continue
+        auth_key = (entry["tenant_id"], entry["client_id"])
+        if auth_key not in authenticators:
+            authenticators[auth_key] = AzureAuthenticator(
+                entry["tenant_id"], entry["client_id"], entry["client_secret"], use_cache=use_token_cache,
+            )
+        account_queues.setdefault(entry["storage_account"], deque()).append(key)
+        jobs[key] = entry
+
+    # Keep a connection pool per storage account host instead of evicting them
+    azure_http.configure(pool_connections=len(account_queues) + 4)
+
+    def verify_entry(key: tuple, entry: dict) -> dict:
+        auth = authenticators[(entry["tenant_id"], entry["client_id"])]
+        account, container, root = key
+        entry_started = time.monotonic()
+        if parallel:
+            months = list_export_months_parallel(auth, account, container, root or None, max_workers=account_concurrency)
+        else:
+            months = list_export_months(auth, account, container, root or None)
+        elapsed = time.monotonic() - entry_started
+
+        coverage = day_coverage(months)
+        missing_days = sum(
+            (end - start).days + 1
+            for export in coverage.exports()
+            for start, end in coverage.missing_ranges(export)
         )
-        return json.loads(result.stdout)
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Failed to get terraform output: {e.stderr}")
-        sys.exit(1)
-    except json.JSONDecodeError:
-        print("❌ Failed to parse terraform output")
-        sys.exit(1)
+        return {"months": months, "missing_days": missing_days, "elapsed_seconds": elapsed}
+
+    print(f"\n🚀 Verifying {len(jobs)} container(s) in {len(account_queues)} storage account(s)")
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running = {}
+
+        def submit_next(account: str):
+            if account_queues[account]:
+                key = account_queues[account].popleft()
+                running[executor.submit(verify_entry, key, jobs[key])] = key
+
+        for account in account_queues:
+            for _ in range(account_concurrency):
+                submit_next(account)
+
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = running.pop(future)
+                try:
+                    results[key] = future.result()
+                except Exception as e:
+                    print(f"   ❌ {key[0]}/{key[1]}: {e}")
+                    results[key] = {"months": {}, "error": str(e)}
+                submit_next(key[0])
+
+    elapsed = time.monotonic() - started
+    print_fleet_summary(jobs, results, elapsed)
+    return results
+
+
+def print_fleet_summary(jobs: dict, results: dict, elapsed: float):
+    """Print one line per verified container."""
+    print(f"\n📊 Fleet summary ({timedelta(seconds=int(elapsed))} total):\n")
+    print(f"   {'Name':<32} {'Months':<8} {'Files':<10} {'Size (MB)':<12} {'Missing days':<14} {'Elapsed':<10} {'Status'}")
+    print(f"   {'-'*32} {'-'*8} {'-'*10} {'-'*12} {'-'*14} {'-'*10} {'-'*6}")
+    for key in sorted(results):
+        entry, result = jobs[key], results[key]
+        name = entry.get("name") or f"{key[0]}/{key[1]}"
+        months = result["months"]
+        files = sum(m["files"] for m in months.values())
+        size = sum(m["size_mb"] for m in months.values())
+        took = timedelta(seconds=int(result.get("elapsed_seconds", 0)))
+        if result.get("error"):
+            status = "❌ error"
+        elif not months:
+            status = "❌ no data"
+        elif result["missing_days"]:
+            status = "⚠️  gaps"
+        else:
+            status = "✅"
+        missing = result.get("missing_days", "-")
+        print(f"   {name[:32]:<32} {len(months):<8} {files:<10} {size:<12.2f} {missing!s:<14} {str(took):<10} {status}")
 
 
 def main():
@@ -224,6 +1332,9 @@ Examples:
   # Using terraform output (easiest)
   python3 verify_exports.py --from-terraform
 
+  # Using a named profile (or DIGIUSHER_* environment variables)
+  python3 verify_exports.py --profile contoso
+
   # Using explicit credentials
   python3 verify_exports.py \\
     --tenant-id abc123 \\
@@ -237,35 +1348,182 @@ Examples:
         "--from-terraform", action="store_true",
         help="Read credentials from terraform output (digiusher_onboarding)"
     )
+    parser.add_argument(
+        "--terraform-dir", default=".",
+        help="Terraform working directory for --from-terraform (default: current directory)",
+    )
+    parser.add_argument(
+        "--profile",
+        help="Named profile from ~/.config/digiusher/profiles.json (override with DIGIUSHER_PROFILES)",
+    )
     parser.add_argument("--tenant-id", help="Azure Tenant ID")
     parser.add_argument("--client-id", help="Service Principal Client ID")
     parser.add_argument("--client-secret", help="Service Principal Client Secret")
     parser.add_argument("--storage-account", help="Storage account name")
     parser.add_argument("--container", help="Container name")
     parser.add_argument("--export-root-path", help="Root folder path for exports (default: focus)")
+    parser.add_argument(
+        "--parallel", action="store_true",
+        help="Discover period folders first and list them concurrently (faster on large containers)",
+    )
+    parser.add_argument(
+        "--max-workers", type=int, default=8,
+        help="Maximum concurrent listings with --parallel or --index (default: 8)",
+    )
+    parser.add_argument(
+        "--index",
+        help="SQLite file for incremental verification; only changed period folders are re-listed",
+    )
+    parser.add_argument(
+        "--full-sync", action="store_true",
+        help="With --index, re-list every period folder and rebuild the index",
+    )
+    parser.add_argument(
+        "--change-feed", action="store_true",
+        help="With --index, keep the index current from the storage account's Blob change feed "
+             "instead of re-listing period folders (needs fastavro)",
+    )
+    parser.add_argument(
+        "--change-feed-dir",
+        help="Read the change feed from a local copy of the $blobchangefeed container",
+    )
+    parser.add_argument(
+        "--inventory",
+        help="Local Blob Inventory report (CSV or Parquet) to build the summary from",
+    )
+    parser.add_argument(
+        "--inventory-container",
+        help="Container holding Blob Inventory reports; the latest report is used",
+    )
+    parser.add_argument(
+        "--inventory-rule",
+        help="Inventory rule name, when the inventory container holds several rules",
+    )
+    parser.add_argument(
+        "--check-content", action="store_true",
+        help="Also check row counts, FOCUS schema and charge periods of every export file "
+             "(Parquet footers are read with range requests; Parquet needs pyarrow)",
+    )
+    parser.add_argument(
+        "--focus-version", default=DEFAULT_FOCUS_VERSION,
+        help=f"FOCUS dataVersion the export is configured with (default: {DEFAULT_FOCUS_VERSION})",
+    )
+    parser.add_argument(
+        "--reconcile", action="store_true",
+        help="Stream every export file and print BilledCost/EffectiveCost totals per month (needs pyarrow)",
+    )
+    parser.add_argument(
+        "--reconcile-output",
+        help="With --reconcile, write totals per month, ServiceName and SubAccountId to this CSV file",
+    )
+    parser.add_argument(
+        "--mirror", metavar="DIR",
+        help="Download new and changed export files to DIR in concurrent ranged chunks, "
+             "resuming partial downloads",
+    )
+    parser.add_argument(
+        "--mirror-month", action="append", metavar="YYYY-MM",
+        help="With --mirror, only download this month (repeatable)",
+    )
+    parser.add_argument(
+        "--chunk-size-mb", type=int, default=DEFAULT_CHUNK_SIZE // (1024 * 1024),
+        help=f"With --mirror, size of each ranged download in MB (default: {DEFAULT_CHUNK_SIZE // (1024 * 1024)})",
+    )
+    parser.add_argument(
+        "--download-workers", type=int, default=16,
+        help="With --mirror, maximum concurrent chunk downloads across all files (default: 16)",
+    )
+    parser.add_argument(
+        "--manifests", action="store_true",
+        help="Check each export run against its manifest.json instead of scanning the whole container",
+    )
+    parser.add_argument(
+        "--superseded", action="store_true",
+        help="Find runs replaced by a newer complete run of the same period and report the storage they use",
+    )
+    parser.add_argument(
+        "--delete-superseded", action="store_true",
+        help="Delete the superseded runs found by --superseded (Blob Batch requests); "
+             "only reports what would be deleted unless --yes is given",
+    )
+    parser.add_argument(
+        "--yes", action="store_true",
+        help="Confirm --delete-superseded; the deletion cannot be undone",
+    )
+    parser.add_argument(
+        "--fleet",
+        help="JSON file listing storage accounts and containers to verify concurrently",
+    )
+    parser.add_argument(
+        "--account-concurrency", type=int, default=2,
+        help="With --fleet, containers verified at once per storage account (default: 2)",
+    )
+    parser.add_argument(
+        "--no-token-cache", action="store_true",
+        help="Do not read or write the on-disk access token cache",
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=60,
+        help="HTTP read timeout in seconds for Azure API calls (default: 60)",
+    )
+    parser.add_argument(
+        "--metrics",
+        help="Write request metrics to this file at exit (Prometheus textfile format for .prom, JSON otherwise)",
+    )
 
     args = parser.parse_args()
+    azure_http.configure(timeout=(10, args.timeout))
+    if args.metrics:
+        metrics.enable()
+        atexit.register(metrics.write_at_exit, args.metrics, "verify_exports")
+    if (args.change_feed or args.change_feed_dir) and not args.index:
+        parser.error("--change-feed needs --index")
+    if args.yes and not args.delete_superseded:
+        parser.error("--yes only applies to --delete-superseded")
+    if args.mirror_month and not args.mirror:
+        parser.error("--mirror-month needs --mirror")
+    if args.chunk_size_mb < 1:
+        parser.error("--chunk-size-mb must be at least 1")
+
+    # Fleet mode reads credentials per entry
+    if args.fleet:
+        try:
+            entries = load_fleet_file(args.fleet, FLEET_KEYS)
+        except (OSError, ValueError) as e:
+            print(f"❌ Invalid fleet configuration: {e}")
+            sys.exit(1)
+        results = verify_fleet(
+            entries, max_workers=args.max_workers, account_concurrency=args.account_concurrency,
+            parallel=args.parallel, use_token_cache=not args.no_token_cache,
+        )
+        ok = all(r["months"] and not r.get("error") for r in results.values())
+        sys.exit(0 if ok else 1)
 
     # Get credentials
     if args.from_terraform:
         print("📥 Reading credentials from terraform output...")
-        outputs = get_terraform_outputs()
-        tenant_id = outputs["tenant_id"]
-        client_id = outputs["application_id"]
-        client_secret = outputs["client_secret"]
-        storage_account = outputs["storage_account_name"]
-        container = outputs["storage_container_name"]
-        export_root_path = outputs.get("export_root_path")
-    else:
-        if not all([args.tenant_id, args.client_id, args.client_secret,
-                    args.storage_account, args.container]):
-            parser.error("Either --from-terraform or all credential arguments are required")
-        tenant_id = args.tenant_id
-        client_id = args.client_id
-        client_secret = args.client_secret
-        storage_account = args.storage_account
-        container = args.container
-        export_root_path = args.export_root_path
+    try:
+        settings = resolve_settings(
+            args, from_terraform=args.from_terraform, profile=args.profile, terraform_dir=args.terraform_dir
+        )
+    except ConfigError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    required = ("tenant_id", "client_id", "client_secret", "storage_account", "container")
+    missing = [k for k in required if not settings.get(k)]
+    if missing and args.from_terraform:
+        print(f"❌ Missing required terraform outputs: {', '.join(missing)}")
+        sys.exit(1)
+    elif missing:
+        parser.error("Either --from-terraform, --profile or all credential arguments are required")
+
+    tenant_id = settings["tenant_id"]
+    client_id = settings["client_id"]
+    client_secret = settings["client_secret"]
+    storage_account = settings["storage_account"]
+    container = settings["container"]
+    export_root_path = settings.get("export_root_path")
 
     print("=" * 60)
     print("FOCUS Export Verification")
@@ -274,7 +1532,7 @@ Examples:
     # Authenticate
     print("\n🔐 Authenticating with service principal...")
     try:
-        auth = AzureAuthenticator(tenant_id, client_id, client_secret)
+        auth = AzureAuthenticator(tenant_id, client_id, client_secret, use_cache=not args.no_token_cache)
         auth.get_token()  # Test auth
         print("   ✅ Authentication successful")
     except Exception as e:
@@ -282,13 +1540,92 @@ Examples:
         sys.exit(1)
 
     # List available months
-    months = list_export_months(auth, storage_account, container, export_root_path)
+    manifests_ok = True
+    superseded = []
+    if args.manifests or args.superseded or args.delete_superseded:
+        months, runs = check_export_manifests(
+            auth, storage_account, container, export_root_path, max_workers=args.max_workers
+        )
+        if months is None:
+            months, runs, manifests_ok = {}, [], False
+        elif args.manifests:
+            manifests_ok = print_manifest_summary(runs)
+        if runs and (args.superseded or args.delete_superseded):
+            superseded = find_superseded_runs(runs)
+            months = months_without_runs(runs, superseded)
+    elif args.inventory or args.inventory_container:
+        months = list_export_months_from_inventory(
+            auth, storage_account, container, export_root_path,
+            inventory_path=args.inventory,
+            inventory_container=args.inventory_container,
+            inventory_rule=args.inventory_rule,
+            max_workers=args.max_workers,
+        )
+    elif args.index and (args.change_feed or args.change_feed_dir):
+        index = BlobIndex(args.index)
+        try:
+            months = list_export_months_change_feed(
+                auth, storage_account, container, export_root_path, index,
+                change_feed_dir=args.change_feed_dir, max_workers=args.max_workers,
+            )
+        finally:
+            index.close()
+    elif args.index:
+        index = BlobIndex(args.index)
+        try:
+            months = list_export_months_incremental(
+                auth, storage_account, container, export_root_path, index,
+                max_workers=args.max_workers, full=args.full_sync,
+            )
+        finally:
+            index.close()
+    elif args.parallel:
+        months = list_export_months_parallel(
+            auth, storage_account, container, export_root_path, max_workers=args.max_workers
+        )
+    else:
+        months = list_export_months(auth, storage_account, container, export_root_path)
     print_month_summary(months)
 
+    if args.superseded or args.delete_superseded:
+        print_superseded_summary(superseded)
+        if args.delete_superseded and superseded:
+            manifests_ok = delete_superseded_runs(
+                auth, storage_account, container, superseded, max_workers=args.max_workers,
+                dry_run=not args.yes,
+            ) and manifests_ok
+
+    content_ok = True
+    if args.check_content and months:
+        content = check_export_contents(
+            auth, storage_account, container, export_root_path,
+            focus_version=args.focus_version, max_workers=args.max_workers,
+        )
+        content_ok = print_content_summary(content)
+
+    if args.reconcile and months:
+        aggregator = reconcile_export_costs(
+            auth, storage_account, container, export_root_path, max_workers=args.max_workers
+        )
+        if aggregator:
+            print_cost_totals(aggregator, months)
+            if args.reconcile_output:
+                aggregator.write_csv(args.reconcile_output)
+                print(f"\n   Detailed totals written to {args.reconcile_output}")
+
+    mirror_ok = True
+    if args.mirror and months:
+        result = mirror_export_files(
+            auth, storage_account, container, args.mirror, export_root_path,
+            months=args.mirror_month, chunk_size=args.chunk_size_mb * 1024 * 1024,
+            max_workers=args.download_workers,
+        )
+        mirror_ok = print_mirror_summary(result)
+
     print("\n" + "=" * 60)
 
-    # Exit with error if no data found
-    sys.exit(0 if months else 1)
+    # Exit with error if no data found or the content, manifest or mirror checks found problems
+    sys.exit(0 if months and content_ok and manifests_ok and mirror_ok else 1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Watch FOCUS export runs and the export container, reporting only changes.
+
+A long-running alternative to running backfill_historical_data.py --status and
+verify_exports.py from cron. The process keeps its HTTP connections and access
+tokens between polls, and every --interval seconds it:
+
+- fetches the export with its recent runHistory, sending If-None-Match with the
+  ETag of the previous response, so an unchanged export costs a 304 and no parsing.
+  runHistory is computed for the response and ARM does not promise a new ETag
+  when it changes, so the condition is dropped while a run is queued or in
+  progress and on every RUNS_REFRESH_EVERY-th poll
+- lists the known export folders one level deep to spot new YYYYMMDD-YYYYMMDD/
+  period folders (List Blobs has no conditional form; a delimiter listing per
+  export is the cheapest way to see new folders)
+
+Only transitions are reported: a run queued, started, completed or failed, and
+a new period folder. Use --json for one JSON event per line.
+
+Usage:
+  python3 watch_exports.py --from-terraform
+  python3 watch_exports.py --profile contoso --interval 120 --json
+"""
+
+import argparse
+import json
+import signal
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+
+import azure_http
+import metrics
+from azure_auth import AzureAuthenticator
+from backfill_historical_data import FocusExportBackfill
+from onboarding_config import ConfigError, resolve_settings
+from run_history import ACTIVE_STATUSES, SUCCESS_STATUSES, run_info_from_api
+from verify_exports import (
+    PERIOD_FOLDER_PATTERN,
+    BlobListingError,
+    discover_period_prefixes,
+    list_blob_prefixes,
+)
+
+# Walk the whole folder tree again every this many polls, to pick up new export folders
+FULL_SCAN_EVERY = 12
+
+# Fetch runHistory without If-None-Match every this many polls, since a 304 does not prove it is unchanged
+RUNS_REFRESH_EVERY = 6
+
+EVENT_ICONS = {
+    "run_queued": "⏳",
+    "run_started": "🚀",
+    "run_completed": "✅",
+    "run_failed": "❌",
+    "period_added": "📁",
+}
+
+
+class WatchError(Exception):
+    """Raised when a poll gets an unexpected response."""
+
+
+def run_event(run: dict) -> str:
+    """Event name for a run's current status."""
+    if run["status"] == "Queued":
+        return "run_queued"
+    if run["status"] in ACTIVE_STATUSES:
+        return "run_started"
+    if run["status"] in SUCCESS_STATUSES:
+        return "run_completed"
+    return "run_failed"
+
+
+class ExportWatcher:
+    """Polls one export and its container, returning events for what changed since the last poll."""
+
+    def __init__(
+        self,
+        auth: AzureAuthenticator,
+        billing_scope: str = None,
+        export_name: str = None,
+        storage_account: str = None,
+        container: str = None,
+        export_root_path: str = None,
+        max_workers: int = 8,
+    ):
+        self.auth = auth
+        self.export = FocusExportBackfill(auth, billing_scope, export_name) if billing_scope and export_name else None
+        self.storage_account = storage_account
+        self.container = container
+        self.export_root_path = export_root_path
+        self.max_workers = max_workers
+
+        self.etag = None
+        self.run_states = None      # run id -> status, None until the first poll
+        self.periods = None         # known period folders, None until the first poll
+        self.export_folders = []
+        self.polls = 0
+
+    def poll(self) -> list:
+        """Check runs and storage once. The first poll records the current state without events."""
+        events = []
+        if self.export:
+            events.extend(self.poll_runs())
+        if self.storage_account and self.container:
+            events.extend(self.poll_storage())
+        self.polls += 1
+        return events
+
+    def poll_runs(self) -> list:
+        export = self.export
+        url = f"{export.base_url}{export.billing_scope}/providers/Microsoft.CostManagement/exports/{export.export_name}"
+        headers = {"Authorization": f"Bearer {self.auth.get_token()}"}
+        active = any(status in ACTIVE_STATUSES for status in (self.run_states or {}).values())
+        if self.etag and not active and self.polls % RUNS_REFRESH_EVERY:
+            headers["If-None-Match"] = self.etag
+
+        response = azure_http.get(url, headers=headers, params={"api-version": export.api_version, "$expand": "runHistory"})
+        if response.status_code == 304:
+            return []
+        if not response.ok:
+            raise WatchError(f"export status request failed (HTTP {response.status_code}): {response.text[:200]}")
+        try:
+            data = response.json()
+        except ValueError:
+            raise WatchError("invalid JSON response from Azure API")
+        self.etag = response.headers.get("ETag")
+
+        api_runs = data.get("properties", {}).get("runHistory", {}).get("value", [])
+        export.history.merge(api_runs)
+
+        # Only the runs in the latest response are tracked, so the state stays small
+        states = {}
+        events = []
+        for api_run in api_runs:
+            run = run_info_from_api(api_run)
+            states[run["id"]] = run["status"]
+            if self.run_states is None or self.run_states.get(run["id"]) == run["status"]:
+                continue
+            start, end = run["start_date"][:10], run["end_date"][:10]
+            events.append({
+                "event": run_event(run),
+                "run": run["id"],
+                "status": run["status"],
+                "period": f"{start} to {end}" if start and end else "",
+                "submitted": run["submitted"],
+            })
+        self.run_states = states
+        # Runs are listed newest first; report them in the order they happened
+        return list(reversed(events))
+
+    def poll_storage(self) -> list:
+        if not self.export_folders or self.polls % FULL_SCAN_EVERY == 0:
+            found = discover_period_prefixes(
+                self.auth, self.storage_account, self.container, self.export_root_path,
+                max_workers=self.max_workers,
+            )
+            self.export_folders = sorted({p[:p.rstrip("/").rfind("/") + 1] for p in found})
+        else:
+            found = [
+                prefix
+                for folder in self.export_folders
+                for prefix in list_blob_prefixes(self.auth, self.storage_account, self.container, folder)
+                if PERIOD_FOLDER_PATTERN.search(prefix)
+            ]
+
+        found = set(found)
+        added = sorted(found - self.periods) if self.periods is not None else []
+        self.periods = found
+        return [{"event": "period_added", "folder": folder} for folder in added]
+
+
+def format_event(event: dict) -> str:
+    icon = EVENT_ICONS.get(event["event"], "•")
+    stamp = event["time"][:19].replace("T", " ")
+    if event["event"] == "period_added":
+        return f"{stamp} {icon} New period folder: {event['folder']}"
+    state = event["event"][len("run_"):]
+    return f"{stamp} {icon} Run {state}: {event['period'] or event['run']} ({event['status']})"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Watch FOCUS export runs and storage, reporting state changes",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Using terraform output (easiest)
+  python3 watch_exports.py --from-terraform
+
+  # Poll every 2 minutes and write one JSON event per line
+  python3 watch_exports.py --profile contoso --interval 120 --json >> events.jsonl
+        """,
+    )
+    parser.add_argument(
+        "--from-terraform", action="store_true",
+        help="Read credentials from terraform output"
+    )
+    parser.add_argument(
+        "--terraform-dir", default=".",
+        help="Terraform working directory for --from-terraform (default: current directory)",
+    )
+    parser.add_argument(
+        "--profile",
+        help="Named profile from ~/.config/digiusher/profiles.json (override with DIGIUSHER_PROFILES)",
+    )
+    parser.add_argument("--tenant-id", help="Azure Tenant ID")
+    parser.add_argument("--client-id", help="Service Principal Client ID")
+    parser.add_argument("--client-secret", help="Service Principal Client Secret")
+    parser.add_argument("--billing-scope", help="Billing scope of the export (to watch runs)")
+    parser.add_argument("--export-name", help="Name of the export (to watch runs)")
+    parser.add_argument("--storage-account", help="Storage account name (to watch period folders)")
+    parser.add_argument("--container", help="Container name (to watch period folders)")
+    parser.add_argument("--export-root-path", help="Root folder path for exports")
+    parser.add_argument(
+        "--interval", type=float, default=300,
+        help="Seconds between polls (default: 300)",
+    )
+    parser.add_argument(
+        "--json", action="store_true",
+        help="Write events to stdout as JSON lines; other messages go to stderr",
+    )
+    parser.add_argument(
+        "--max-workers", type=int, default=8,
+        help="Maximum concurrent listings when walking the container (default: 8)",
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=60,
+        help="HTTP read timeout in seconds for Azure API calls (default: 60)",
+    )
+    parser.add_argument(
+        "--metrics",
+        help="Rewrite request metrics to this file after every poll (Prometheus textfile format for .prom, JSON otherwise)",
+    )
+    parser.add_argument(
+        "--no-token-cache", action="store_true",
+        help="Do not read or write the on-disk access token cache",
+    )
+
+    args = parser.parse_args()
+    azure_http.configure(timeout=(10, args.timeout))
+    if args.metrics:
+        metrics.enable()
+
+    log_file = sys.stderr if args.json else sys.stdout
+
+    def log(message: str):
+        print(message, file=log_file, flush=True)
+
+    if args.from_terraform:
+        log("📥 Reading credentials from terraform output...")
+    try:
+        settings = resolve_settings(
+            args, from_terraform=args.from_terraform, profile=args.profile, terraform_dir=args.terraform_dir
+        )
+    except ConfigError as e:
+        log(f"❌ {e}")
+        sys.exit(1)
+
+    missing = [k for k in ("tenant_id", "client_id", "client_secret") if not settings.get(k)]
+    if missing:
+        parser.error("Either --from-terraform, --profile or all credential arguments are required")
+    watch_runs = settings.get("billing_scope") and settings.get("export_name")
+    watch_storage = settings.get("storage_account") and settings.get("container")
+    if not watch_runs and not watch_storage:
+        parser.error("Nothing to watch: give --billing-scope/--export-name and/or --storage-account/--container")
+
+    auth = AzureAuthenticator(
+        settings["tenant_id"], settings["client_id"], settings["client_secret"],
+        use_cache=not args.no_token_cache,
+    )
+    watcher = ExportWatcher(
+        auth,
+        billing_scope=settings.get("billing_scope") if watch_runs else None,
+        export_name=settings.get("export_name") if watch_runs else None,
+        storage_account=settings.get("storage_account") if watch_storage else None,
+        container=settings.get("container") if watch_storage else None,
+        export_root_path=settings.get("export_root_path"),
+        max_workers=args.max_workers,
+    )
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+
+    log(f"👀 Watching every {args.interval:.0f}s (Ctrl+C to stop)")
+    if watch_runs:
+        log(f"   Export: {settings['export_name']} at {settings['billing_scope']}")
+    if watch_storage:
+        log(f"   Storage: {settings['storage_account']}/{settings['container']}")
+
+    try:
+        while not stop.is_set():
+            started = time.monotonic()
+            first = watcher.polls == 0
+            try:
+                events = watcher.poll()
+            except (requests.RequestException, BlobListingError, WatchError) as e:
+                log(f"⚠️  Poll failed: {e}")
+                events = []
+            else:
+                if first:
+                    known = []
+                    if watcher.run_states is not None:
+                        known.append(f"{len(watcher.run_states)} recent run(s)")
+                    if watcher.periods is not None:
+                        known.append(f"{len(watcher.periods)} period folder(s)")
+                    log(f"   Baseline: {', '.join(known)}")
+
+            now = datetime.now(timezone.utc).isoformat()
+            for event in events:
+                event["time"] = now
+                if args.json:
+                    print(json.dumps(event), flush=True)
+                else:
+                    print(format_event(event), flush=True)
+
+            if args.metrics:
+                metrics.write_at_exit(args.metrics, "watch_exports")
+            stop.wait(max(0.0, args.interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        pass
+
+    log("👋 Stopped watching")
+
+
+if __name__ == "__main__":
+    main()